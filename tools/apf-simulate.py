@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Check an environment's API Priority and Fairness configuration against a
+mix of requests, offline. Each kind of request is matched to the FlowSchema
+and priority level that would serve it, and then the queuing, seat use, and
+rejections at each priority level are simulated at the given request rates,
+so that the concurrency shares can be sized before they are rolled out.
+
+The mix is either a workload file of request classes with their rates, or
+a recorded Kubernetes audit log that is replayed, optionally sped up.
+
+A workload file:
+
+    requests:
+    - name: nnf-sos list nnfnodes
+      user: system:serviceaccount:nnf-system:nnf-controller-manager
+      verb: list
+      apiGroup: nnf.cray.hpe.com
+      resource: nnfnodes
+      namespace: nnf-system
+      rate: 200          # requests per second
+      serviceTime: 0.05  # seconds, the mean
+      seats: 1
+      flows: 1           # distinct users or namespaces sharing the class
+    - name: probes
+      user: system:anonymous
+      nonResourceURL: /healthz
+      rate: 10
+      serviceTime: 0.001
+
+The groups that the API server gives every user, such as
+system:authenticated and the service account groups, are added to the
+'groups' that a request lists.
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import math
+import os
+import sys
+import yaml
+
+import apf
+import apfsim
+import renderstate
+import timings
+import yamlscan
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    action="append",
+    help="Use the APF objects in the environment's rendered manifests. "
+    "May be given more than once.",
+)
+PARSER.add_argument(
+    "--rendered",
+    type=str,
+    default="rendered",
+    help="Directory of manifests from render-manifests.py. Default=rendered.",
+)
+PARSER.add_argument(
+    "--file",
+    "-f",
+    type=str,
+    action="append",
+    help="A YAML file, or a directory of them, with APF objects, such as the "
+    "output of 'kubectl get flowschemas,prioritylevelconfigurations -o yaml'. "
+    "May be given more than once.",
+)
+PARSER.add_argument(
+    "--workload",
+    "-w",
+    type=str,
+    help="YAML file of request classes and their rates.",
+)
+PARSER.add_argument(
+    "--audit-log",
+    type=str,
+    help="Kubernetes audit log, one JSON event per line, to replay.",
+)
+PARSER.add_argument(
+    "--duration",
+    type=float,
+    default=60.0,
+    help="Seconds of requests to simulate from a workload file. Default=60.",
+)
+PARSER.add_argument(
+    "--scale",
+    type=float,
+    action="append",
+    help="Multiply the request rates by this, or speed up an audit log by it. "
+    "May be given more than once to compare several loads. Default=1.",
+)
+PARSER.add_argument(
+    "--server-concurrency",
+    type=int,
+    default=600,
+    help="The API server's concurrency limit, its --max-requests-inflight "
+    "plus --max-mutating-requests-inflight. Default=600.",
+)
+PARSER.add_argument(
+    "--queue-timeout",
+    type=float,
+    default=15.0,
+    help="Seconds a request may wait in a queue before it is rejected. "
+    "Default=15.",
+)
+PARSER.add_argument(
+    "--fixed-service-time",
+    action="store_true",
+    help="Give every request of a workload class its mean service time, "
+    "instead of an exponential spread around it.",
+)
+PARSER.add_argument(
+    "--seed",
+    type=int,
+    default=1,
+    help="Seed for the synthetic arrivals. Default=1.",
+)
+PARSER.add_argument(
+    "--match-only",
+    action="store_true",
+    help="Only show which FlowSchema each request class matches.",
+)
+PARSER.add_argument(
+    "--json",
+    type=str,
+    help="Write the results to this file as JSON.",
+)
+PARSER.add_argument(
+    "--timings",
+    action="store_true",
+    help="Print a summary of the slowest operations.",
+)
+
+# Subresources whose requests are long-running, like watches.
+LONG_RUNNING_SUBRESOURCES = {"attach", "exec", "portforward", "proxy"}
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.timings:
+        timings.enable()
+    if not args.env and not args.file:
+        print("Specify the APF objects with --env or --file.")
+        sys.exit(1)
+    if bool(args.workload) == bool(args.audit_log):
+        print("Specify one of --workload or --audit-log.")
+        sys.exit(1)
+    scales = args.scale or [1.0]
+    if any(scale <= 0 for scale in scales) or args.duration <= 0:
+        print("The --scale and --duration values must be positive.")
+        sys.exit(1)
+
+    try:
+        with timings.span("phase", "load APF objects"):
+            config = load_config(args)
+        with timings.span("phase", "load requests"):
+            if args.workload:
+                classes = load_workload(args.workload)
+                recorded = None
+            else:
+                classes, recorded = load_audit_log(args.audit_log)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+    for warning in config.warnings:
+        print(f"Warning: {warning}")
+    errs = config.problems()
+    for err in errs:
+        print(f"Error: {err}")
+    if errs:
+        sys.exit(1)
+
+    with timings.span("phase", "classify"):
+        classified = [
+            (req_class, *config.classify(req_class.request)) for req_class in classes
+        ]
+    unmatched = [entry[0].name for entry in classified if entry[1] is None]
+    if unmatched:
+        print(f"Error: no FlowSchema matches {', '.join(unmatched)}")
+        sys.exit(1)
+    display_matches(config, classified)
+    if args.match_only:
+        return
+
+    results = []
+    for scale in scales:
+        with timings.span("phase", f"simulate x{scale:g}"):
+            sim = apfsim.Simulation(
+                config, classified, args.server_concurrency, args.queue_timeout
+            )
+            if recorded is None:
+                arrivals = apfsim.poisson_arrivals(
+                    classes,
+                    args.duration,
+                    scale,
+                    args.seed,
+                    args.fixed_service_time,
+                )
+            else:
+                arrivals = (
+                    (when / scale, idx, 0, service)
+                    for when, idx, service in recorded
+                )
+            span = sim.run(arrivals)
+        results.append(summarize(args, sim, classified, scale, span))
+        display_results(args, results[-1])
+    if args.timings:
+        timings.print_summary()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Results written to {args.json}")
+
+
+def load_config(args):
+    """Load the APF objects from the rendered environments and the files."""
+    config = apf.ApfConfig()
+    filenames = []
+    for env in args.env or []:
+        env_output_dir = os.path.normpath(f"{args.rendered}/{env}")
+        state = renderstate.load_state(renderstate.state_path(env_output_dir))
+        if state is None:
+            raise RuntimeError(
+                f"No rendered manifests in {env_output_dir}. "
+                f"Run tools/render-manifests.py -e {env}"
+            )
+        for rendered in sorted(state["rendered"]):
+            filenames.extend(yaml_files(rendered))
+    for path in args.file or []:
+        if os.path.isdir(path):
+            filenames.extend(yaml_files(path))
+        elif os.path.isfile(path):
+            filenames.append(path)
+        else:
+            raise RuntimeError(f"{path} does not exist.")
+
+    found = 0
+    for filename in filenames:
+        with open(filename, "rb") as f, timings.span("yaml", filename):
+            try:
+                docs = list(yaml.load_all(f, Loader=yamlscan.SafeLoader))
+            except yaml.YAMLError as ex:
+                raise RuntimeError(f"YAML error in {filename}: {ex}") from ex
+        for doc in docs:
+            # 'kubectl get -o yaml' wraps the objects in a List.
+            items = doc.get("items") if isinstance(doc, dict) else None
+            for item in items if isinstance(items, list) else [doc]:
+                if config.add_document(item, filename):
+                    found += 1
+    if found == 0:
+        raise RuntimeError(
+            "No FlowSchemas or PriorityLevelConfigurations found. Add the "
+            "cluster's with --file."
+        )
+    config.add_mandatory()
+    return config
+
+
+def yaml_files(directory):
+    """Return the .yaml files below the directory."""
+    found = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        found.extend(os.path.join(root, name) for name in sorted(names))
+    return [name for name in found if name.endswith((".yaml", ".yml"))]
+
+
+def load_workload(filename):
+    """Read a workload file into a list of RequestClass."""
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            workload = yaml.load(f, Loader=yamlscan.SafeLoader)
+    except (OSError, yaml.YAMLError) as ex:
+        raise RuntimeError(f"Unable to read {filename}: {ex}") from ex
+    if not isinstance(workload, dict) or not isinstance(
+        workload.get("requests"), list
+    ):
+        raise RuntimeError(f"{filename} must have a list of requests.")
+    classes = []
+    for num, entry in enumerate(workload["requests"], start=1):
+        if not isinstance(entry, dict) or not entry.get("user"):
+            raise RuntimeError(f"{filename}: request {num} must have a user.")
+        if not entry.get("resource") and not entry.get("nonResourceURL"):
+            raise RuntimeError(
+                f"{filename}: request {num} must have a resource or a nonResourceURL."
+            )
+        try:
+            rate = float(entry.get("rate", 1.0))
+            service_time = float(entry.get("serviceTime", 0.05))
+            seats = int(entry.get("seats", 1))
+            flows = int(entry.get("flows", 1))
+        except (TypeError, ValueError) as ex:
+            raise RuntimeError(f"{filename}: request {num}: {ex}") from ex
+        if rate < 0 or service_time <= 0 or seats < 1 or flows < 1:
+            raise RuntimeError(
+                f"{filename}: request {num} needs a rate of at least 0, a positive "
+                "serviceTime, and seats and flows of at least 1."
+            )
+        request = apf.make_request(
+            entry["user"],
+            entry.get("groups") or [],
+            entry.get("verb", "get"),
+            entry.get("apiGroup", ""),
+            entry.get("resource"),
+            entry.get("namespace", ""),
+            entry.get("nonResourceURL"),
+        )
+        name = entry.get("name") or describe(request)
+        classes.append(
+            apfsim.RequestClass(name, request, rate, service_time, seats, flows)
+        )
+    return classes
+
+
+def load_audit_log(filename):
+    """
+    Read the ResponseComplete events of an audit log. Returns the request
+    classes, one for each distinct request, and the recorded arrivals as a
+    time-ordered list of (seconds from the first request, class index,
+    service time). The classes' rates are their average over the log.
+    """
+    index = {}
+    classes = []
+    recorded = []
+    skipped = collections.Counter()
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            for num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError as ex:
+                    raise RuntimeError(f"{filename}:{num}: {ex}") from ex
+                if event.get("stage") != "ResponseComplete":
+                    continue
+                request = audit_request(event)
+                if request is None:
+                    skipped["long-running"] += 1
+                    continue
+                try:
+                    received = parse_time(event["requestReceivedTimestamp"])
+                    completed = parse_time(event["stageTimestamp"])
+                except (KeyError, ValueError):
+                    skipped["no timestamps"] += 1
+                    continue
+                idx = index.get(request)
+                if idx is None:
+                    idx = index[request] = len(classes)
+                    classes.append([request, 0, 0.0])
+                classes[idx][1] += 1
+                service = max(completed - received, 0.001)
+                classes[idx][2] += service
+                recorded.append((received, idx, service))
+    except OSError as ex:
+        raise RuntimeError(f"Unable to read {filename}: {ex}") from ex
+    if not recorded:
+        raise RuntimeError(f"No completed requests found in {filename}.")
+    for reason, count in sorted(skipped.items()):
+        print(f"Skipped {count} {reason} requests in {filename}")
+
+    recorded.sort()
+    start = recorded[0][0]
+    recorded = [(when - start, idx, service) for when, idx, service in recorded]
+    span = max(recorded[-1][0], 1.0)
+    return [
+        apfsim.RequestClass(
+            describe(request), request, count / span, total / count, 1, 1
+        )
+        for request, count, total in classes
+    ], recorded
+
+
+def audit_request(event):
+    """Return the Request of an audit event, or None for a long-running one."""
+    user = event.get("impersonatedUser") or event.get("user") or {}
+    verb = event.get("verb", "")
+    ref = event.get("objectRef")
+    if verb == "watch":
+        return None
+    if ref is None:
+        url = (event.get("requestURI") or "/").split("?", 1)[0]
+        return apf.make_request(
+            user.get("username", ""),
+            user.get("groups") or [],
+            verb,
+            non_resource_url=url,
+        )
+    if ref.get("subresource") in LONG_RUNNING_SUBRESOURCES:
+        return None
+    resource = ref.get("resource", "")
+    if ref.get("subresource"):
+        resource = f"{resource}/{ref['subresource']}"
+    return apf.make_request(
+        user.get("username", ""),
+        user.get("groups") or [],
+        verb,
+        ref.get("apiGroup", ""),
+        resource,
+        ref.get("namespace", ""),
+    )
+
+
+def parse_time(stamp):
+    """Return an RFC 3339 timestamp as seconds since the epoch."""
+    return datetime.datetime.fromisoformat(stamp.replace("Z", "+00:00")).timestamp()
+
+
+def describe(request):
+    """Return a short description of a request."""
+    if request.non_resource_url is not None:
+        target = request.non_resource_url
+    else:
+        group = f".{request.api_group}" if request.api_group else ""
+        target = f"{request.resource}{group}"
+        if request.namespace:
+            target += f" in {request.namespace}"
+    return f"{request.user} {request.verb} {target}"
+
+
+def display_matches(config, classified):
+    """Print the FlowSchema and priority level of each request class."""
+    rows = [("Request class", "FlowSchema", "Priority level", "Flow")]
+    for req_class, schema, distinguisher in classified:
+        rows.append(
+            (
+                req_class.name,
+                schema.name,
+                schema.priority_level,
+                distinguisher or "-",
+            )
+        )
+    print_table(rows)
+    unused = sorted(
+        name
+        for name, schema in config.flow_schemas.items()
+        if config.sources[(apf.FLOW_SCHEMA, name)] != "mandatory"
+        and all(match is not schema for _, match, _ in classified)
+    )
+    if unused:
+        print(f"FlowSchemas that no request matched: {', '.join(unused)}")
+    print("")
+
+
+def summarize(args, sim, classified, scale, span):
+    """Return the results of one simulation as a dict."""
+    duration = max(span, 1e-9)
+    levels = {}
+    for name, state in sorted(sim.levels.items()):
+        level_classes = [
+            idx
+            for idx, (_, schema, _) in enumerate(classified)
+            if schema.priority_level == name
+        ]
+        if not level_classes and not state.seat_seconds:
+            continue
+        arrived = sum(sim.stats[idx].arrived for idx in level_classes)
+        levels[name] = {
+            "exempt": state.level.exempt,
+            "queuing": state.level.queuing,
+            "seats": None if state.level.exempt else state.limit,
+            "shares": state.level.nominal_shares,
+            # The average number of seats the requests would keep busy if
+            # none were rejected.
+            "offered_seats": round(
+                sum(sim.stats[idx].offered for idx in level_classes) / duration, 2
+            ),
+            "busy_percent": (
+                None
+                if state.level.exempt or not state.limit
+                else round(100 * state.seat_seconds / (state.limit * duration), 1)
+            ),
+            "arrived": arrived,
+            "rejected": sum(sim.stats[idx].rejected for idx in level_classes),
+            "timed_out": sum(sim.stats[idx].timed_out for idx in level_classes),
+            "max_seats_in_use": state.max_in_use,
+            "max_queued": state.max_queued,
+            "wait_p99": round(
+                apfsim.wait_percentile([sim.stats[idx] for idx in level_classes], 99),
+                4,
+            ),
+        }
+    classes = []
+    for idx, (req_class, schema, _) in enumerate(classified):
+        stat = sim.stats[idx]
+        classes.append(
+            {
+                "name": req_class.name,
+                "flow_schema": schema.name,
+                "priority_level": schema.priority_level,
+                "arrived": stat.arrived,
+                "rejected": stat.rejected,
+                "timed_out": stat.timed_out,
+                "wait_p50": round(stat.percentile(50), 4),
+                "wait_p99": round(stat.percentile(99), 4),
+            }
+        )
+    return {
+        "scale": scale,
+        "seconds": round(span, 3),
+        "server_concurrency": args.server_concurrency,
+        "total_shares": sum(
+            state.level.nominal_shares
+            for state in sim.levels.values()
+            if not state.level.exempt
+        ),
+        "requests": sum(level["arrived"] for level in levels.values()),
+        "priority_levels": levels,
+        "request_classes": classes,
+    }
+
+
+def display_results(args, result):
+    """Print the results of one simulation."""
+    print(
+        f"Load x{result['scale']:g}: {result['requests']} requests over "
+        f"{result['seconds']:.1f}s, server concurrency {args.server_concurrency}"
+    )
+    rows = [
+        (
+            "Priority level",
+            "Seats",
+            "Needed",
+            "Busy",
+            "Arrived",
+            "Rejected",
+            "Timed out",
+            "Max queued",
+            "Wait p99",
+        )
+    ]
+    for name, level in result["priority_levels"].items():
+        rows.append(
+            (
+                name,
+                "exempt" if level["exempt"] else str(level["seats"]),
+                f"{level['offered_seats']:.1f}",
+                "-" if level["busy_percent"] is None else f"{level['busy_percent']}%",
+                str(level["arrived"]),
+                percent(level["rejected"], level["arrived"]),
+                percent(level["timed_out"], level["arrived"]),
+                str(level["max_queued"]),
+                f"{level['wait_p99']:.3f}s",
+            )
+        )
+    print_table(rows)
+
+    rows = [("Request class", "Arrived", "Rejected", "Timed out", "Wait p50", "p99")]
+    for entry in result["request_classes"]:
+        rows.append(
+            (
+                entry["name"],
+                str(entry["arrived"]),
+                percent(entry["rejected"], entry["arrived"]),
+                percent(entry["timed_out"], entry["arrived"]),
+                f"{entry['wait_p50']:.3f}s",
+                f"{entry['wait_p99']:.3f}s",
+            )
+        )
+    print_table(rows)
+    display_sizing(args, result)
+    print("")
+
+
+def display_sizing(args, result):
+    """
+    Suggest nominalConcurrencyShares for the levels that are short of seats:
+    enough to keep the level no more than 80% busy, assuming the other
+    levels keep their shares. A level that rejects rather than queues can
+    reject bursts while it is mostly idle; it is sized for its busiest
+    moment instead.
+    """
+    levels = result["priority_levels"]
+    for name, level in levels.items():
+        if level["exempt"] or level["busy_percent"] is None:
+            continue
+        if level["busy_percent"] <= 80 and not level["rejected"]:
+            continue
+        needed = math.ceil(level["offered_seats"] / 0.8)
+        basis = ""
+        if level["busy_percent"] <= 80 and not level["queuing"]:
+            print(
+                f"{name} rejected {level['rejected']} requests while only "
+                f"{level['busy_percent']}% busy, so the rejections come from "
+                "bursts. limitResponse type: Queue would let them wait for a "
+                "seat instead."
+            )
+            needed = math.ceil(level["max_seats_in_use"] / 0.8)
+            basis = "Sized for its busiest moment, "
+        if needed <= level["seats"]:
+            needed = level["seats"] + 1
+        fraction = needed / args.server_concurrency
+        if fraction >= 1:
+            print(
+                f"{name} needs about {needed} seats, more than the server's "
+                f"concurrency limit of {args.server_concurrency}."
+            )
+            continue
+        others = result["total_shares"] - level["shares"]
+        shares = max(
+            math.ceil(fraction * others / (1 - fraction)), level["shares"] + 1
+        )
+        print(
+            f"{basis}{name} needs about {needed} seats and has {level['seats']}. "
+            f"nominalConcurrencyShares: {shares} would give it that."
+        )
+
+
+def percent(count, total):
+    """
+    Return count as a percentage of total, or as the count itself when it
+    is too small a part of the total to show as one.
+    """
+    if not count:
+        return "0"
+    share = 100 * count / total
+    if share < 0.05:
+        return str(count)
+    return f"{share:.1f}%"
+
+
+def print_table(rows):
+    """Print rows of strings as columns, the first row being the heading."""
+    widths = [max(len(row[col]) for row in rows) for col in range(len(rows[0]))]
+    for row in rows:
+        cells = [f"{cell:<{width}}" for cell, width in zip(row, widths)]
+        print("  ".join(cells).rstrip())
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,378 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+API Priority and Fairness (APF) configuration: the FlowSchemas and
+PriorityLevelConfigurations of flowcontrol.apiserver.k8s.io, and the
+matching of a request to its FlowSchema the way the API server does it.
+
+The FlowSchemas are tried in order of matchingPrecedence, then name, and
+the first one with a rule that matches both a subject and a resource or
+non-resource rule wins. The mandatory 'exempt' and 'catch-all' objects
+that every API server maintains are added when the configuration does not
+define them. The API server's suggested objects (workload-low,
+global-default, and so on) are not, as a cluster may have changed them;
+add them from the cluster with 'kubectl get' when they matter.
+"""
+
+import collections
+import math
+
+FLOWCONTROL_GROUP = "flowcontrol.apiserver.k8s.io"
+FLOW_SCHEMA = "FlowSchema"
+PRIORITY_LEVEL = "PriorityLevelConfiguration"
+NAME_ALL = "*"
+
+DEFAULT_NOMINAL_SHARES = 30
+DEFAULT_QUEUES = 64
+DEFAULT_HAND_SIZE = 8
+DEFAULT_QUEUE_LENGTH_LIMIT = 50
+
+SERVICE_ACCOUNT_PREFIX = "system:serviceaccount:"
+
+# One request to the API server. The resource includes any subresource, as
+# in 'pods/status'. The namespace is "" for a cluster-scoped request, and
+# non_resource_url is set, instead of the resource, for a request such as
+# /healthz.
+Request = collections.namedtuple(
+    "Request",
+    [
+        "user",
+        "groups",
+        "verb",
+        "api_group",
+        "resource",
+        "namespace",
+        "non_resource_url",
+    ],
+)
+
+# A PriorityLevelConfiguration. An exempt level has no limit; a level
+# without queuing rejects what it cannot run at once.
+PriorityLevel = collections.namedtuple(
+    "PriorityLevel",
+    [
+        "name",
+        "exempt",
+        "nominal_shares",
+        "lendable_percent",
+        "borrowing_limit_percent",
+        "queuing",
+        "queues",
+        "hand_size",
+        "queue_length_limit",
+    ],
+)
+
+# A FlowSchema. The distinguisher is None, 'ByUser', or 'ByNamespace', and
+# the rules are the spec.rules list as written.
+FlowSchema = collections.namedtuple(
+    "FlowSchema", ["name", "precedence", "priority_level", "distinguisher", "rules"]
+)
+
+
+def make_request(
+    user,
+    groups=(),
+    verb="get",
+    api_group="",
+    resource=None,
+    namespace="",
+    non_resource_url=None,
+):
+    """
+    Return a Request, adding the groups that the API server gives every
+    user: system:authenticated, or system:unauthenticated for
+    system:anonymous, and the service account groups for a service account.
+    """
+    groups = list(groups)
+    if user == "system:anonymous":
+        implied = ["system:unauthenticated"]
+    else:
+        implied = ["system:authenticated"]
+    if user.startswith(SERVICE_ACCOUNT_PREFIX):
+        sa_namespace = user[len(SERVICE_ACCOUNT_PREFIX) :].split(":", 1)[0]
+        implied += ["system:serviceaccounts", f"system:serviceaccounts:{sa_namespace}"]
+    for group in implied:
+        if group not in groups:
+            groups.append(group)
+    return Request(
+        user,
+        tuple(groups),
+        verb,
+        api_group or "",
+        resource,
+        namespace or "",
+        non_resource_url,
+    )
+
+
+def parse_priority_level(doc):
+    """Return the PriorityLevel of a PriorityLevelConfiguration document."""
+    name = doc["metadata"]["name"]
+    spec = doc.get("spec") or {}
+    if spec.get("type") == "Exempt":
+        return PriorityLevel(name, True, 0, 0, 0, False, 0, 0, 0)
+    limited = spec.get("limited") or {}
+    # v1beta1 and v1beta2 call the shares assuredConcurrencyShares.
+    shares = limited.get(
+        "nominalConcurrencyShares",
+        limited.get("assuredConcurrencyShares", DEFAULT_NOMINAL_SHARES),
+    )
+    response = limited.get("limitResponse") or {}
+    queuing = response.get("queuing") or {}
+    return PriorityLevel(
+        name,
+        False,
+        int(shares),
+        int(limited.get("lendablePercent") or 0),
+        limited.get("borrowingLimitPercent"),
+        response.get("type", "Reject") == "Queue",
+        int(queuing.get("queues", DEFAULT_QUEUES)),
+        int(queuing.get("handSize", DEFAULT_HAND_SIZE)),
+        int(queuing.get("queueLengthLimit", DEFAULT_QUEUE_LENGTH_LIMIT)),
+    )
+
+
+def parse_flow_schema(doc):
+    """Return the FlowSchema of a FlowSchema document."""
+    spec = doc.get("spec") or {}
+    method = spec.get("distinguisherMethod") or {}
+    return FlowSchema(
+        doc["metadata"]["name"],
+        int(spec.get("matchingPrecedence", 1000)),
+        (spec.get("priorityLevelConfiguration") or {}).get("name"),
+        method.get("type"),
+        spec.get("rules") or [],
+    )
+
+
+# The objects that the API server always maintains.
+MANDATORY_PRIORITY_LEVELS = [
+    PriorityLevel("exempt", True, 0, 0, 0, False, 0, 0, 0),
+    PriorityLevel("catch-all", False, 5, 0, 0, False, 0, 0, 0),
+]
+MANDATORY_FLOW_SCHEMAS = [
+    FlowSchema(
+        "exempt",
+        1,
+        "exempt",
+        None,
+        [
+            {
+                "subjects": [{"kind": "Group", "group": {"name": "system:masters"}}],
+                "resourceRules": [
+                    {
+                        "verbs": ["*"],
+                        "apiGroups": ["*"],
+                        "resources": ["*"],
+                        "clusterScope": True,
+                        "namespaces": ["*"],
+                    }
+                ],
+                "nonResourceRules": [{"verbs": ["*"], "nonResourceURLs": ["*"]}],
+            }
+        ],
+    ),
+    FlowSchema(
+        "catch-all",
+        10000,
+        "catch-all",
+        "ByUser",
+        [
+            {
+                "subjects": [
+                    {"kind": "Group", "group": {"name": "system:authenticated"}},
+                    {"kind": "Group", "group": {"name": "system:unauthenticated"}},
+                ],
+                "resourceRules": [
+                    {
+                        "verbs": ["*"],
+                        "apiGroups": ["*"],
+                        "resources": ["*"],
+                        "clusterScope": True,
+                        "namespaces": ["*"],
+                    }
+                ],
+                "nonResourceRules": [{"verbs": ["*"], "nonResourceURLs": ["*"]}],
+            }
+        ],
+    ),
+]
+
+
+class ApfConfig:
+    """The FlowSchemas and PriorityLevelConfigurations of a cluster."""
+
+    def __init__(self):
+        self.flow_schemas = {}
+        self.priority_levels = {}
+        # Where each object came from, keyed by (kind, name).
+        self.sources = {}
+        self.warnings = []
+        self._ordered = None
+
+    def add_document(self, doc, source):
+        """Add the document if it is an APF object. Returns True if it was."""
+        if not isinstance(doc, dict):
+            return False
+        group = str(doc.get("apiVersion", "")).split("/", 1)[0]
+        kind = doc.get("kind")
+        if group != FLOWCONTROL_GROUP or kind not in (FLOW_SCHEMA, PRIORITY_LEVEL):
+            return False
+        obj = (
+            parse_flow_schema(doc) if kind == FLOW_SCHEMA else parse_priority_level(doc)
+        )
+        objects = self.flow_schemas if kind == FLOW_SCHEMA else self.priority_levels
+        if obj.name in objects:
+            self.warnings.append(
+                f"{kind} {obj.name} in {source} replaces the one in "
+                f"{self.sources[(kind, obj.name)]}"
+            )
+        objects[obj.name] = obj
+        self.sources[(kind, obj.name)] = source
+        self._ordered = None
+        return True
+
+    def add_mandatory(self):
+        """Add the mandatory objects that the configuration does not define."""
+        for level in MANDATORY_PRIORITY_LEVELS:
+            if level.name not in self.priority_levels:
+                self.priority_levels[level.name] = level
+                self.sources[(PRIORITY_LEVEL, level.name)] = "mandatory"
+        for schema in MANDATORY_FLOW_SCHEMAS:
+            if schema.name not in self.flow_schemas:
+                self.flow_schemas[schema.name] = schema
+                self.sources[(FLOW_SCHEMA, schema.name)] = "mandatory"
+        self._ordered = None
+
+    def problems(self):
+        """Return the errors in the configuration, as a list of strings."""
+        errs = []
+        for schema in self.flow_schemas.values():
+            if schema.priority_level not in self.priority_levels:
+                errs.append(
+                    f"FlowSchema {schema.name} uses PriorityLevelConfiguration "
+                    f"{schema.priority_level}, which does not exist"
+                )
+        return errs
+
+    def ordered(self):
+        """Return the FlowSchemas in the order that they are tried."""
+        if self._ordered is None:
+            self._ordered = sorted(
+                self.flow_schemas.values(), key=lambda fs: (fs.precedence, fs.name)
+            )
+        return self._ordered
+
+    def classify(self, request):
+        """
+        Return the FlowSchema that the request matches and its flow
+        distinguisher, or (None, None) if it matches none.
+        """
+        for schema in self.ordered():
+            if any(rule_matches(rule, request) for rule in schema.rules):
+                return schema, flow_distinguisher(schema, request)
+        return None, None
+
+    def concurrency_limits(self, server_limit):
+        """
+        Return the nominal concurrency limit, in seats, of each limited
+        priority level: its share of the server's limit, rounded up.
+        """
+        limited = [pl for pl in self.priority_levels.values() if not pl.exempt]
+        total = sum(pl.nominal_shares for pl in limited)
+        if total == 0:
+            return {pl.name: 0 for pl in limited}
+        return {
+            pl.name: math.ceil(server_limit * pl.nominal_shares / total)
+            for pl in limited
+        }
+
+
+def flow_distinguisher(schema, request):
+    """Return the part of the flow identity that the FlowSchema takes from a request."""
+    if schema.distinguisher == "ByUser":
+        return request.user
+    if schema.distinguisher == "ByNamespace":
+        return request.namespace
+    return ""
+
+
+def rule_matches(rule, request):
+    """Does the request match one of the rule's subjects and one of its rules?"""
+    if not any(subject_matches(s, request) for s in rule.get("subjects") or []):
+        return False
+    if request.non_resource_url is not None:
+        return any(
+            non_resource_rule_matches(r, request)
+            for r in rule.get("nonResourceRules") or []
+        )
+    return any(
+        resource_rule_matches(r, request) for r in rule.get("resourceRules") or []
+    )
+
+
+def subject_matches(subject, request):
+    """Does the request's user match the subject?"""
+    kind = subject.get("kind")
+    if kind == "Group":
+        name = (subject.get("group") or {}).get("name")
+        return name == NAME_ALL or name in request.groups
+    if kind == "User":
+        name = (subject.get("user") or {}).get("name")
+        return name in (NAME_ALL, request.user)
+    if kind == "ServiceAccount":
+        account = subject.get("serviceAccount") or {}
+        if not request.user.startswith(SERVICE_ACCOUNT_PREFIX):
+            return False
+        namespace, _, name = request.user[len(SERVICE_ACCOUNT_PREFIX) :].partition(":")
+        if account.get("namespace") != namespace:
+            return False
+        return account.get("name") in (NAME_ALL, name)
+    return False
+
+
+def matches_list(values, value):
+    """Is the value, or '*', in the list?"""
+    return NAME_ALL in values or value in values
+
+
+def resource_rule_matches(rule, request):
+    """Does the resource request match the resource rule?"""
+    if not matches_list(rule.get("verbs") or [], request.verb):
+        return False
+    if not matches_list(rule.get("apiGroups") or [], request.api_group):
+        return False
+    if not matches_list(rule.get("resources") or [], request.resource):
+        return False
+    if request.namespace == "":
+        return bool(rule.get("clusterScope"))
+    return matches_list(rule.get("namespaces") or [], request.namespace)
+
+
+def non_resource_rule_matches(rule, request):
+    """Does the non-resource request match the non-resource rule?"""
+    if not matches_list(rule.get("verbs") or [], request.verb):
+        return False
+    url = request.non_resource_url
+    for pattern in rule.get("nonResourceURLs") or []:
+        if pattern in (NAME_ALL, url):
+            return True
+        if pattern.endswith("/*") and url.startswith(pattern[:-1]):
+            return True
+    return False
@@ -0,0 +1,305 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+An offline, discrete-event model of how the API server's Priority and
+Fairness would treat a stream of requests.
+
+Each request class is classified once, so the cost per simulated request is
+a few heap and deque operations. The model follows the API server:
+
+- Each limited priority level gets its nominal share of the server's
+  concurrency limit, in seats. Exempt levels have no limit.
+- A level without queuing rejects a request that does not fit at once.
+- A level with queuing deals each flow a hand of queues by shuffle sharding
+  and puts the request on the least loaded queue of the hand, or rejects it
+  if that queue is full. A request that waits longer than the queue timeout
+  is rejected too.
+- Seats are given to the queues in fair-queuing order: the queue with the
+  least virtual work dispatched goes next, where a request's work is its
+  seats times its service time.
+
+It is a model, not the API server. Borrowing of seats between levels is
+not simulated, so each level only has its nominal seats, which is what it
+gets when every level is busy. Watches and other long-running requests are
+not modelled.
+"""
+
+import bisect
+import collections
+import hashlib
+import heapq
+import itertools
+import math
+import random
+
+# One kind of request in a synthetic mix: rate is per second, service_time
+# is the mean time that a request holds its seats, and the requests are
+# spread over 'flows' distinct users or namespaces.
+RequestClass = collections.namedtuple(
+    "RequestClass", ["name", "request", "rate", "service_time", "seats", "flows"]
+)
+
+
+class ClassStats:
+    """
+    What happened to the requests of one class. Only the waits of the
+    requests that were queued are kept; the rest started at once.
+    """
+
+    def __init__(self):
+        self.arrived = 0
+        # The seat-seconds that the arrivals asked for, served or not.
+        self.offered = 0.0
+        self.immediate = 0
+        self.dispatched = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.waits = []
+
+    def percentile(self, pct):
+        """Return the given percentile of the queue waits, in seconds."""
+        return wait_percentile([self], pct)
+
+
+def wait_percentile(stats, pct):
+    """Return the given percentile of the queue waits of the ClassStats."""
+    immediate = sum(stat.immediate for stat in stats)
+    waits = sorted(wait for stat in stats for wait in stat.waits)
+    if not waits:
+        return 0.0
+    rank = min(immediate + len(waits) - 1, int((immediate + len(waits)) * pct / 100))
+    return 0.0 if rank < immediate else waits[rank - immediate]
+
+
+class LevelState:
+    """The seats and queues of one priority level during a simulation."""
+
+    def __init__(self, level, limit):
+        self.level = level
+        self.limit = math.inf if level.exempt else limit
+        self.in_use = 0
+        self.seat_seconds = 0.0
+        self.max_in_use = 0
+        self.max_queued = 0
+        self.queued = 0
+        self.queues = [collections.deque() for _ in range(level.queues)]
+        # The seats that each queue's requests are using now.
+        self.executing = [0] * level.queues
+        # Fair queuing: the virtual work dispatched from each queue, and a
+        # heap of (virtual work, queue) for the queues that have requests.
+        self.virtual = [0.0] * level.queues
+        self.ready = []
+        self.clock = 0.0
+        self.hands = {}
+
+    def hand(self, flow):
+        """Deal the flow its hand of queues, by shuffle sharding."""
+        hand = self.hands.get(flow)
+        if hand is None:
+            seed = hashlib.sha256(repr(flow).encode()).digest()
+            size = min(self.level.hand_size, len(self.queues))
+            hand = random.Random(seed).sample(range(len(self.queues)), size)
+            self.hands[flow] = hand
+        return hand
+
+
+class Simulation:
+    """
+    Run a stream of requests through a configuration. The classes are
+    (RequestClass, FlowSchema, distinguisher) tuples, from ApfConfig.classify.
+    """
+
+    def __init__(self, config, classified, server_limit, queue_timeout):
+        self.queue_timeout = queue_timeout
+        limits = config.concurrency_limits(server_limit)
+        self.limits = limits
+        self.levels = {
+            name: LevelState(level, limits.get(name, 0))
+            for name, level in config.priority_levels.items()
+        }
+        self.classes = []
+        for req_class, schema, distinguisher in classified:
+            state = self.levels[schema.priority_level]
+            # A request is never given more seats than its level has.
+            seats = req_class.seats
+            if not state.level.exempt:
+                seats = max(1, min(seats, state.limit))
+            self.classes.append((seats, schema, distinguisher, state))
+        self.stats = [ClassStats() for _ in self.classes]
+        self.completions = []
+        self._sequence = itertools.count()
+        self.now = 0.0
+
+    def run(self, arrivals):
+        """
+        Simulate the arrivals, an iterable of (time, class index, flow
+        index, service time) in time order, then let the server drain.
+        """
+        completions = self.completions
+        pop = heapq.heappop
+        push = heapq.heappush
+        sequence = self._sequence
+        stats = self.stats
+        classes = self.classes
+        for when, idx, flow_idx, service in arrivals:
+            while completions and completions[0][0] <= when:
+                # complete(), inlined.
+                done, _, queue_idx, done_seats, done_state = pop(completions)
+                done_state.in_use -= done_seats
+                if queue_idx >= 0:
+                    done_state.executing[queue_idx] -= done_seats
+                if done_state.queued:
+                    self.now = done
+                    self.dispatch(done_state)
+            self.now = when
+            seats, schema, distinguisher, state = classes[idx]
+            stat = stats[idx]
+            stat.arrived += 1
+            stat.offered += seats * service
+            if state.queued == 0 and state.in_use + seats <= state.limit:
+                # Most requests start at once; this is start() inlined.
+                state.in_use += seats
+                if state.in_use > state.max_in_use:
+                    state.max_in_use = state.in_use
+                state.seat_seconds += seats * service
+                stat.dispatched += 1
+                stat.immediate += 1
+                push(completions, (when + service, next(sequence), -1, seats, state))
+                continue
+            if not state.level.queuing:
+                stat.rejected += 1
+                continue
+            flow = (schema.name, distinguisher, flow_idx)
+            self.enqueue(state, flow, idx, when, seats, service)
+        while completions:
+            self.complete(*pop(completions))
+        end = self.now
+        # Whatever is still queued would time out.
+        for state in self.levels.values():
+            for queue in state.queues:
+                for _, idx, _, _ in queue:
+                    self.stats[idx].timed_out += 1
+                queue.clear()
+        return end
+
+    def start(self, state, queue_idx, idx, arrived, seats, service):
+        """Give a queued request its seats until it completes."""
+        state.in_use += seats
+        if state.in_use > state.max_in_use:
+            state.max_in_use = state.in_use
+        state.seat_seconds += seats * service
+        state.executing[queue_idx] += seats
+        stat = self.stats[idx]
+        stat.dispatched += 1
+        stat.waits.append(self.now - arrived)
+        heapq.heappush(
+            self.completions,
+            (self.now + service, next(self._sequence), queue_idx, seats, state),
+        )
+
+    def complete(self, when, _, queue_idx, seats, state):
+        """Free the seats of a completed request, and dispatch from the queues."""
+        self.now = when
+        state.in_use -= seats
+        if queue_idx >= 0:
+            state.executing[queue_idx] -= seats
+        if state.queued:
+            self.dispatch(state)
+
+    def expire(self, state, queue):
+        """Drop the requests at the head of the queue that waited too long."""
+        deadline = self.now - self.queue_timeout
+        while queue and queue[0][0] < deadline:
+            _, idx, _, _ = queue.popleft()
+            self.stats[idx].timed_out += 1
+            state.queued -= 1
+
+    def enqueue(self, state, flow, idx, when, seats, service):
+        """Put a request on the least loaded queue of its flow's hand."""
+        best = None
+        best_load = None
+        for queue_idx in state.hand(flow):
+            queue = state.queues[queue_idx]
+            self.expire(state, queue)
+            load = len(queue) + state.executing[queue_idx]
+            if best is None or load < best_load:
+                best, best_load = queue_idx, load
+        queue = state.queues[best]
+        if len(queue) >= state.level.queue_length_limit:
+            self.stats[idx].rejected += 1
+            return
+        if not queue:
+            state.virtual[best] = max(state.virtual[best], state.clock)
+            heapq.heappush(state.ready, (state.virtual[best], best))
+        queue.append((when, idx, seats, service))
+        state.queued += 1
+        if state.queued > state.max_queued:
+            state.max_queued = state.queued
+        self.dispatch(state)
+
+    def dispatch(self, state):
+        """Start queued requests, in fair-queuing order, while seats are free."""
+        ready = state.ready
+        while ready:
+            virtual, queue_idx = ready[0]
+            queue = state.queues[queue_idx]
+            self.expire(state, queue)
+            if not queue or virtual != state.virtual[queue_idx]:
+                # Emptied by timeouts, or an old entry for the queue.
+                heapq.heappop(ready)
+                continue
+            arrived, idx, seats, service = queue[0]
+            if state.in_use + seats > state.limit:
+                return
+            queue.popleft()
+            state.queued -= 1
+            heapq.heappop(ready)
+            state.clock = virtual
+            state.virtual[queue_idx] = virtual + seats * service
+            if queue:
+                heapq.heappush(ready, (state.virtual[queue_idx], queue_idx))
+            self.start(state, queue_idx, idx, arrived, seats, service)
+
+
+def poisson_arrivals(classes, duration, scale=1.0, seed=1, fixed=False):
+    """
+    Generate Poisson arrivals for each RequestClass, with the rates
+    multiplied by scale, for the given number of seconds. Service times are
+    exponential around each class's mean, or fixed at the mean.
+
+    The classes' streams are generated as one: a Poisson stream at the total
+    rate, where each arrival belongs to a class with probability in
+    proportion to the class's rate.
+    """
+    rates = list(itertools.accumulate(c.rate * scale for c in classes))
+    total = rates[-1] if rates else 0
+    if total <= 0:
+        return
+    # Rounding may put a draw at the total; the last class takes it.
+    rates[-1] = math.inf
+    rand = random.Random(seed).random
+    log = math.log
+    means = [c.service_time for c in classes]
+    flows = [c.flows for c in classes]
+    when = -log(1.0 - rand()) / total
+    while when < duration:
+        idx = bisect.bisect(rates, rand() * total)
+        flow_idx = int(rand() * flows[idx])
+        service = means[idx] if fixed else -log(1.0 - rand()) * means[idx]
+        yield when, idx, flow_idx, service
+        when -= log(1.0 - rand()) / total
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+# Copyright 2024-2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Force a sync of the Applications in each ArgoCD project.
+
+The projects are synced concurrently. A project whose sync fails is tried
+again after an exponential backoff with jitter, so that the retries of
+many projects do not arrive at the API server together, until it succeeds
+or the overall deadline is reached.
+"""
+
+import argparse
+import concurrent.futures
+import random
+import sys
+import threading
+import time
+
+import runner
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--project",
+    "-p",
+    type=str,
+    action="append",
+    help="Sync only this project. May be given more than once. "
+    "Default is every project.",
+)
+PARSER.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=4,
+    help="Number of projects to sync concurrently. Default=4.",
+)
+PARSER.add_argument(
+    "--backoff",
+    "-s",
+    type=float,
+    default=1.0,
+    help="Seconds to wait before the first retry of a project. The wait "
+    "doubles with each retry, with jitter. Default=1.",
+)
+PARSER.add_argument(
+    "--max-backoff",
+    type=float,
+    default=60.0,
+    help="Longest wait between retries, in seconds. Default=60.",
+)
+PARSER.add_argument(
+    "--deadline",
+    type=float,
+    default=1800.0,
+    help="Seconds to keep trying before giving up on the remaining "
+    "projects. Default=1800.",
+)
+PARSER.add_argument(
+    "--argocd",
+    type=str,
+    default="argocd",
+    help="The argocd command. Default=argocd.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+
+
+class SyncResult:
+    """The outcome of syncing one project."""
+
+    def __init__(self, project):
+        self.project = project
+        self.synced = False
+        self.attempts = 0
+        self.seconds = 0.0
+        self.error = None
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.jobs < 1:
+        print("The --jobs value must be at least 1.")
+        sys.exit(1)
+    if args.backoff <= 0 or args.max_backoff < args.backoff:
+        print("The --backoff value must be positive and no more than --max-backoff.")
+        sys.exit(1)
+
+    try:
+        projects = runner.run_this_always(f"{args.argocd} proj list -o name").split()
+    except RuntimeError as ex:
+        print(ex)
+        print("Unable to list argocd projects. Do you need to use 'argocd login'?")
+        sys.exit(1)
+    if args.project:
+        unknown = set(args.project) - set(projects)
+        if unknown:
+            print(f"No argocd project named {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        projects = [proj for proj in projects if proj in args.project]
+
+    results = sync_projects(args, projects)
+    display_summary(results)
+    if not all(result.synced for result in results):
+        sys.exit(1)
+
+
+def sync_projects(args, projects):
+    """
+    Sync the projects, using up to args.jobs concurrent syncs. Returns a
+    list of SyncResult, in the order of the projects.
+    """
+    deadline = time.monotonic() + args.deadline
+    stop = threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [
+            pool.submit(sync_project, args, proj, deadline, stop) for proj in projects
+        ]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                report(future.result())
+        except KeyboardInterrupt:
+            # Let the running syncs finish, but start no more syncs or
+            # retries.
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return [future.result() for future in futures]
+
+
+def sync_project(args, project, deadline, stop):
+    """Sync one project, retrying with backoff until the deadline."""
+    result = SyncResult(project)
+    cmd = f"{args.argocd} app sync --project {project} --force"
+    start = time.monotonic()
+    while not stop.is_set():
+        result.attempts += 1
+        try:
+            runner.run_this(args, cmd, timeout=deadline - time.monotonic())
+            result.synced = True
+            break
+        except RuntimeError as ex:
+            result.error = str(ex).strip()
+        delay = backoff(args, result.attempts)
+        if time.monotonic() + delay >= deadline:
+            result.error = f"deadline reached: {result.error}"
+            break
+        print(
+            f"  {project}: attempt {result.attempts} failed, "
+            f"retrying in {delay:.1f}s"
+        )
+        if stop.wait(delay):
+            break
+    result.seconds = time.monotonic() - start
+    return result
+
+
+def backoff(args, attempt):
+    """
+    Return the wait before the next try, after the given number of failed
+    attempts. The wait is drawn at random up to an exponentially growing
+    limit, so that retries spread out instead of arriving together.
+    """
+    limit = min(args.max_backoff, args.backoff * 2 ** (attempt - 1))
+    return random.uniform(args.backoff / 2, limit)
+
+
+def report(result):
+    """Report the outcome of one project as soon as it is known."""
+    if result.synced:
+        print(
+            f"  {result.project}: synced in {result.seconds:.1f}s "
+            f"({plural(result.attempts, 'attempt')})"
+        )
+    else:
+        # The last line of the error says why.
+        reason = (result.error or "").splitlines()[-1:] or ["interrupted"]
+        print(
+            f"  {result.project}: FAILED after {plural(result.attempts, 'attempt')}, "
+            f"{result.seconds:.1f}s: {reason[0]}"
+        )
+
+
+def plural(count, noun):
+    """Return the count and the noun, pluralized if need be."""
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
+def display_summary(results):
+    """Display a table of the result of each project."""
+    if not results:
+        print("No projects to sync.")
+        return
+    width = max(len("Project"), *(len(result.project) for result in results))
+    print("")
+    print(f"{'Project':<{width}}  {'Result':<6}  {'Attempts':>8}  Time")
+    for result in results:
+        outcome = "ok" if result.synced else "FAILED"
+        print(
+            f"{result.project:<{width}}  {outcome:<6}  {result.attempts:>8}  "
+            f"{result.seconds:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,77 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Find the ArgoCD Applications in an environment's bootstrap directories.
+"""
+
+import os
+import yaml
+
+import yamlscan
+
+APPLICATION_KIND = "Application"
+
+
+def bootstrap_dirs(env_dir):
+    """Return the environment's bootstrap directories, in order."""
+    return [
+        os.path.join(env_dir, name)
+        for name in sorted(os.listdir(env_dir))
+        if "bootstrap" in name and os.path.isdir(os.path.join(env_dir, name))
+    ]
+
+
+def find_applications(env_dir):
+    """
+    Return a list of (filename, doc) for each Application in the
+    environment's bootstraps. Raises RuntimeError for a file that is not
+    valid YAML, or an Application without a spec.source.path.
+    """
+    found = []
+    for bootstrap_dir in bootstrap_dirs(env_dir):
+        found.extend(dir_applications(bootstrap_dir))
+    return found
+
+
+def dir_applications(bootstrap_dir):
+    """Return a list of (filename, doc) for each Application in one bootstrap."""
+    found = []
+    for name in sorted(os.listdir(bootstrap_dir)):
+        if not name.endswith(".yaml") or name == "kustomization.yaml":
+            continue
+        filename = os.path.join(bootstrap_dir, name)
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                docs = list(yaml.load_all(f, Loader=yamlscan.SafeLoader))
+        except yaml.YAMLError as ex:
+            raise RuntimeError(f"YAML error in {filename}: {ex}") from ex
+        for doc in docs:
+            if not isinstance(doc, dict) or doc.get("kind") != APPLICATION_KIND:
+                continue
+            if source_path(doc) is None:
+                raise RuntimeError(f"spec.source.path missing in {filename}")
+            found.append((filename, doc))
+    return found
+
+
+def source_path(doc):
+    """Return the Application's normalized spec.source.path, or None."""
+    path = ((doc.get("spec") or {}).get("source") or {}).get("path")
+    if not isinstance(path, str):
+        return None
+    return os.path.normpath(path)
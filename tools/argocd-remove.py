@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+# Copyright 2024-2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Remove ArgoCD and its CRDs. This may be needed to upgrade ArgoCD when the
+upgrade involves a big jump that may not be easy to handle using the
+rolling-upgrade procedures described in its docs.
+
+This will not affect the services that ArgoCD was monitoring.
+
+The procedure:
+- Uninstall the ArgoCD helm chart.
+- Wait for the ArgoCD pods to be gone.
+- Remove the finalizers from the Application resources.
+- Delete the argoproj.io CRDs, which deletes the Application and
+  AppProject resources, and wait for them to be gone.
+- Delete the ArgoCD ConfigMaps.
+
+After this, you may install a new ArgoCD helm chart, set its password, add
+the gitops repository, and re-deploy the AppProject and Application resources
+(the bootstraps). The new ArgoCD will then begin monitoring your still-
+running services.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import shlex
+import sys
+
+import kubewatch
+import runner
+
+CRDS = [
+    "argocdextensions.argoproj.io",
+    "applications.argoproj.io",
+    "appprojects.argoproj.io",
+    "applicationsets.argoproj.io",
+]
+
+FINALIZER_PATCH = '{"metadata":{"finalizers":null}}'
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--namespace",
+    type=str,
+    default="argocd",
+    help="Namespace that ArgoCD is installed in. Default=argocd.",
+)
+PARSER.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=8,
+    help="Number of Applications to patch concurrently. Default=8.",
+)
+PARSER.add_argument(
+    "--pod-timeout",
+    type=float,
+    default=120.0,
+    help="Seconds for each ArgoCD pod to go away. Default=120.",
+)
+PARSER.add_argument(
+    "--crd-timeout",
+    type=float,
+    default=120.0,
+    help="Seconds for each argoproj.io CRD to go away. Default=120.",
+)
+PARSER.add_argument(
+    "--kubectl",
+    type=str,
+    default="kubectl",
+    help="The kubectl command. Default=kubectl.",
+)
+PARSER.add_argument(
+    "--helm",
+    type=str,
+    default="helm",
+    help="The helm command. Default=helm.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.jobs < 1:
+        print("The --jobs value must be at least 1.")
+        sys.exit(1)
+    try:
+        uninstall_chart(args)
+        wait_for_pods(args)
+        remove_finalizers(args)
+        delete_crds(args)
+        delete_configmaps(args)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+    print("")
+    print("ArgoCD, and its resources and CRDs, has been removed.")
+    print("")
+
+
+def uninstall_chart(args):
+    """Uninstall the ArgoCD helm chart, if there is one."""
+    charts = json.loads(
+        runner.run_this_always(f"{args.helm} list -n {args.namespace} -o json") or "[]"
+    )
+    if charts:
+        runner.run_this(
+            args, f"{args.helm} uninstall -n {args.namespace} {charts[0]['name']}"
+        )
+
+
+def wait_for_pods(args):
+    """Wait for each of the ArgoCD pods to go away."""
+    if args.dryrun:
+        return
+    remaining = kubewatch.wait_until_gone(
+        args.kubectl, "pods", ["-n", args.namespace], timeout=args.pod_timeout
+    )
+    if remaining:
+        raise RuntimeError(
+            f"Some ArgoCD pods are still running: {', '.join(sorted(remaining))}"
+        )
+
+
+def remove_finalizers(args):
+    """
+    Remove the finalizers from the Applications, listing them all with one
+    call and patching up to args.jobs of them at a time.
+    """
+    apps = json.loads(
+        runner.run_this_always(
+            f"{args.kubectl} get applications.argoproj.io -n {args.namespace} "
+            "--ignore-not-found -o json"
+        )
+        or '{"items": []}'
+    )
+    names = [
+        item["metadata"]["name"]
+        for item in apps["items"]
+        if item["metadata"].get("finalizers")
+    ]
+    errs = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {
+            pool.submit(
+                runner.run_this,
+                args,
+                f"{args.kubectl} patch -n {args.namespace} "
+                f"applications.argoproj.io {name} "
+                f"-p {shlex.quote(FINALIZER_PATCH)} --type=merge",
+            ): name
+            for name in names
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                if future.result() is not None:
+                    print(f"Patched {futures[future]}")
+            except RuntimeError as ex:
+                errs.append(f"{futures[future]}: {str(ex).strip()}")
+    if errs:
+        raise RuntimeError("Unable to remove finalizers:\n  " + "\n  ".join(errs))
+
+
+def delete_crds(args):
+    """Delete the argoproj.io CRDs with one call, and wait for them to go."""
+    runner.run_this(
+        args,
+        f"{args.kubectl} delete crd {' '.join(CRDS)} --ignore-not-found --wait=false",
+    )
+    if args.dryrun:
+        return
+    remaining = kubewatch.wait_until_gone(
+        args.kubectl, "crd", names=CRDS, timeout=args.crd_timeout
+    )
+    if remaining:
+        raise RuntimeError(f"ArgoCD CRDs still exist: {', '.join(sorted(remaining))}")
+
+
+def delete_configmaps(args):
+    """Delete the ConfigMaps in the ArgoCD namespace."""
+    output = runner.run_this(
+        args, f"{args.kubectl} delete cm -n {args.namespace} --all"
+    )
+    for line in (output or "").splitlines():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark verify-deployment.py and unpack-manifest.py against a synthetic
+environment shaped like environments/example-env.
+
+The benchmark builds a scratch workarea containing a copy of the tools, a
+generated environment, and a generated release tarball. Stand-in 'kustomize',
+'git', and 'make' executables with a configurable latency are put on the
+PATH, so it runs offline and does not need a cluster or network access.
+Each phase is timed and the results are written as JSON.
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import yaml
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--bootstraps",
+    "-b",
+    type=int,
+    default=7,
+    help="Number of bootstrap directories. Default=7.",
+)
+PARSER.add_argument(
+    "--applications",
+    "-a",
+    type=int,
+    default=14,
+    help="Number of Applications, spread across the bootstraps. Default=14.",
+)
+PARSER.add_argument(
+    "--components",
+    "-c",
+    type=int,
+    default=2,
+    help="Number of components used by each Application. Default=2.",
+)
+PARSER.add_argument(
+    "--crd-size",
+    type=int,
+    default=1024,
+    help="Size of each Application's CRD file, in KB. Default=1024.",
+)
+PARSER.add_argument(
+    "--latency",
+    type=float,
+    default=0.2,
+    help="Seconds each stand-in kustomize build takes. Default=0.2.",
+)
+PARSER.add_argument(
+    "--git-latency",
+    type=float,
+    default=0.02,
+    help="Seconds each stand-in git command takes. Default=0.02.",
+)
+PARSER.add_argument(
+    "--make-latency",
+    type=float,
+    default=0.05,
+    help="Seconds the stand-in 'make kustomize' takes. Default=0.05.",
+)
+PARSER.add_argument(
+    "--startup-runs",
+    type=int,
+    default=10,
+    help="Number of times to run each startup phase. Default=10.",
+)
+PARSER.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="The --jobs value for the parallel verify phases. "
+    "Default is the number of CPUs.",
+)
+PARSER.add_argument(
+    "--output",
+    "-o",
+    type=str,
+    default="bench-results.json",
+    help="File to write the JSON results to. Default=bench-results.json.",
+)
+PARSER.add_argument(
+    "--keep",
+    action="store_true",
+    help="Keep the scratch workarea and print its location.",
+)
+
+ENV = "bench"
+
+STUB_KUSTOMIZE = """#!/bin/bash
+# Stand-in kustomize for benchmarks.
+if [[ $1 == version ]]; then
+    echo v5.5.0
+    exit 0
+fi
+sleep "${BENCH_KUSTOMIZE_LATENCY:-0}"
+if [[ $1 != build ]] || [[ ! -f $2/kustomization.yaml ]]; then
+    echo "Error: unable to find kustomization in $2" >&2
+    exit 1
+fi
+cat "$2"/*.yaml
+"""
+
+STUB_GIT = """#!/bin/bash
+# Stand-in git for benchmarks.
+sleep "${BENCH_GIT_LATENCY:-0}"
+case "$1" in
+rev-parse) echo true ;;
+esac
+exit 0
+"""
+
+STUB_MAKE = """#!/bin/bash
+# Stand-in make for benchmarks; bin/kustomize is already in place.
+sleep "${BENCH_MAKE_LATENCY:-0}"
+exit 0
+"""
+
+
+def write_file(path, text, mode=0o644):
+    """Write a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.chmod(path, mode)
+
+
+def synthetic_crd_text(app, size_kb, release):
+    """Return a CRD file for the Application of roughly size_kb KB."""
+    docs = []
+    written = 0
+    idx = 0
+    while written < size_kb * 1024:
+        props = {
+            f"field{j}": {
+                "type": "string",
+                "description": f"{app} {release} field {j} " * 8,
+            }
+            for j in range(50)
+        }
+        doc = {
+            "apiVersion": "apiextensions.k8s.io/v1",
+            "kind": "CustomResourceDefinition",
+            "metadata": {"name": f"kind{idx}s.{app}.example.com"},
+            "spec": {
+                "group": f"{app}.example.com",
+                "names": {"kind": f"Kind{idx}", "plural": f"kind{idx}s"},
+                "scope": "Namespaced",
+                "versions": [
+                    {
+                        "name": "v1",
+                        "served": True,
+                        "storage": True,
+                        "schema": {
+                            "openAPIV3Schema": {
+                                "type": "object",
+                                "properties": {
+                                    "spec": {"type": "object", "properties": props}
+                                },
+                            }
+                        },
+                    }
+                ],
+            },
+        }
+        text = yaml.dump(doc)
+        docs.append(text)
+        written += len(text)
+        idx += 1
+    return "---\n" + "---\n".join(docs)
+
+
+def generate_environment(workarea, args):
+    """Generate the bootstraps, components, and Application dirs."""
+    env_dir = f"{workarea}/environments/{ENV}"
+    components = []
+    for comp in range(args.components):
+        name = f"components/comp{comp}"
+        components.append(name)
+        write_file(
+            f"{env_dir}/{name}/kustomization.yaml",
+            yaml.dump(
+                {
+                    "apiVersion": "kustomize.config.k8s.io/v1alpha1",
+                    "kind": "Component",
+                    "images": [
+                        {
+                            "name": f"example.com/img{comp}",
+                            "newName": f"mirror.example.com/img{comp}",
+                        }
+                    ],
+                }
+            ),
+        )
+
+    bootstraps = {}
+    for app in range(args.applications):
+        bootstrap = app % args.bootstraps
+        level = bootstrap // 2
+        group = bootstrap % 2
+        bootstrap_dir = f"{level}-bootstrap{group}"
+        app_name = f"app{app}"
+        application = {
+            "apiVersion": "argoproj.io/v1alpha1",
+            "kind": "Application",
+            "metadata": {"name": f"{level}-{app_name}", "namespace": "argocd"},
+            "spec": {
+                "project": "rabbit",
+                "source": {
+                    "repoURL": "https://example.com/gitops",
+                    "targetRevision": "HEAD",
+                    "path": f"environments/{ENV}/{app_name}",
+                },
+                "destination": {"server": "https://kubernetes.default.svc"},
+            },
+        }
+        filename = f"{level}-{app_name}.yaml"
+        write_file(f"{env_dir}/{bootstrap_dir}/{filename}", yaml.dump(application))
+        bootstraps.setdefault(bootstrap_dir, []).append(filename)
+
+        write_file(
+            f"{env_dir}/{app_name}/kustomization.yaml",
+            yaml.dump(
+                {
+                    "apiVersion": "kustomize.config.k8s.io/v1beta1",
+                    "kind": "Kustomization",
+                    "resources": [
+                        f"{app_name}-crds.yaml",
+                        f"{app_name}.yaml",
+                        f"default-{app_name}.yaml",
+                    ],
+                    "components": [f"../{c}" for c in components],
+                }
+            ),
+        )
+        write_file(
+            f"{env_dir}/{app_name}/default-{app_name}.yaml",
+            yaml.dump(
+                {
+                    "apiVersion": f"{app_name}.example.com/v1",
+                    "kind": "Kind0",
+                    "metadata": {"name": "default", "namespace": "default"},
+                }
+            ),
+        )
+
+    for bootstrap_dir, files in bootstraps.items():
+        write_file(
+            f"{env_dir}/{bootstrap_dir}/kustomization.yaml",
+            yaml.dump(
+                {
+                    "apiVersion": "kustomize.config.k8s.io/v1beta1",
+                    "kind": "Kustomization",
+                    "resources": sorted(files),
+                }
+            ),
+        )
+
+
+def generate_tarball(filename, args, release, changed):
+    """
+    Generate a release tarball with each Application's manifests. Only
+    the first 'changed' Applications have CRDs specific to this release.
+    """
+
+    def add(tar, name, text):
+        data = text.encode()
+        info = tarfile.TarInfo(f"./{name}")
+        info.size = len(data)
+        info.mode = 0o644
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+
+    with tarfile.open(filename, "w") as tar:
+        add(tar, "manifest-release.txt", f"{release}\n")
+        for app in range(args.applications):
+            app_name = f"app{app}"
+            crd_release = release if app < changed else "base"
+            crds = synthetic_crd_text(app_name, args.crd_size, crd_release)
+            add(tar, f"{app_name}/{app_name}-crds.yaml", crds)
+            container = {"name": app_name, "image": "example.com/img0"}
+            deployment = {
+                "apiVersion": "apps/v1",
+                "kind": "Deployment",
+                "metadata": {"name": app_name, "namespace": app_name},
+                "spec": {"template": {"spec": {"containers": [container]}}},
+            }
+            add(tar, f"{app_name}/{app_name}.yaml", yaml.dump(deployment))
+            add(tar, f"{app_name}/api-version.txt", f"{app_name}.example.com/v1\n")
+
+
+def make_workarea(workarea, args):
+    """Copy the tools and create the stand-in executables."""
+    shutil.copytree(
+        TOOLS_DIR,
+        f"{workarea}/tools",
+        ignore=shutil.ignore_patterns("__pycache__", "benchmarks"),
+    )
+    write_file(f"{workarea}/bin/kustomize", STUB_KUSTOMIZE, 0o755)
+    write_file(f"{workarea}/stubs/git", STUB_GIT, 0o755)
+    write_file(f"{workarea}/stubs/make", STUB_MAKE, 0o755)
+    generate_environment(workarea, args)
+
+
+def run_phase(workarea, env, name, cmd):
+    """Run one phase of the benchmark and time it."""
+    start = time.perf_counter()
+    res = subprocess.run(
+        cmd, cwd=workarea, env=env, capture_output=True, text=True, check=False
+    )
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<40} {elapsed:>8.3f}s  rc={res.returncode}")
+    if res.returncode != 0:
+        print(res.stdout[-2000:])
+        print(res.stderr[-2000:])
+    return {"name": name, "seconds": round(elapsed, 4), "returncode": res.returncode}
+
+
+def run_startup_phase(workarea, env, name, cmd, runs):
+    """Run a quick command several times and report its median time."""
+    times = []
+    returncode = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        res = subprocess.run(
+            cmd, cwd=workarea, env=env, capture_output=True, text=True, check=False
+        )
+        times.append(time.perf_counter() - start)
+        returncode = returncode or res.returncode
+    times.sort()
+    median = times[len(times) // 2]
+    print(f"  {name:<40} {median:>8.3f}s  min={times[0]:.3f}s  rc={returncode}")
+    return {
+        "name": name,
+        "median_seconds": round(median, 4),
+        "min_seconds": round(times[0], 4),
+        "runs": runs,
+        "returncode": returncode,
+    }
+
+
+def tree_size(path):
+    """Return the number of files and total bytes under the path."""
+    files = 0
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            total += os.path.getsize(os.path.join(root, name))
+    return files, total
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.bootstraps < 1 or args.applications < 1:
+        print("There must be at least one bootstrap and one Application.")
+        sys.exit(1)
+    if args.startup_runs < 1:
+        print("The --startup-runs value must be at least 1.")
+        sys.exit(1)
+
+    workarea = tempfile.mkdtemp(prefix="bench-tools-")
+    try:
+        make_workarea(workarea, args)
+        tar1 = f"{workarea}/manifests-1.tar"
+        tar2 = f"{workarea}/manifests-2.tar"
+        generate_tarball(tar1, args, "v0.1.0", 0)
+        # The next release changes the CRDs of half of the Applications.
+        generate_tarball(tar2, args, "v0.1.1", args.applications // 2)
+
+        env = dict(os.environ)
+        env["PATH"] = f"{workarea}/stubs:{env['PATH']}"
+        env["BENCH_KUSTOMIZE_LATENCY"] = str(args.latency)
+        env["BENCH_GIT_LATENCY"] = str(args.git_latency)
+        env["BENCH_MAKE_LATENCY"] = str(args.make_latency)
+
+        unpack = [sys.executable, "tools/unpack-manifest.py", "-e", ENV, "-m"]
+        verify = [sys.executable, "tools/verify-deployment.py", "-e", ENV]
+        phases = [
+            ("unpack-manifest, first release", unpack + [tar1]),
+            ("unpack-manifest, same release again", unpack + [tar1]),
+            (
+                "verify-deployment, serial, no cache",
+                verify + ["-j", "1", "--no-cache"],
+            ),
+            (
+                f"verify-deployment, {args.jobs} jobs, no cache",
+                verify + ["-j", str(args.jobs), "--no-cache"],
+            ),
+            ("verify-deployment, cold cache", verify + ["-j", str(args.jobs)]),
+            ("verify-deployment, warm cache", verify + ["-j", str(args.jobs)]),
+            ("unpack-manifest, next release", unpack + [tar2]),
+            ("verify-deployment, after next release", verify + ["-j", str(args.jobs)]),
+        ]
+        print(f"Workarea: {workarea}")
+        results = [run_phase(workarea, env, name, cmd) for name, cmd in phases]
+
+        # Startup: a verify with nothing to build, after the kustomize
+        # version stamp and the build cache are warm, and each tool's --help.
+        entry = [sys.executable, "tools/gitops.py"]
+        startup_phases = [
+            ("verify-deployment, no-op", verify + ["-j", str(args.jobs)]),
+            (
+                "gitops.py verify-deployment, no-op",
+                entry + ["verify-deployment"] + verify[2:],
+            ),
+        ] + [
+            (f"{tool} --help", [sys.executable, f"tools/{tool}.py", "--help"])
+            for tool in ["verify-deployment", "unpack-manifest", "gitops"]
+        ]
+        print(f"Startup, median of {args.startup_runs} runs:")
+        # Measure startup as users see it, with bytecode cached in __pycache__.
+        startup_env = dict(env)
+        startup_env.pop("PYTHONDONTWRITEBYTECODE", None)
+        startup = [
+            run_startup_phase(workarea, startup_env, name, cmd, args.startup_runs)
+            for name, cmd in startup_phases
+        ]
+        files, total = tree_size(f"{workarea}/environments/{ENV}")
+
+        report = {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "host": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "libyaml": yaml.__with_libyaml__,
+            },
+            "parameters": {
+                "bootstraps": args.bootstraps,
+                "applications": args.applications,
+                "components": args.components,
+                "crd_size_kb": args.crd_size,
+                "kustomize_latency": args.latency,
+                "git_latency": args.git_latency,
+                "make_latency": args.make_latency,
+                "jobs": args.jobs,
+            },
+            "environment": {"files": files, "bytes": total},
+            "phases": results,
+            "startup": startup,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Results written to {args.output}")
+        if any(r["returncode"] != 0 for r in results + startup):
+            sys.exit(1)
+    finally:
+        if args.keep:
+            print(f"Keeping {workarea}")
+        else:
+            shutil.rmtree(workarea, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the header-only YAML scanner with a full YAML load, using a
+synthetic multi-document CRD bundle.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import yamlscan  # pylint: disable=wrong-import-position
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--size",
+    "-s",
+    type=int,
+    default=50,
+    help="Size of the synthetic CRD bundle, in MB. Default=50.",
+)
+PARSER.add_argument(
+    "--pure-python",
+    action="store_true",
+    help="Also time the pure-Python YAML loader. This is very slow.",
+)
+
+
+def synthetic_crd(idx):
+    """Return the YAML text of a synthetic CRD with a large schema."""
+    props = {
+        f"field{j}": {
+            "type": "object",
+            "description": "x" * 60,
+            "properties": {
+                f"sub{k}": {"type": "string", "description": "y" * 40}
+                for k in range(10)
+            },
+        }
+        for j in range(40)
+    }
+    doc = {
+        "apiVersion": "apiextensions.k8s.io/v1",
+        "kind": "CustomResourceDefinition",
+        "metadata": {
+            "name": f"kind{idx}s.nnf.cray.hpe.com",
+            "annotations": {"controller-gen.kubebuilder.io/version": "v0.16.3"},
+        },
+        "spec": {
+            "group": "nnf.cray.hpe.com",
+            "names": {"kind": f"Kind{idx}", "plural": f"kind{idx}s"},
+            "scope": "Namespaced",
+            "versions": [
+                {
+                    "name": f"v1alpha{v}",
+                    "served": True,
+                    "storage": v == 7,
+                    "schema": {
+                        "openAPIV3Schema": {
+                            "type": "object",
+                            "properties": {
+                                "spec": {"type": "object", "properties": props}
+                            },
+                        }
+                    },
+                }
+                for v in range(1, 8)
+            ],
+        },
+    }
+    return yaml.dump(doc, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper))
+
+
+def write_bundle(filename, size_mb):
+    """Write a CRD bundle of roughly size_mb megabytes."""
+    written = 0
+    idx = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        while written < size_mb * 1024 * 1024:
+            text = f"---\n{synthetic_crd(idx)}"
+            f.write(text)
+            written += len(text)
+            idx += 1
+    return idx
+
+
+def scan_headers(filename):
+    """Count the documents using the header scanner."""
+    return sum(1 for _ in yamlscan.scan_documents(filename))
+
+
+def load_all(filename, loader):
+    """Count the documents using a full YAML load."""
+    with open(filename, "r", encoding="utf-8") as f:
+        return sum(1 for _ in yaml.load_all(f, Loader=loader))
+
+
+def measure(queue, func, *func_args):
+    """Run func in this process and report its time and peak memory."""
+    start = time.perf_counter()
+    count = func(*func_args)
+    elapsed = time.perf_counter() - start
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((count, elapsed, maxrss))
+
+
+def run_measurement(func, *func_args):
+    """Measure func in a child process so that peak memory is its own."""
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(queue, func, *func_args))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bundle = os.path.join(tmpdir, "bench-crds.yaml")
+        docs = write_bundle(bundle, args.size)
+        size = os.path.getsize(bundle)
+        print(f"Synthetic bundle: {docs} CRDs, {size / (1024 * 1024):.1f} MB")
+        print(f"libyaml available: {yaml.__with_libyaml__}")
+
+        cases = [("header scan", scan_headers, bundle)]
+        if yaml.__with_libyaml__:
+            cases.append(
+                ("safe_load_all (libyaml)", load_all, bundle, yaml.CSafeLoader)
+            )
+        if args.pure_python:
+            cases.append(
+                ("safe_load_all (pure Python)", load_all, bundle, yaml.SafeLoader)
+            )
+
+        print(
+            f"{'method':<30} {'docs':>6} {'seconds':>9} {'MB/s':>8} {'max RSS MB':>11}"
+        )
+        for label, func, *func_args in cases:
+            count, elapsed, maxrss = run_measurement(func, *func_args)
+            rate = size / (1024 * 1024) / elapsed
+            print(
+                f"{label:<30} {count:>6} {elapsed:>9.2f} {rate:>8.1f} "
+                f"{maxrss / 1024:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
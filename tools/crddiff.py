@@ -0,0 +1,244 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the CustomResourceDefinitions in two versions of a manifest, one
+API version at a time.
+
+Each CRD is summarized by its served, storage, and deprecated versions and
+each version's openAPIV3Schema, without the fields that only document it.
+Comparing the summaries says exactly which CRDs, versions, and schema fields
+changed, and whether the change can be rolled out over the running software
+or needs it to be undeployed first. Removed versions, and schema fields that
+were removed, retyped, newly required, or had enum values taken away, are
+incompatible; added optional fields and other schema changes are not.
+"""
+
+import collections
+import yaml
+
+import yamlscan
+
+CRD_KIND = "CustomResourceDefinition"
+
+# Schema keys that only document a field, and do not change what is valid.
+DOC_KEYS = {"description", "example", "externalDocs", "title"}
+
+# Schema keys whose subschemas are compared field by field.
+PROPERTIES = "properties"
+ITEMS = "items"
+ADDITIONAL = "additionalProperties"
+
+# The keywords that hold subschemas: a map of them, a list, or just one.
+SCHEMA_MAPS = {PROPERTIES, "patternProperties"}
+SCHEMA_LISTS = {"allOf", "anyOf", "oneOf"}
+SCHEMA_VALUES = {ITEMS, ADDITIONAL, "not"}
+
+# One difference between the old and new versions of a CRD. The version is
+# None when the change applies to the whole CRD. A breaking change is one
+# that existing objects or clients of the CRD may not survive.
+CrdChange = collections.namedtuple(
+    "CrdChange", ["crd", "version", "change", "detail", "breaking"]
+)
+
+
+def strip_docs(schema):
+    """
+    Return the schema without the keys that only document it. Only the
+    keywords that hold subschemas are followed; values such as defaults
+    and enums are data, and are kept as they are.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    stripped = {}
+    for key, value in schema.items():
+        if key in DOC_KEYS:
+            continue
+        if key in SCHEMA_MAPS and isinstance(value, dict):
+            value = {name: strip_docs(sub) for name, sub in value.items()}
+        elif key in SCHEMA_LISTS and isinstance(value, list):
+            value = [strip_docs(sub) for sub in value]
+        elif key in SCHEMA_VALUES:
+            value = strip_docs(value)
+        stripped[key] = value
+    return stripped
+
+
+def summarize_crd(doc):
+    """Summarize one CRD document by its versions."""
+    versions = {}
+    storage = None
+    for ver in doc.get("spec", {}).get("versions") or []:
+        schema = strip_docs((ver.get("schema") or {}).get("openAPIV3Schema"))
+        versions[ver["name"]] = {
+            "served": bool(ver.get("served")),
+            "storage": bool(ver.get("storage")),
+            "deprecated": bool(ver.get("deprecated")),
+            "schema": schema,
+            "schema_hash": yamlscan.canonical_hash(schema),
+        }
+        if ver.get("storage"):
+            storage = ver["name"]
+    return {"storage": storage, "versions": versions}
+
+
+def summarize_crds(stream):
+    """
+    Summarize every CRD in the YAML stream, which is bytes, a string, or an
+    open file. Returns a dict of CRD name to summary.
+    """
+    crds = {}
+    for doc in yaml.load_all(stream, Loader=yamlscan.SafeLoader):
+        if isinstance(doc, dict) and doc.get("kind") == CRD_KIND:
+            crds[doc["metadata"]["name"]] = summarize_crd(doc)
+    return crds
+
+
+def diff_crds(old, new):
+    """Compare two CRD summaries dicts and return a list of CrdChange."""
+    changes = []
+    for name in sorted(set(old) | set(new)):
+        if name not in new:
+            changes.append(CrdChange(name, None, "removed", "CRD removed", True))
+            continue
+        if name not in old:
+            changes.append(CrdChange(name, None, "added", "CRD added", False))
+            continue
+        changes.extend(diff_crd(name, old[name], new[name]))
+    return changes
+
+
+def diff_crd(name, old, new):
+    """Compare the summaries of one CRD."""
+    changes = []
+    old_versions = old["versions"]
+    new_versions = new["versions"]
+    for ver in sorted(set(old_versions) | set(new_versions)):
+        if ver not in new_versions:
+            changes.append(CrdChange(name, ver, "removed", "version removed", True))
+            continue
+        if ver not in old_versions:
+            changes.append(CrdChange(name, ver, "added", "version added", False))
+            continue
+        before = old_versions[ver]
+        after = new_versions[ver]
+        if before["schema_hash"] != after["schema_hash"]:
+            for path, detail, breaking in diff_schema(
+                before["schema"], after["schema"], ""
+            ):
+                where = path or "openAPIV3Schema"
+                changes.append(
+                    CrdChange(name, ver, "schema", f"{where}: {detail}", breaking)
+                )
+        if before["served"] != after["served"]:
+            detail = "now served" if after["served"] else "no longer served"
+            changes.append(
+                CrdChange(name, ver, "served", detail, not after["served"])
+            )
+        if before["deprecated"] != after["deprecated"]:
+            detail = "now deprecated" if after["deprecated"] else "undeprecated"
+            changes.append(CrdChange(name, ver, "deprecated", detail, False))
+    if old["storage"] != new["storage"]:
+        # Objects stored at the old version are still readable as long as
+        # that version is still part of the CRD.
+        changes.append(
+            CrdChange(
+                name,
+                new["storage"],
+                "storage",
+                f"storage version moved from {old['storage']} to {new['storage']}",
+                old["storage"] not in new_versions,
+            )
+        )
+    return changes
+
+
+def diff_schema(old, new, path):
+    """
+    Compare two versions of a schema, or of one field's subschema, and
+    return a list of (field path, detail, breaking).
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        if old == new:
+            return []
+        return [(path, "schema changed", True)]
+    changes = []
+    if old.get("type") != new.get("type"):
+        changes.append(
+            (path, f"type changed from {old.get('type')} to {new.get('type')}", True)
+        )
+    if "enum" in new and "enum" not in old:
+        changes.append((path, "now restricted to an enum", True))
+    elif "enum" in old and "enum" not in new:
+        changes.append((path, "no longer restricted to an enum", False))
+    elif "enum" in new:
+        removed = [v for v in old["enum"] if v not in new["enum"]]
+        added = [v for v in new["enum"] if v not in old["enum"]]
+        if removed:
+            shown = ", ".join(str(v) for v in removed)
+            changes.append((path, f"enum values removed: {shown}", True))
+        if added:
+            shown = ", ".join(str(v) for v in added)
+            changes.append((path, f"enum values added: {shown}", False))
+    if old.get("x-kubernetes-preserve-unknown-fields") and not new.get(
+        "x-kubernetes-preserve-unknown-fields"
+    ):
+        changes.append((path, "unknown fields no longer preserved", True))
+
+    newly_required = sorted(set(new.get("required", [])) - set(old.get("required", [])))
+    for field in newly_required:
+        changes.append((join(path, field), "now required", True))
+
+    old_props = old.get(PROPERTIES) or {}
+    new_props = new.get(PROPERTIES) or {}
+    for field in sorted(set(old_props) | set(new_props)):
+        if field not in new_props:
+            changes.append((join(path, field), "field removed", True))
+        elif field not in old_props:
+            if field not in newly_required:
+                changes.append((join(path, field), "optional field added", False))
+        else:
+            changes.extend(
+                diff_schema(old_props[field], new_props[field], join(path, field))
+            )
+    for key, suffix in ((ITEMS, "[]"), (ADDITIONAL, "{}")):
+        if key in old or key in new:
+            changes.extend(
+                diff_schema(old.get(key), new.get(key), f"{path}{suffix}")
+            )
+
+    compared = {"type", "enum", "required", PROPERTIES, ITEMS, ADDITIONAL}
+    compared.add("x-kubernetes-preserve-unknown-fields")
+    other = sorted(
+        key
+        for key in set(old) | set(new)
+        if key not in compared and old.get(key) != new.get(key)
+    )
+    if other:
+        changes.append((path, f"{', '.join(other)} changed", False))
+    return changes
+
+
+def join(path, field):
+    """Return the path of a field within the given path."""
+    return f"{path}.{field}" if path else field
+
+
+def format_change(change):
+    """Return a one-line description of a CrdChange."""
+    where = change.crd if change.version is None else f"{change.crd} {change.version}"
+    return f"{where}: {change.detail}"
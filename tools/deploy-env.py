@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+# Copyright 2024-2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deploy an environment's bootstraps, one level at a time.
+
+The level of a bootstrap directory is the number before the first '-' in
+its name. The directories in a level, such as 0-bootstrap0, 0-bootstrap1,
+and 0-bootstrap-sticky, are applied concurrently. The next level is not
+started until every Application in this level is Healthy and Synced, which
+is found by watching the Applications rather than by polling them.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import time
+
+import applications
+import kubewatch
+import runner
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    required=True,
+    help="Name of environment to deploy.",
+)
+PARSER.add_argument(
+    "--level",
+    "-l",
+    type=int,
+    help="Deploy bootstraps up to LEVEL, where LEVEL is a number >= 0. "
+    "The default is to deploy all levels.",
+)
+PARSER.add_argument(
+    "--timeout",
+    "-t",
+    type=float,
+    default=600.0,
+    help="Seconds to wait for the Applications in a level to become "
+    "Healthy and Synced. Default=600.",
+)
+PARSER.add_argument(
+    "--no-wait",
+    action="store_true",
+    help="Apply every level without waiting for its Applications.",
+)
+PARSER.add_argument(
+    "--kubectl",
+    type=str,
+    default="kubectl",
+    help="The kubectl command. Default=kubectl.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+
+HEALTHY = "Healthy"
+SYNCED = "Synced"
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if "/" in args.env:
+        print("The environment name must not include a slash character.")
+        sys.exit(1)
+    env_dir = f"environments/{args.env}"
+    if os.path.isdir(env_dir) is False:
+        print(f"Environment {args.env} does not exist")
+        sys.exit(1)
+    if args.level is not None and args.level < 0:
+        print("The -l arg must be a level number")
+        sys.exit(1)
+
+    try:
+        levels = bootstrap_levels(env_dir)
+        for level, dirs in levels.items():
+            if args.level is not None and level > args.level:
+                break
+            deploy_level(args, level, dirs)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+
+def bootstrap_levels(env_dir):
+    """Return an ordered dict of level number to its bootstrap directories."""
+    levels = collections.defaultdict(list)
+    for bootstrap_dir in applications.bootstrap_dirs(env_dir):
+        prefix = os.path.basename(bootstrap_dir).split("-", 1)[0]
+        if not prefix.isdigit():
+            raise RuntimeError(f"Bootstrap {bootstrap_dir} does not begin with a level")
+        levels[int(prefix)].append(bootstrap_dir)
+    return collections.OrderedDict(sorted(levels.items()))
+
+
+def deploy_level(args, level, dirs):
+    """Apply the bootstraps in one level, then wait for its Applications."""
+    print(f"Level {level}: applying {', '.join(os.path.basename(d) for d in dirs)}")
+    start = time.monotonic()
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(dirs)) as pool:
+        futures = {
+            pool.submit(runner.run_this, args, f"{args.kubectl} apply -k {d}"): d
+            for d in dirs
+        }
+        # Report in directory order, so the output of a level is stable.
+        for future, bootstrap_dir in futures.items():
+            try:
+                output = future.result()
+            except RuntimeError as ex:
+                print(f"  {bootstrap_dir}: {str(ex).strip()}")
+                failed.append(bootstrap_dir)
+                continue
+            for line in (output or "").splitlines():
+                print(f"  {line}")
+    if failed:
+        raise RuntimeError(f"Level {level}: unable to apply {', '.join(failed)}")
+    if args.dryrun or args.no_wait:
+        return
+
+    wanted = set()
+    for bootstrap_dir in dirs:
+        for _, doc in applications.dir_applications(bootstrap_dir):
+            meta = doc["metadata"]
+            wanted.add((meta.get("namespace") or "argocd", meta["name"]))
+    if wanted:
+        wait_for_applications(args, level, wanted, start + args.timeout)
+    print(f"Level {level}: done in {time.monotonic() - start:.1f}s")
+
+
+def wait_for_applications(args, level, wanted, deadline):
+    """
+    Wait for each (namespace, name) Application to be Healthy and Synced,
+    reporting each change in its status. Raises RuntimeError at the
+    deadline.
+    """
+    namespaces = {ns for ns, _ in wanted}
+    if len(namespaces) == 1:
+        scope = ["-n", namespaces.pop()]
+    else:
+        scope = ["--all-namespaces"]
+    print(f"Level {level}: waiting for {len(wanted)} Applications")
+    status = {}
+    pending = set(wanted)
+    watch = kubewatch.KubectlWatch(args.kubectl, ["applications.argoproj.io"] + scope)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                waiting = ", ".join(
+                    f"{name} ({status.get((ns, name), 'not found')})"
+                    for ns, name in sorted(pending)
+                )
+                raise RuntimeError(f"Level {level}: timed out waiting for {waiting}")
+            event = watch.next_event(remaining)
+            if event is None:
+                continue
+            obj = event.get("object") or {}
+            meta = obj.get("metadata") or {}
+            key = (meta.get("namespace"), meta.get("name"))
+            if key not in wanted:
+                continue
+            if event.get("type") == "DELETED":
+                state = "deleted"
+            else:
+                app_status = obj.get("status") or {}
+                health = (app_status.get("health") or {}).get("status", "Unknown")
+                sync = (app_status.get("sync") or {}).get("status", "Unknown")
+                state = f"{health}/{sync}"
+            if status.get(key) != state:
+                status[key] = state
+                print(f"  {key[1]}: {state}")
+            if state == f"{HEALTHY}/{SYNCED}":
+                pending.discard(key)
+            else:
+                pending.add(key)
+    finally:
+        watch.close()
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
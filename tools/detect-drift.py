@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare an environment's manifests, as ArgoCD would apply them, with a
+snapshot of the cluster taken with 'kubectl get -o json', and report the
+resources that were added, removed, or changed in the cluster.
+"""
+
+import argparse
+import json
+import os
+import sys
+import yaml
+
+import applications
+import drift
+import kustomization
+import kustomizebin
+import manifestindex
+import renderstate
+import runner
+import timings
+import yamlscan
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    required=True,
+    help="Name of environment to compare.",
+)
+PARSER.add_argument(
+    "--snapshot",
+    "-s",
+    type=str,
+    action="append",
+    required=True,
+    help="File of 'kubectl get -o json' output from the cluster. "
+    "May be given more than once.",
+)
+PARSER.add_argument(
+    "--rendered",
+    type=str,
+    default="rendered",
+    help="Directory of manifests from render-manifests.py. Applications that "
+    "have not been rendered are built with kustomize. Default=rendered.",
+)
+PARSER.add_argument(
+    "--app",
+    "-a",
+    type=str,
+    action="append",
+    help="Only compare this Application. May be given more than once.",
+)
+PARSER.add_argument(
+    "--max-fields",
+    type=int,
+    default=20,
+    help="Number of changed fields to show per resource. Default=20.",
+)
+PARSER.add_argument(
+    "--timings",
+    action="store_true",
+    help="Print a summary of the slowest operations.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.timings:
+        timings.enable()
+    try:
+        drifted = detect_drift(args)
+    finally:
+        if args.timings:
+            timings.print_summary()
+    if drifted:
+        sys.exit(1)
+
+
+def detect_drift(args):
+    """Compare the environment with the snapshot. Returns True on drift."""
+    if "/" in args.env:
+        print("The environment name must not include a slash character.")
+        sys.exit(1)
+    env_dir = f"environments/{args.env}"
+    if os.path.isdir(env_dir) is False:
+        print(f"Environment {env_dir} does not exist.")
+        sys.exit(1)
+
+    live = drift.LiveIndex()
+    try:
+        for filename in args.snapshot:
+            with open(filename, "r", encoding="utf-8") as f, timings.span(
+                "json", filename
+            ):
+                live.add_snapshot(json.load(f))
+        apps = applications.find_applications(env_dir)
+    except (OSError, ValueError, RuntimeError) as ex:
+        print(ex)
+        sys.exit(1)
+    if args.app:
+        unknown = set(args.app) - {doc["metadata"]["name"] for _, doc in apps}
+        if unknown:
+            print(f"No Application named {', '.join(sorted(unknown))} in {env_dir}")
+            sys.exit(1)
+        apps = [(f, doc) for f, doc in apps if doc["metadata"]["name"] in args.app]
+
+    sources = ManifestSources(args)
+    drifts = []
+    compared = 0
+    for filename, doc in apps:
+        app_name = doc["metadata"]["name"]
+        spec = doc["spec"]
+        rules = [drift.IgnoreRule(e) for e in spec.get("ignoreDifferences") or []]
+        for rule in rules:
+            if rule.unsupported:
+                print(
+                    f"Note: {filename}: ignoreDifferences "
+                    f"{', '.join(rule.unsupported)} are not applied"
+                )
+        try:
+            desired = sources.documents(applications.source_path(doc))
+        except RuntimeError as ex:
+            print(f"Unable to get the manifests for {app_name}: {ex}")
+            sys.exit(1)
+        namespace = (spec.get("destination") or {}).get("namespace")
+        with timings.span("compare", app_name):
+            app_drifts = drift.compare_application(
+                app_name, desired, live, namespace, rules
+            )
+        compared += len(desired)
+        drifts.extend(app_drifts)
+
+    display_drifts(args, drifts)
+    counts = {change: 0 for change in ["changed", "removed", "added"]}
+    for d in drifts:
+        counts[d.change] += 1
+    drifted_apps = len({d.application for d in drifts})
+    print(
+        f"{counts['changed']} changed, {counts['removed']} removed, "
+        f"{counts['added']} added, in {drifted_apps} of {len(apps)} Applications "
+        f"({compared} resources compared)"
+    )
+    return len(drifts) > 0
+
+
+def display_drifts(args, drifts):
+    """Print the drifts, grouped by Application."""
+    current = None
+    for d in sorted(drifts, key=lambda d: (d.application, d.change, d.key)):
+        if d.application != current:
+            current = d.application
+            print(f"Application {current}:")
+        print(f"  {d.change:<8} {drift.format_key(d.key)}")
+        for field in d.fields[: args.max_fields]:
+            print(
+                f"      {field.pointer}: {drift.format_value(field.desired)} -> "
+                f"{drift.format_value(field.live)}"
+            )
+        if len(d.fields) > args.max_fields:
+            print(f"      ... and {len(d.fields) - args.max_fields} more fields")
+
+
+class ManifestSources:
+    """
+    Get the manifests for an Application's source path, from the rendered
+    manifests when they are up to date with the kustomization, or else from
+    kustomize.
+    """
+
+    def __init__(self, args):
+        self.kustomize_ready = False
+        self.version = None
+        self.graph = None
+        self.env_dir = f"environments/{args.env}"
+        env_output_dir = os.path.normpath(f"{args.rendered}/{args.env}")
+        state = renderstate.load_state(renderstate.state_path(env_output_dir))
+        state = state or renderstate.new_state()
+        self.rendered = {
+            entry["source"]: (rendered, entry)
+            for rendered, entry in state["rendered"].items()
+        }
+
+    def documents(self, path):
+        """Return the list of documents for the source path."""
+        entry = renderstate.lookup(path)
+        if entry is not None:
+            rendered = path
+        elif path in self.rendered and os.path.isdir(self.rendered[path][0]):
+            rendered, entry = self.rendered[path]
+        else:
+            return self.build(path)
+        if not self.is_current(entry):
+            print(
+                f"Note: {rendered} is out of date with {entry['source']}, "
+                "using kustomize instead. Run tools/render-manifests.py"
+            )
+            return self.build(entry["source"])
+        return self.load_rendered(rendered)
+
+    def is_current(self, entry):
+        """Was the rendered directory rendered from the current sources?"""
+        if self.graph is None:
+            self.ensure_kustomize()
+            index = manifestindex.load_index(manifestindex.index_path(self.env_dir))
+            hashes = manifestindex.current_hashes(index)
+            self.graph = kustomization.KustomizationGraph(hashes)
+        with timings.span("phase", f"render digest {entry['source']}"):
+            return renderstate.is_current(entry, self.version, self.graph)
+
+    def ensure_kustomize(self):
+        """Install kustomize, once, and note its version."""
+        if not self.kustomize_ready:
+            self.version = kustomizebin.ensure_kustomize() or ""
+            self.kustomize_ready = True
+
+    def load_rendered(self, rendered):
+        """Load the documents in a directory of rendered manifests."""
+        docs = []
+        for name in sorted(os.listdir(rendered)):
+            if not name.endswith(".yaml"):
+                continue
+            filename = os.path.join(rendered, name)
+            with open(filename, "rb") as f, timings.span("yaml", filename):
+                docs.extend(
+                    doc
+                    for doc in yaml.load_all(f, Loader=yamlscan.SafeLoader)
+                    if isinstance(doc, dict)
+                )
+        return docs
+
+    def build(self, path):
+        """Build the documents with kustomize."""
+        self.ensure_kustomize()
+        output = runner.run_this_always(f"bin/kustomize build {path}")
+        return [
+            doc
+            for doc in yaml.load_all(output, Loader=yamlscan.SafeLoader)
+            if isinstance(doc, dict)
+        ]
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,320 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the resources that git says an Application should have with the
+resources found in a snapshot of the cluster.
+
+Each resource is identified by its API group, kind, namespace and name.
+Both sides are normalized before they are hashed: fields that the cluster
+owns, such as status and most of the metadata, are dropped, the
+Application's ignoreDifferences JSON pointers are removed, and the live
+resource is cut down to the fields that git sets, so that the defaults the
+API server fills in are not reported. Only the resources whose hashes
+differ are walked to find the fields that changed, so the cost is linear
+in the number of resources.
+"""
+
+import base64
+import collections
+import fnmatch
+import json
+
+import yamlscan
+
+# Fields that only the cluster sets.
+SERVER_FIELDS = ["status"]
+SERVER_METADATA_FIELDS = [
+    "creationTimestamp",
+    "deletionGracePeriodSeconds",
+    "deletionTimestamp",
+    "generation",
+    "managedFields",
+    "ownerReferences",
+    "resourceVersion",
+    "selfLink",
+    "uid",
+]
+# Fields that hold user data with no server defaults, which are compared
+# whole so that a key added in the cluster is reported too.
+WHOLE_FIELDS = ["data", "binaryData"]
+
+# How ArgoCD marks the resources that belong to an Application.
+INSTANCE_LABEL = "app.kubernetes.io/instance"
+TRACKING_ANNOTATION = "argocd.argoproj.io/tracking-id"
+
+# A resource's identity. The namespace is None for a cluster-scoped
+# resource, or for a namespaced one that takes the Application's
+# destination namespace.
+ResourceKey = collections.namedtuple(
+    "ResourceKey", ["group", "kind", "namespace", "name"]
+)
+
+# One resource that differs. The change is "added" when it is only in the
+# cluster, "removed" when it is only in git, or "changed". Fields is a list
+# of FieldDiff for a changed resource.
+Drift = collections.namedtuple("Drift", ["application", "key", "change", "fields"])
+
+# One field that differs, by its JSON pointer. A value is MISSING when the
+# field is on one side only.
+FieldDiff = collections.namedtuple("FieldDiff", ["pointer", "desired", "live"])
+
+MISSING = object()
+
+
+def resource_key(doc, namespace=None):
+    """Return the ResourceKey of a document, defaulting the namespace."""
+    meta = doc.get("metadata") or {}
+    group = str(doc.get("apiVersion", "")).rpartition("/")[0]
+    return ResourceKey(
+        group, doc.get("kind"), meta.get("namespace") or namespace, meta.get("name")
+    )
+
+
+def format_key(key):
+    """Return the key as kind/namespace/name, with the group if it has one."""
+    kind = f"{key.kind}.{key.group}" if key.group else key.kind
+    if key.namespace:
+        return f"{kind}/{key.namespace}/{key.name}"
+    return f"{kind}/{key.name}"
+
+
+class IgnoreRule:
+    """One entry from an Application's ignoreDifferences."""
+
+    def __init__(self, entry):
+        self.group = entry.get("group")
+        self.kind = entry.get("kind")
+        self.name = entry.get("name")
+        self.namespace = entry.get("namespace")
+        self.pointers = [parse_pointer(p) for p in entry.get("jsonPointers") or []]
+        # jq expressions and field managers need the live managedFields or a
+        # jq implementation, and are not applied here.
+        self.unsupported = [
+            field
+            for field in ["jqPathExpressions", "managedFieldsManagers"]
+            if entry.get(field)
+        ]
+
+    def matches(self, key):
+        """
+        Does the rule apply to the resource? A rule without a group matches
+        any group, and the group and kind may be glob patterns.
+        """
+        if self.kind is not None and not fnmatch.fnmatchcase(key.kind, self.kind):
+            return False
+        if self.group is not None and not fnmatch.fnmatchcase(key.group, self.group):
+            return False
+        if self.name is not None and self.name != key.name:
+            return False
+        if self.namespace is not None and self.namespace != key.namespace:
+            return False
+        return True
+
+
+def parse_pointer(pointer):
+    """Split a JSON pointer (RFC 6901) into its unescaped tokens."""
+    if pointer in ("", "/"):
+        return []
+    return [
+        token.replace("~1", "/").replace("~0", "~")
+        for token in pointer.lstrip("/").split("/")
+    ]
+
+
+def format_pointer(tokens):
+    """Join tokens back into a JSON pointer."""
+    return "".join(
+        "/" + str(token).replace("~", "~0").replace("/", "~1") for token in tokens
+    )
+
+
+def remove_pointer(doc, tokens):
+    """Remove the field named by the pointer tokens, if it exists."""
+    if not tokens:
+        return
+    parent = doc
+    for token in tokens[:-1]:
+        parent = _child(parent, token)
+        if parent is MISSING:
+            return
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        parent.pop(last, None)
+    elif isinstance(parent, list) and last.isdigit() and int(last) < len(parent):
+        del parent[int(last)]
+
+
+def _child(value, token):
+    if isinstance(value, dict):
+        return value.get(token, MISSING)
+    if isinstance(value, list) and token.isdigit() and int(token) < len(value):
+        return value[int(token)]
+    return MISSING
+
+
+def normalize(doc, rules):
+    """
+    Drop the fields that the cluster owns and the fields the ignore rules
+    name. The document is changed in place and returned.
+    """
+    for field in SERVER_FIELDS + ["apiVersion"]:
+        doc.pop(field, None)
+    meta = doc.get("metadata")
+    if isinstance(meta, dict):
+        for field in SERVER_METADATA_FIELDS:
+            meta.pop(field, None)
+    if doc.get("kind") == "Secret" and isinstance(doc.get("stringData"), dict):
+        # The API server stores stringData base64-encoded in data.
+        data = doc.get("data") or {}
+        for name, value in doc.pop("stringData").items():
+            data[name] = base64.b64encode(str(value).encode()).decode()
+        doc["data"] = data
+    for rule in rules:
+        for tokens in rule.pointers:
+            remove_pointer(doc, tokens)
+    return doc
+
+
+def project(live, desired):
+    """
+    Cut the live value down to the fields that the desired value sets.
+    Lists of the same length are projected item by item.
+    """
+    if isinstance(desired, dict) and isinstance(live, dict):
+        return {k: project(live[k], v) for k, v in desired.items() if k in live}
+    if isinstance(desired, list) and isinstance(live, list):
+        if len(desired) == len(live):
+            return [project(lv, dv) for lv, dv in zip(live, desired)]
+    return live
+
+
+def live_view(live, desired):
+    """Return the part of the live resource that is compared with git."""
+    view = project(live, desired)
+    for field in WHOLE_FIELDS:
+        if field in live:
+            view[field] = live[field]
+    return view
+
+
+def field_diffs(desired, live, tokens=None):
+    """Return a list of FieldDiff for the fields that differ."""
+    tokens = tokens or []
+    if isinstance(desired, dict) and isinstance(live, dict):
+        diffs = []
+        for name in sorted(set(desired) | set(live), key=str):
+            diffs.extend(
+                field_diffs(
+                    desired.get(name, MISSING), live.get(name, MISSING), tokens + [name]
+                )
+            )
+        return diffs
+    if isinstance(desired, list) and isinstance(live, list):
+        if len(desired) != len(live):
+            return [FieldDiff(format_pointer(tokens), desired, live)]
+        diffs = []
+        for i, (dv, lv) in enumerate(zip(desired, live)):
+            diffs.extend(field_diffs(dv, lv, tokens + [str(i)]))
+        return diffs
+    if desired == live:
+        return []
+    return [FieldDiff(format_pointer(tokens), desired, live)]
+
+
+def format_value(value, limit=60):
+    """Return a short, single-line rendering of a field's value."""
+    if value is MISSING:
+        return "(missing)"
+    text = json.dumps(value, sort_keys=True, default=str)
+    if len(text) > limit:
+        text = text[: limit - 3] + "..."
+    return text
+
+
+def tracking_app(doc):
+    """Return the Application that ArgoCD put the live resource there for."""
+    meta = doc.get("metadata") or {}
+    app_name = (meta.get("labels") or {}).get(INSTANCE_LABEL)
+    if app_name is not None:
+        return app_name
+    tracking = (meta.get("annotations") or {}).get(TRACKING_ANNOTATION)
+    if isinstance(tracking, str) and ":" in tracking:
+        return tracking.split(":", 1)[0]
+    return None
+
+
+class LiveIndex:
+    """The resources in a cluster snapshot, by ResourceKey."""
+
+    def __init__(self):
+        self.resources = {}
+        # The keys of the resources that each Application is tracking.
+        self.tracked = collections.defaultdict(list)
+
+    def add_snapshot(self, data):
+        """
+        Add the resources from parsed 'kubectl get -o json' output, which is
+        a List of items or a single resource.
+        """
+        items = data.get("items") if data.get("kind", "").endswith("List") else [data]
+        for doc in items or []:
+            if not isinstance(doc, dict) or "kind" not in doc:
+                continue
+            key = resource_key(doc)
+            self.resources[key] = doc
+            app_name = tracking_app(doc)
+            if app_name is not None:
+                self.tracked[app_name].append(key)
+
+    def find(self, key, namespace):
+        """
+        Find the live resource for a desired key. A desired resource with
+        no namespace may be cluster-scoped, or may be namespaced and take
+        the Application's destination namespace.
+        """
+        found = self.resources.get(key)
+        if found is None and key.namespace is None and namespace:
+            key = key._replace(namespace=namespace)
+            found = self.resources.get(key)
+        return key, found
+
+
+def compare_application(app_name, desired_docs, live, namespace, rules):
+    """
+    Compare the documents that git has for the Application with the live
+    index. Returns a list of Drift.
+    """
+    drifts = []
+    matched = set()
+    for desired in desired_docs:
+        key, live_doc = live.find(resource_key(desired), namespace)
+        if live_doc is None:
+            drifts.append(Drift(app_name, key, "removed", []))
+            continue
+        matched.add(key)
+        applicable = [rule for rule in rules if rule.matches(key)]
+        desired = normalize(desired, applicable)
+        view = live_view(normalize(live_doc, applicable), desired)
+        if yamlscan.canonical_hash(desired) != yamlscan.canonical_hash(view):
+            drifts.append(
+                Drift(app_name, key, "changed", field_diffs(desired, view))
+            )
+    for key in live.tracked.get(app_name, []):
+        if key not in matched:
+            drifts.append(Drift(app_name, key, "added", []))
+    return drifts
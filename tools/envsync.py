@@ -0,0 +1,378 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Create environments from environments/example-env, and bring existing
+environments up to date with the bootstraps that have since been added to
+it.
+
+The example environment is read into memory once, and can then be used by
+any number of environments, from any number of threads. The STAGING_EXAMPLE
+and GITOPS_REPO placeholders in the bootstrap files are replaced as each
+file is written. New bootstraps are added to a kustomization's resources
+list by inserting a line after the list's last entry, found from the YAML
+parser's node positions, so that the rest of the file is unchanged.
+"""
+
+import os
+import re
+import yaml
+
+import applications
+import filewrite
+import yamlscan
+
+EXAMPLE_ENV = "example-env"
+ENV_PLACEHOLDER = "STAGING_EXAMPLE"
+REPO_PLACEHOLDER = "GITOPS_REPO"
+KUSTOMIZATION = "kustomization.yaml"
+
+
+def check_env_name(env):
+    """Raise an error if the environment name is not usable."""
+    if not env:
+        raise RuntimeError("The environment name must not be empty.")
+    if "/" in env:
+        raise RuntimeError("The environment name must not include a slash character.")
+
+
+def check_new_environment(env, repo_url, sysconfig=None, lustre=None):
+    """Check the arguments for a new environment, before anything is written."""
+    check_env_name(env)
+    if not repo_url:
+        raise RuntimeError(f"Environment {env} needs a repo url.")
+    if not repo_url.startswith(("http", "git")):
+        raise RuntimeError("The repo url must be an http or https URL.")
+    for path, kind in [
+        (sysconfig, "SystemConfiguration"),
+        (lustre, "LustreFileSystem"),
+    ]:
+        if path is None:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as ex:
+            raise RuntimeError(f"The {kind} yaml is not readable at {path}") from ex
+        if not re.search(f"^kind: {kind}$", text, re.MULTILINE):
+            raise RuntimeError(f"The file does not look like a {kind} yaml: {path}")
+
+
+def environment_names(environments_dir="environments"):
+    """
+    Return the names of the environments, other than the example. Only the
+    directories with bootstraps are environments; others, such as
+    environments/universal, are shared by them.
+    """
+    names = []
+    for name in sorted(os.listdir(environments_dir)):
+        env_dir = os.path.join(environments_dir, name)
+        if name == EXAMPLE_ENV or not os.path.isdir(env_dir):
+            continue
+        if any(
+            "bootstrap" in d and os.path.isdir(os.path.join(env_dir, d))
+            for d in os.listdir(env_dir)
+        ):
+            names.append(name)
+    return names
+
+
+class ExampleEnv:
+    """The files of the example environment, read once."""
+
+    def __init__(self, environments_dir="environments"):
+        self.environments_dir = environments_dir
+        self.root = os.path.join(environments_dir, EXAMPLE_ENV)
+        # Relative path to (mode, bytes), or to the target of a symlink.
+        self.files = {}
+        self.links = {}
+        self.dirs = []
+        for dirpath, subdirs, names in os.walk(self.root):
+            subdirs.sort()
+            rel_dir = os.path.relpath(dirpath, self.root)
+            for name in list(subdirs):
+                path = os.path.join(dirpath, name)
+                if os.path.islink(path):
+                    self.links[os.path.normpath(os.path.join(rel_dir, name))] = (
+                        os.readlink(path)
+                    )
+                    subdirs.remove(name)
+                else:
+                    self.dirs.append(os.path.normpath(os.path.join(rel_dir, name)))
+            for name in sorted(names):
+                path = os.path.join(dirpath, name)
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                if os.path.islink(path):
+                    self.links[rel] = os.readlink(path)
+                    continue
+                with open(path, "rb") as f:
+                    self.files[rel] = (os.stat(path).st_mode & 0o777, f.read())
+        self.bootstraps = sorted(
+            d for d in self.dirs if "/" not in d and "bootstrap" in d
+        )
+        # The resources listed in each bootstrap's kustomization.
+        self.listed = {}
+        for bootstrap in self.bootstraps:
+            rel = os.path.join(bootstrap, KUSTOMIZATION)
+            if rel not in self.files:
+                raise RuntimeError(
+                    f"{os.path.join(self.root, bootstrap)} has no {KUSTOMIZATION}"
+                )
+            self.listed[bootstrap] = resource_entries(
+                self.files[rel][1], os.path.join(self.root, rel)
+            )
+
+    def bootstrap_files(self, bootstrap):
+        """Return the Application files of a bootstrap, without its kustomization."""
+        return sorted(
+            rel
+            for rel in self.files
+            if os.path.dirname(rel) == bootstrap
+            and rel.endswith(".yaml")
+            and os.path.basename(rel) != KUSTOMIZATION
+        )
+
+    def tree(self, top):
+        """Return the directories, files, and links at or below top."""
+        prefix = top + "/"
+        dirs = [d for d in self.dirs if d == top or d.startswith(prefix)]
+        files = [f for f in self.files if f.startswith(prefix)]
+        links = [f for f in self.links if f.startswith(prefix)]
+        return dirs, files, links
+
+
+class EnvironmentSync:
+    """Create or resync one environment. Messages are kept in self.log."""
+
+    def __init__(self, example, env, repo_url=None, dryrun=False):
+        self.example = example
+        self.env = env
+        self.repo_url = repo_url
+        self.dryrun = dryrun
+        self.env_dir = os.path.join(example.environments_dir, env)
+        self.log = []
+        self.created = False
+        self.added = False
+
+    def say(self, message):
+        """Record a message for the caller to print."""
+        self.log.append(message)
+
+    def customize(self, data):
+        """Replace the placeholders in a bootstrap file."""
+        text = data.decode()
+        text = text.replace(ENV_PLACEHOLDER, self.env)
+        text = text.replace(REPO_PLACEHOLDER, self.repo_url)
+        return text.encode()
+
+    def write(self, rel, data=None, mode=0o644):
+        """Write one file of the environment, relative to the env dir."""
+        path = os.path.join(self.env_dir, rel)
+        filewrite.write_if_changed(path, data, mode, dryrun=self.dryrun)
+
+    def copy_tree(self, top, customize):
+        """
+        Copy a directory of the example environment. Bootstrap files are
+        customized when customize is set.
+        """
+        dirs, files, links = self.example.tree(top)
+        if not self.dryrun:
+            for rel in dirs:
+                os.makedirs(os.path.join(self.env_dir, rel), exist_ok=True)
+            for rel in links:
+                os.symlink(self.example.links[rel], os.path.join(self.env_dir, rel))
+        for rel in files:
+            mode, data = self.example.files[rel]
+            if customize and rel.endswith(".yaml") and not rel.endswith(KUSTOMIZATION):
+                data = self.customize(data)
+            self.write(rel, data, mode)
+
+    def create(self, sysconfig=None, lustre=None):
+        """Create the environment from the example environment."""
+        if os.path.exists(self.env_dir):
+            raise RuntimeError(f"Environment {self.env} already exists")
+        self.say(f"Creating the '{self.env}' environment...")
+        self.say("")
+        if not self.dryrun:
+            os.makedirs(self.env_dir)
+            for rel in self.example.dirs:
+                os.makedirs(os.path.join(self.env_dir, rel), exist_ok=True)
+            for rel, target in self.example.links.items():
+                os.symlink(target, os.path.join(self.env_dir, rel))
+        bootstraps = set(self.example.bootstraps)
+        for rel, (mode, data) in self.example.files.items():
+            top = rel.split("/", 1)[0]
+            if top in bootstraps and rel.endswith(".yaml"):
+                if os.path.basename(rel) != KUSTOMIZATION:
+                    data = self.customize(data)
+            self.write(rel, data, mode)
+
+        for source, dest, kind in [
+            (sysconfig, "site-config/systemconfiguration.yaml", "SystemConfiguration"),
+            (lustre, "global-lustre/global-lustre.yaml", "LustreFileSystem"),
+        ]:
+            if source is not None:
+                with open(source, "rb") as f:
+                    self.write(dest, f.read())
+            else:
+                self.say("Next steps:")
+                self.say(f"  Add your {kind} yaml to {self.env_dir}/{dest}")
+                self.say("")
+        self.created = True
+
+    def find_repo_url(self):
+        """Find the GITOPS_REPO value in the environment's Applications."""
+        for _, doc in applications.find_applications(self.env_dir):
+            url = ((doc.get("spec") or {}).get("source") or {}).get("repoURL")
+            if isinstance(url, str) and url != REPO_PLACEHOLDER:
+                return url
+        raise RuntimeError(
+            f"Unable to find a repoURL in the existing bootstraps in {self.env_dir}."
+        )
+
+    def resync(self):
+        """Add the bootstraps that the example environment has and this lacks."""
+        if not os.path.isdir(self.env_dir):
+            raise RuntimeError(f"Environment {self.env} does not exist")
+        if self.repo_url is None:
+            self.repo_url = self.find_repo_url()
+        for bootstrap in self.example.bootstraps:
+            if not os.path.isdir(os.path.join(self.env_dir, bootstrap)):
+                self.copy_tree(bootstrap, customize=True)
+                self.say(f"  Added: {os.path.join(self.env_dir, bootstrap)}")
+                self.added = True
+                for rel in self.example.bootstrap_files(bootstrap):
+                    self.copy_service_dir(rel)
+                continue
+            new = []
+            for rel in self.example.bootstrap_files(bootstrap):
+                name = os.path.basename(rel)
+                if name not in self.example.listed[bootstrap]:
+                    raise RuntimeError(
+                        f"Error in {os.path.join(self.example.root, bootstrap)}: "
+                        f"Resource {name} is not listed in {KUSTOMIZATION}\n"
+                        f"Run: tools/verify-deployment.py -e {EXAMPLE_ENV}"
+                    )
+                if os.path.exists(os.path.join(self.env_dir, rel)):
+                    continue
+                mode, data = self.example.files[rel]
+                self.write(rel, self.customize(data), mode)
+                self.say(f"  Added: {os.path.join(self.env_dir, rel)}")
+                new.append(name)
+                self.copy_service_dir(rel)
+            if new:
+                self.add_resources(os.path.join(bootstrap, KUSTOMIZATION), new)
+                self.added = True
+
+    def add_resources(self, kust_rel, names):
+        """Add the names to the resources list of the env's kustomization."""
+        path = os.path.join(self.env_dir, kust_rel)
+        with open(path, "rb") as f:
+            data = f.read()
+        listed = resource_entries(data, path)
+        names = [name for name in names if name not in listed]
+        if not names:
+            return
+        self.say(f"  Editing: {path}")
+        mode = os.stat(path).st_mode & 0o777
+        try:
+            data = add_resource_entries(data, names)
+        except yaml.YAMLError as ex:
+            raise RuntimeError(f"Unable to parse {path}: {ex}") from ex
+        self.write(kust_rel, data, mode)
+
+    def copy_service_dir(self, rel):
+        """
+        Copy the example directory that a new Application uses, if the
+        environment does not have it yet.
+        """
+        _, data = self.example.files[rel]
+        try:
+            docs = list(
+                yaml.load_all(self.customize(data), Loader=yamlscan.SafeLoader)
+            )
+        except yaml.YAMLError as ex:
+            raise RuntimeError(
+                f"Unable to parse {os.path.join(self.example.root, rel)}: {ex}"
+            ) from ex
+        for doc in docs:
+            if not isinstance(doc, dict) or doc.get("kind") != "Application":
+                continue
+            source = applications.source_path(doc)
+            prefix = os.path.join(self.env_dir, "")
+            if source is None or not source.startswith(prefix):
+                continue
+            service = os.path.relpath(source, self.env_dir)
+            if os.path.isdir(source) or service not in self.example.dirs:
+                continue
+            self.say(f"  Creating: {source}")
+            self.copy_tree(service, customize=False)
+
+
+def resource_entries(data, path):
+    """
+    Return the stripped entries of a kustomization's resources list. The
+    path is for the error when the kustomization cannot be parsed.
+    """
+    try:
+        doc = yaml.load(data, Loader=yamlscan.SafeLoader) or {}
+    except yaml.YAMLError as ex:
+        raise RuntimeError(f"Unable to parse {path}: {ex}") from ex
+    if not isinstance(doc, dict):
+        raise RuntimeError(f"{path} is not a kustomization")
+    return {
+        str(entry).strip() for entry in doc.get("resources") or [] if entry is not None
+    }
+
+
+def add_resource_entries(data, names):
+    """
+    Return the kustomization with the names appended to its resources list.
+    The new lines copy the indentation of the last entry, and the rest of
+    the file is left as it was.
+    """
+    text = data.decode()
+    lines = text.splitlines(keepends=True)
+    root = yaml.compose(text, Loader=yamlscan.SafeLoader)
+    node = None
+    if isinstance(root, yaml.MappingNode):
+        for key, value in root.value:
+            if key.value == "resources":
+                node = value
+    if node is None or (isinstance(node, yaml.ScalarNode) and node.value in ("", "~")):
+        # No list yet, or an empty 'resources:'.
+        if node is not None:
+            lines = [line for line in lines if not line.startswith("resources:")]
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        lines.append("resources:\n")
+        lines.extend(f"- {name}\n" for name in names)
+        return "".join(lines).encode()
+    if not isinstance(node, yaml.SequenceNode) or node.flow_style or not node.value:
+        # Not a block list, so rewrite the whole document.
+        doc = yaml.load(text, Loader=yamlscan.SafeLoader)
+        doc["resources"] = list(doc.get("resources") or []) + names
+        return (
+            "---\n" + yaml.dump(doc, Dumper=yamlscan.SafeDumper, sort_keys=False)
+        ).encode()
+    last = node.value[-1]
+    line_no = last.start_mark.line
+    prefix = lines[line_no][: last.start_mark.column]
+    if not lines[line_no].endswith("\n"):
+        lines[line_no] += "\n"
+    lines[line_no + 1 : line_no + 1] = [f"{prefix}{name}\n" for name in names]
+    return "".join(lines).encode()
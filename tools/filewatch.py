@@ -0,0 +1,244 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Watch directory trees for changed files.
+
+On Linux the watcher uses inotify, through ctypes so that no extra package
+is needed. Elsewhere, or when inotify can't be used, it polls the trees for
+files whose size or mtime changed. Either way, wait() returns once a burst
+of changes has gone quiet, so that a whole unpack is reported at once.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# Editor scratch files that are not worth a verification pass.
+IGNORED_SUFFIXES = (".swp", ".swx", "~")
+IGNORED_NAMES = {"4913"}
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_ignored(path):
+    """Is the path a scratch file that no verification depends on?"""
+    name = os.path.basename(path)
+    if name.startswith(".") or name in IGNORED_NAMES:
+        return True
+    return name.endswith(IGNORED_SUFFIXES)
+
+
+def walk_dirs(root):
+    """Return the root and every directory below it."""
+    dirs = []
+    for dirpath, subdirs, _ in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+        dirs.append(dirpath)
+    return dirs
+
+
+def walk_files(root):
+    """Return every file below the root."""
+    files = []
+    for dirpath, subdirs, names in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+        files.extend(os.path.join(dirpath, name) for name in names)
+    return files
+
+
+class InotifyWatcher:
+    """Watch directory trees with inotify."""
+
+    name = "inotify"
+
+    def __init__(self, roots, quiet=0.3):
+        self.quiet = quiet
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        try:
+            for root in roots:
+                for dirpath in walk_dirs(root):
+                    self._add_watch(dirpath)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, dirpath):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {dirpath} failed")
+        self._dirs[wd] = dirpath
+
+    def _forget(self, path):
+        """Remove the watches on the directory and the directories below it."""
+        prefix = os.path.join(path, "")
+        for wd, dirpath in list(self._dirs.items()):
+            if dirpath == path or dirpath.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def _read_events(self, changed):
+        """
+        Add the paths from the pending events to changed. Returns False if
+        the kernel dropped events and everything must be checked again.
+        """
+        data = os.read(self._fd, 65536)
+        offset = 0
+        complete = True
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                complete = False
+                continue
+            dirpath = self._dirs.get(wd)
+            if dirpath is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                del self._dirs[wd]
+                continue
+            path = os.path.join(dirpath, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith("."):
+                    # Files may have landed before the new watch was added.
+                    try:
+                        for newdir in walk_dirs(path):
+                            self._add_watch(newdir)
+                    except OSError:
+                        # Already gone again.
+                        pass
+                    changed.update(walk_files(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    # The files that were in it are not known here, so have
+                    # everything checked again, and stop watching the old
+                    # path of a directory that was moved away.
+                    self._forget(path)
+                    complete = False
+                continue
+            changed.add(path)
+        return complete
+
+    def wait(self):
+        """
+        Wait for changes, and return the set of changed paths once no more
+        have arrived for the quiet period. Returns None if events were lost.
+        """
+        changed = set()
+        complete = True
+        timeout = None
+        while True:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready:
+                break
+            complete = self._read_events(changed) and complete
+            changed = {path for path in changed if not is_ignored(path)}
+            if changed or not complete:
+                timeout = self.quiet
+        return changed if complete else None
+
+    def close(self):
+        """Stop watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Watch directory trees by polling the size and mtime of each file."""
+
+    name = "polling"
+
+    def __init__(self, roots, interval=1.0):
+        self.roots = roots
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for root in self.roots:
+            for path in walk_files(root):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def _poll(self):
+        snapshot = self._take_snapshot()
+        changed = {
+            path
+            for path in set(snapshot) | set(self._snapshot)
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return {path for path in changed if not is_ignored(path)}
+
+    def wait(self):
+        """
+        Wait for changes, and return the set of changed paths once a poll
+        finds no more of them.
+        """
+        changed = set()
+        while True:
+            time.sleep(self.interval)
+            found = self._poll()
+            if not found and changed:
+                return changed
+            changed.update(found)
+
+    def close(self):
+        """Stop watching."""
+
+
+def make_watcher(roots, poll=False):
+    """Return an inotify watcher for the roots, or a polling one."""
+    if not poll:
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            # Not Linux, or out of inotify watches.
+            pass
+    return PollingWatcher(roots)
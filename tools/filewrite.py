@@ -0,0 +1,92 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Write files the way all of the tools do: only when the content changed, so
+that an unchanged file keeps its mtime, and by renaming a temporary file
+into place, so that a reader never sees a partly written file.
+"""
+
+import itertools
+import os
+import tempfile
+
+
+def write_if_changed(path, data, mode=None, dryrun=False):
+    """
+    Write the data, which is bytes, a string, or an iterable of byte chunks,
+    to the file unless the file already holds exactly that content. The
+    file's directory is created if needed. A new file gets the given mode,
+    or the default mode for new files; an updated file keeps its mode unless
+    one is given. A dry run writes nothing. Returns "unchanged", "updated",
+    or "new".
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    if isinstance(data, bytes):
+        data = iter([data])
+    else:
+        data = iter(data)
+
+    status = "new"
+    if os.path.isfile(path):
+        status = "updated"
+        # Compare the incoming chunks with the existing file; stop at the
+        # first difference.
+        matched = 0
+        pending = None
+        with open(path, "rb") as existing:
+            for chunk in data:
+                if existing.read(len(chunk)) != chunk:
+                    pending = chunk
+                    break
+                matched += len(chunk)
+            else:
+                if existing.read(1) == b"":
+                    return "unchanged"
+        if dryrun:
+            for _ in data:
+                pass
+            return status
+        # Rewrite the prefix that matched, then the rest of the new content.
+        with open(path, "rb") as existing:
+            prefix = existing.read(matched)
+        data = itertools.chain([prefix], [] if pending is None else [pending], data)
+    elif dryrun:
+        for _ in data:
+            pass
+        return status
+
+    dirname = os.path.dirname(path) or "."
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "wb") as ft:
+            for chunk in data:
+                ft.write(chunk)
+        if mode is None and status == "updated":
+            mode = os.stat(path).st_mode & 0o777
+        elif mode is None:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return status
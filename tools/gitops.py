@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+One entry point for the tools:
+
+    tools/gitops.py verify-deployment -e us-east-1
+
+runs tools/verify-deployment.py in this process with the remaining
+arguments. Nothing but the named tool, and the modules it imports, is
+loaded, so the entry point adds almost no startup time of its own. The
+tool is loaded the way a module is, so its compiled bytecode is cached in
+__pycache__ instead of the script being compiled again on every run.
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINT = os.path.basename(__file__)
+
+PARSER = argparse.ArgumentParser(
+    usage="%(prog)s [-h] [--list] COMMAND [ARGS ...]",
+)
+PARSER.add_argument(
+    "--list",
+    action="store_true",
+    help="List the commands.",
+)
+PARSER.add_argument(
+    "command",
+    type=str,
+    nargs="?",
+    help="Name of the tool to run, such as verify-deployment.",
+)
+PARSER.add_argument(
+    "args",
+    nargs=argparse.REMAINDER,
+    help="Arguments for the tool. Use 'COMMAND --help' to see them.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.list:
+        for name in commands():
+            print(name)
+        return
+    if args.command is None:
+        PARSER.print_usage()
+        print(f"Commands: {', '.join(commands())}")
+        sys.exit(1)
+    if args.command not in commands():
+        print(f"Unknown command {args.command}. Use --list to see the commands.")
+        sys.exit(1)
+
+    script = os.path.join(TOOLS_DIR, f"{args.command}.py")
+    sys.argv = [script] + args.args
+    sys.path[0] = TOOLS_DIR
+    spec = importlib.util.spec_from_file_location("__main__", script)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["__main__"] = module
+    spec.loader.exec_module(module)
+
+
+def commands():
+    """Return the names of the executable Python tools."""
+    return sorted(
+        name[: -len(".py")]
+        for name in os.listdir(TOOLS_DIR)
+        if name.endswith(".py")
+        and name != ENTRY_POINT
+        and os.access(os.path.join(TOOLS_DIR, name), os.X_OK)
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
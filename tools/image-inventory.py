@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+List the container images that an environment's Applications use, from the
+manifests written by render-manifests.py, and optionally write a DaemonSet
+that pre-pulls them onto the nodes and a list of images to mirror.
+"""
+
+import argparse
+import json
+import os
+import sys
+import yaml
+
+import applications
+import filewrite
+import imageinventory
+import kustomization
+import kustomizebin
+import manifestindex
+import renderstate
+import yamlscan
+
+CACHE_DIR = ".cache/image-inventory"
+CACHE_VERSION = 1
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    action="append",
+    required=True,
+    help="Name of environment to inventory. May be given more than once.",
+)
+PARSER.add_argument(
+    "--rendered",
+    type=str,
+    default="rendered",
+    help="Directory of manifests from render-manifests.py. Default=rendered.",
+)
+PARSER.add_argument(
+    "--json",
+    type=str,
+    help="Write the inventory to this file as JSON.",
+)
+PARSER.add_argument(
+    "--daemonset",
+    type=str,
+    help="Write a DaemonSet that pre-pulls the images to this file.",
+)
+PARSER.add_argument(
+    "--daemonset-namespace",
+    type=str,
+    default="kube-system",
+    help="Namespace for the pre-pull DaemonSet. Default=kube-system.",
+)
+PARSER.add_argument(
+    "--node-selector",
+    type=str,
+    action="append",
+    help="KEY=VALUE node label for the pre-pull DaemonSet to select. "
+    "May be given more than once.",
+)
+PARSER.add_argument(
+    "--helper-image",
+    type=str,
+    default="busybox",
+    help="Image with a static busybox, used to run a no-op in each pre-pulled "
+    "image. Default=busybox.",
+)
+PARSER.add_argument(
+    "--pause-image",
+    type=str,
+    default="registry.k8s.io/pause:3.9",
+    help="Image that keeps the pre-pull pods running. "
+    "Default=registry.k8s.io/pause:3.9.",
+)
+PARSER.add_argument(
+    "--mirror-list",
+    type=str,
+    help="Write the images to mirror to this file, one per line.",
+)
+PARSER.add_argument(
+    "--mirror-registry",
+    type=str,
+    help="With --mirror-list, write each image followed by its name in this "
+    "registry.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    node_selector = {}
+    for item in args.node_selector or []:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            print(f"The --node-selector value {item} must be KEY=VALUE.")
+            sys.exit(1)
+        node_selector[key] = value
+
+    inventory = {}
+    try:
+        for env in args.env:
+            label = env if len(args.env) > 1 else None
+            add_environment(args, env, label, inventory)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+    images = [imageinventory.parse_image(ref) for ref in sorted(inventory)]
+    display_inventory(images, inventory)
+    mirrors = None
+    if args.mirror_list:
+        try:
+            mirrors = mirror_list(args, images)
+        except RuntimeError as ex:
+            print(ex)
+            sys.exit(1)
+    if args.json:
+        filewrite.write_if_changed(args.json, inventory_json(images, inventory))
+    if args.daemonset:
+        filewrite.write_if_changed(
+            args.daemonset, prepull_daemonset(args, images, node_selector)
+        )
+    if args.mirror_list:
+        filewrite.write_if_changed(args.mirror_list, mirrors)
+
+
+def add_environment(args, env, label, inventory):
+    """
+    Add the images of the environment's Applications to the inventory, a
+    dict of image reference to the set of Applications that use it. The
+    rendered directories must be up to date with their kustomizations. Only
+    the rendered directories whose digests changed since the last run are
+    scanned again.
+    """
+    if "/" in env:
+        raise RuntimeError("The environment name must not include a slash character.")
+    env_dir = f"environments/{env}"
+    if os.path.isdir(env_dir) is False:
+        raise RuntimeError(f"Environment {env_dir} does not exist.")
+    env_output_dir = os.path.normpath(f"{args.rendered}/{env}")
+    state = renderstate.load_state(renderstate.state_path(env_output_dir))
+    if state is None:
+        raise RuntimeError(
+            f"No rendered manifests in {env_output_dir}. "
+            f"Run tools/render-manifests.py -e {env}"
+        )
+    by_source = {
+        entry["source"]: rendered for rendered, entry in state["rendered"].items()
+    }
+    # The rendered directories must be up to date with their kustomizations,
+    # or the images would be those of an old render.
+    version = kustomizebin.ensure_kustomize() or ""
+    index = manifestindex.load_index(manifestindex.index_path(env_dir))
+    graph = kustomization.KustomizationGraph(manifestindex.current_hashes(index))
+    stale = []
+
+    cache_file = f"{CACHE_DIR}/{env}.json"
+    cache = load_cache(cache_file)
+    scanned = 0
+    for _, doc in applications.find_applications(env_dir):
+        app_name = doc["metadata"]["name"]
+        path = applications.source_path(doc)
+        rendered = path if renderstate.lookup(path) else by_source.get(path)
+        if rendered is None or not os.path.isdir(rendered):
+            raise RuntimeError(
+                f"Application {app_name} has not been rendered. "
+                f"Run tools/render-manifests.py -e {env}"
+            )
+        if not renderstate.is_current(state["rendered"][rendered], version, graph):
+            stale.append(rendered)
+            continue
+        digest = state["rendered"][rendered]["digest"]
+        entry = cache["dirs"].get(rendered)
+        if entry is None or entry["digest"] != digest:
+            entry = {
+                "digest": digest,
+                "images": imageinventory.directory_images(rendered),
+            }
+            cache["dirs"][rendered] = entry
+            scanned += 1
+        user = f"{label}/{app_name}" if label else app_name
+        for ref in entry["images"]:
+            inventory.setdefault(ref, set()).add(user)
+    if stale:
+        raise RuntimeError(
+            "These rendered directories are out of date with their kustomizations: "
+            f"{', '.join(sorted(set(stale)))}. Run tools/render-manifests.py -e {env}"
+        )
+    # Forget the directories that are no longer rendered.
+    cache["dirs"] = {
+        rendered: entry
+        for rendered, entry in cache["dirs"].items()
+        if rendered in state["rendered"]
+    }
+    filewrite.write_if_changed(
+        cache_file, json.dumps(cache, indent=1, sort_keys=True) + "\n"
+    )
+    print(f"{env}: scanned {scanned} of {len(state['rendered'])} rendered directories")
+
+
+def load_cache(filename):
+    """Load the image cache, or return an empty one."""
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "dirs": {}}
+    return cache
+
+
+def display_inventory(images, inventory):
+    """Print a table of the images and the Applications that use them."""
+    if not images:
+        print("No container images found.")
+        return
+    width = max(len("Image"), *(len(image.reference) for image in images))
+    print("")
+    print(f"{'Image':<{width}}  Applications")
+    for image in images:
+        users = ", ".join(sorted(inventory[image.reference]))
+        print(f"{image.reference:<{width}}  {users}")
+        if image.tag is None and image.digest is None:
+            print(f"{'':<{width}}  (no tag or digest; the image floats)")
+
+
+def inventory_json(images, inventory):
+    """Return the inventory as JSON text."""
+    return (
+        json.dumps(
+            [
+                {
+                    "image": image.reference,
+                    "registry": image.registry,
+                    "repository": image.repository,
+                    "tag": image.tag,
+                    "digest": image.digest,
+                    "applications": sorted(inventory[image.reference]),
+                }
+                for image in images
+            ],
+            indent=2,
+        )
+        + "\n"
+    )
+
+
+def prepull_daemonset(args, images, node_selector):
+    """
+    Return a DaemonSet that pulls each image onto every selected node. Each
+    image runs a no-op as an init container, using a busybox copied from
+    the helper image, since the images may have no shell of their own. A
+    pause container then keeps the pod running.
+    """
+    # Each container gets its own copies, so the YAML has no anchors.
+    def volume():
+        return {"name": "prepull", "mountPath": "/prepull"}
+
+    def resources():
+        return {"requests": {"cpu": "1m", "memory": "8Mi"}}
+
+    def labels():
+        return {"app.kubernetes.io/name": "image-prepull"}
+
+    init_containers = [
+        {
+            "name": "helper",
+            "image": args.helper_image,
+            "command": ["cp", "/bin/busybox", "/prepull/busybox"],
+            "volumeMounts": [volume()],
+            "resources": resources(),
+        }
+    ]
+    for i, image in enumerate(images):
+        init_containers.append(
+            {
+                "name": f"image-{i}",
+                "image": image.reference,
+                "imagePullPolicy": "IfNotPresent",
+                "command": ["/prepull/busybox", "true"],
+                "volumeMounts": [volume()],
+                "resources": resources(),
+            }
+        )
+    spec = {
+        "initContainers": init_containers,
+        "containers": [
+            {"name": "pause", "image": args.pause_image, "resources": resources()}
+        ],
+        "volumes": [{"name": "prepull", "emptyDir": {}}],
+        "tolerations": [{"operator": "Exists"}],
+    }
+    if node_selector:
+        spec["nodeSelector"] = node_selector
+    daemonset = {
+        "apiVersion": "apps/v1",
+        "kind": "DaemonSet",
+        "metadata": {
+            "name": "image-prepull",
+            "namespace": args.daemonset_namespace,
+            "labels": labels(),
+        },
+        "spec": {
+            "selector": {"matchLabels": labels()},
+            "template": {"metadata": {"labels": labels()}, "spec": spec},
+        },
+    }
+    return "---\n" + yaml.dump(
+        daemonset, Dumper=yamlscan.SafeDumper, sort_keys=False, default_flow_style=False
+    )
+
+
+def mirror_list(args, images):
+    """
+    Return the images to mirror, with their mirror names if wanted. Raises
+    RuntimeError if two repositories would have the same mirror name.
+    """
+    lines = []
+    mirrored = {}
+    for image in images:
+        if args.mirror_registry:
+            target = imageinventory.mirror_name(image, args.mirror_registry)
+            lines.append(f"{image.reference} {target}")
+            name = imageinventory.mirror_repository(image, args.mirror_registry)
+            mirrored.setdefault(name, set()).add(imageinventory.full_repository(image))
+        else:
+            lines.append(image.reference)
+    collisions = [
+        f"{name} would be the mirror of {', '.join(sorted(sources))}"
+        for name, sources in sorted(mirrored.items())
+        if len(sources) > 1
+    ]
+    if collisions:
+        raise RuntimeError(
+            "These repositories have the same name in the mirror registry:\n  "
+            + "\n  ".join(collisions)
+        )
+    return "".join(f"{line}\n" for line in lines)
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
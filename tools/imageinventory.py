@@ -0,0 +1,121 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Find the container images that rendered manifests use.
+
+The manifests have been through kustomize, so the images: overrides from
+the container-locations components are already applied. Any list of
+containers, initContainers, or ephemeralContainers is searched, wherever it
+is in the document, so the pod templates inside custom resources are found
+too. CRDs are skipped, as their schemas only describe containers.
+"""
+
+import collections
+import os
+import yaml
+
+import yamlscan
+
+CONTAINER_FIELDS = ("containers", "initContainers", "ephemeralContainers")
+SKIPPED_KINDS = {"CustomResourceDefinition"}
+DEFAULT_REGISTRY = "docker.io"
+
+# An image reference split into its parts. The tag and digest are None when
+# the reference does not have them.
+ImageRef = collections.namedtuple(
+    "ImageRef", ["reference", "registry", "repository", "tag", "digest"]
+)
+
+
+def parse_image(reference):
+    """Split an image reference into an ImageRef."""
+    rest, _, digest = reference.partition("@")
+    name, tag = rest, None
+    # A ':' after the last '/' separates the tag; one before it is a port.
+    slash = rest.rfind("/")
+    colon = rest.rfind(":")
+    if colon > slash:
+        name, tag = rest[:colon], rest[colon + 1 :]
+    first, _, remainder = name.partition("/")
+    if remainder and ("." in first or ":" in first or first == "localhost"):
+        registry, repository = first, remainder
+    else:
+        registry, repository = DEFAULT_REGISTRY, name
+    return ImageRef(reference, registry, repository, tag, digest or None)
+
+
+def document_images(doc, found=None):
+    """Return the set of image references in one document."""
+    if found is None:
+        found = set()
+    if isinstance(doc, dict):
+        for key, value in doc.items():
+            if key in CONTAINER_FIELDS and isinstance(value, list):
+                for container in value:
+                    if isinstance(container, dict) and isinstance(
+                        container.get("image"), str
+                    ):
+                        found.add(container["image"])
+            document_images(value, found)
+    elif isinstance(doc, list):
+        for item in doc:
+            document_images(item, found)
+    return found
+
+
+def directory_images(rendered):
+    """Return the sorted image references in a directory of rendered files."""
+    found = set()
+    for name in sorted(os.listdir(rendered)):
+        if not name.endswith(".yaml"):
+            continue
+        with open(os.path.join(rendered, name), "rb") as f:
+            for doc in yaml.load_all(f, Loader=yamlscan.SafeLoader):
+                if isinstance(doc, dict) and doc.get("kind") not in SKIPPED_KINDS:
+                    document_images(doc, found)
+    return sorted(found)
+
+
+def full_repository(image):
+    """
+    Return the registry and repository of the image, written the same way
+    for every reference to it: 'nginx' is docker.io/library/nginx.
+    """
+    repository = image.repository
+    if image.registry == DEFAULT_REGISTRY and "/" not in repository:
+        repository = f"library/{repository}"
+    return f"{image.registry}/{repository}"
+
+
+def mirror_repository(image, registry):
+    """
+    Return the repository of the image in a mirror registry that keeps only
+    the last part of each repository, as the container-locations comments
+    do. Different repositories may end in the same part.
+    """
+    return f"{registry.rstrip('/')}/{image.repository.rsplit('/', 1)[-1]}"
+
+
+def mirror_name(image, registry):
+    """Return the name of the image, with its tag or digest, in a mirror registry."""
+    name = mirror_repository(image, registry)
+    if image.tag is not None:
+        name += f":{image.tag}"
+    if image.digest is not None:
+        name += f"@{image.digest}"
+    return name
@@ -0,0 +1,192 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Follow changes to Kubernetes objects with 'kubectl get --watch', instead
+of polling for them.
+
+kubectl writes one JSON watch event per change, starting with an ADDED
+event for each object that already exists. The events are read by a
+thread and handed out by next_event(). The API server ends a watch after a
+while, so a watch that ends is started again.
+"""
+
+import codecs
+import json
+import queue
+import shlex
+import subprocess
+import tempfile
+import threading
+import time
+
+import runner
+
+# Give up on a watch that keeps ending without delivering any events.
+MAX_RESTARTS = 5
+
+
+class KubectlWatch:
+    """Watch the objects selected by the 'kubectl get' arguments."""
+
+    def __init__(self, kubectl, get_args):
+        self.cmd = (
+            shlex.split(kubectl)
+            + ["get"]
+            + list(get_args)
+            + ["--watch", "--output-watch-events", "-o", "json"]
+        )
+        self._queue = queue.Queue()
+        self._proc = None
+        self._failures = 0
+        self._start()
+
+    def _start(self):
+        # stderr goes to a file so that it can't fill a pipe and stall kubectl.
+        errors = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+        try:
+            self._proc = subprocess.Popen(  # pylint: disable=consider-using-with
+                self.cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=errors,
+            )
+        except OSError as ex:
+            errors.close()
+            raise RuntimeError(f"{shlex.join(self.cmd)}: {ex}") from ex
+        threading.Thread(
+            target=self._read, args=(self._proc, errors), daemon=True
+        ).start()
+
+    def _read(self, proc, errors):
+        """Decode the stream of JSON events from one kubectl process."""
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        buf = ""
+        events = 0
+        while True:
+            chunk = proc.stdout.read1(65536)
+            buf += utf8.decode(chunk, final=not chunk)
+            while True:
+                buf = buf.lstrip()
+                if not buf:
+                    break
+                try:
+                    event, end = decoder.raw_decode(buf)
+                except ValueError:
+                    # Wait for the rest of the event.
+                    break
+                buf = buf[end:]
+                events += 1
+                self._queue.put(event)
+            if not chunk:
+                break
+        proc.wait()
+        errors.seek(0)
+        stderr = errors.read().decode(errors="replace")
+        errors.close()
+        self._queue.put(_Ended(proc.returncode, stderr, events))
+
+    def next_event(self, timeout):
+        """
+        Return the next event, a dict with "type" and "object", or None if
+        none arrives within the timeout. Raises RuntimeError if the watch
+        can't be kept running.
+        """
+        try:
+            item = self._queue.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return None
+        if not isinstance(item, _Ended):
+            return item
+        if item.events > 0:
+            self._failures = 0
+        else:
+            self._failures += 1
+            if self._failures >= MAX_RESTARTS:
+                raise RuntimeError(f"{shlex.join(self.cmd)}: {item.stderr.strip()}")
+            # Don't hammer an API server that is having trouble.
+            time.sleep(self._failures)
+        self._start()
+        return None
+
+    def close(self):
+        """Stop watching."""
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+
+
+class _Ended:
+    """Marks the end of one kubectl process's events."""
+
+    def __init__(self, returncode, stderr, events):
+        self.returncode = returncode
+        self.stderr = stderr
+        self.events = events
+
+
+def list_names(kubectl, resource, get_args=(), names=None):
+    """
+    Return the names of the objects of the resource that exist, from one
+    'kubectl get'. With names, only those objects are looked for.
+    """
+    cmd = shlex.join(
+        shlex.split(kubectl)
+        + ["get", resource]
+        + sorted(names or [])
+        + list(get_args)
+        + ["--ignore-not-found", "-o", "json"]
+    )
+    try:
+        output = runner.run_this_always(cmd)
+    except RuntimeError as ex:
+        raise RuntimeError(f"{cmd}: {str(ex).strip()}") from ex
+    if not output.strip():
+        return set()
+    data = json.loads(output)
+    items = data.get("items") if "items" in data else [data]
+    return {item["metadata"]["name"] for item in items}
+
+
+def wait_until_gone(kubectl, resource, get_args=(), names=None, timeout=60.0):
+    """
+    Wait for the objects of the resource to be deleted, or just the named
+    ones. Each object that exists when the wait begins has until the
+    timeout to go. Returns the names of the objects that are still there.
+    """
+    # Watch before listing, so that a deletion between the two is not missed.
+    watch = KubectlWatch(kubectl, [resource] + list(get_args))
+    try:
+        pending = list_names(kubectl, resource, get_args, names)
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = watch.next_event(remaining)
+            if event is not None and event.get("type") == "DELETED":
+                pending.discard(event["object"]["metadata"]["name"])
+    finally:
+        watch.close()
+    if pending:
+        # Check again, in case the watch was restarted during a deletion.
+        pending &= list_names(kubectl, resource, get_args, pending)
+    return pending
@@ -0,0 +1,326 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers for reading kustomization.yaml files and finding their inputs."""
+
+import collections
+import hashlib
+import os
+import threading
+import yaml
+
+import timings
+import yamlscan
+
+KUSTOMIZATION_NAMES = ["kustomization.yaml", "kustomization.yml", "Kustomization"]
+
+# Kustomization fields that list files or directories.
+PATH_LIST_FIELDS = ["resources", "components", "bases", "crds", "configurations"]
+
+
+def kustomization_file(directory):
+    """Return the kustomization file in the given directory, or None."""
+    for name in KUSTOMIZATION_NAMES:
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def load_kustomization(directory):
+    """
+    Load the kustomization in the given directory. Returns a tuple of
+    (kustomization_file, doc), or (None, None) if there is no kustomization.
+    """
+    kfile = kustomization_file(directory)
+    if kfile is None:
+        return None, None
+    with open(kfile, "r", encoding="utf-8") as f, timings.span("yaml", kfile):
+        doc = yaml.load(f, Loader=yamlscan.SafeLoader)
+    if doc is None:
+        doc = {}
+    return kfile, doc
+
+
+def is_remote(entry):
+    """Is this kustomization entry a remote URL rather than a local path?"""
+    return "://" in entry or entry.startswith("github.com/")
+
+
+def patch_paths(doc):
+    """Return the file paths named by the patch fields of a kustomization."""
+    paths = []
+    for patch in doc.get("patches") or []:
+        if isinstance(patch, dict) and "path" in patch:
+            paths.append(patch["path"])
+    for patch in doc.get("patchesStrategicMerge") or []:
+        # Entries are either file paths or inline patches.
+        if isinstance(patch, str) and "\n" not in patch:
+            paths.append(patch)
+    for patch in doc.get("patchesJson6902") or []:
+        if isinstance(patch, dict) and "path" in patch:
+            paths.append(patch["path"])
+    for entry in doc.get("replacements") or []:
+        if isinstance(entry, dict) and "path" in entry:
+            paths.append(entry["path"])
+    return paths
+
+
+def generator_paths(doc):
+    """Return the file paths used by the configMap and secret generators."""
+    paths = []
+    for field in ["configMapGenerator", "secretGenerator"]:
+        for gen in doc.get(field) or []:
+            if not isinstance(gen, dict):
+                continue
+            for entry in gen.get("files") or []:
+                # Entries may be "key=path".
+                paths.append(entry.split("=", 1)[-1])
+            for entry in gen.get("envs") or []:
+                paths.append(entry)
+            if "env" in gen:
+                paths.append(gen["env"])
+    return paths
+
+
+# One kustomization directory in a KustomizationGraph. The files are the
+# local files it names directly, including its own kustomization file; the
+# children are the kustomization directories it pulls in. The doc is the
+# loaded kustomization, and the error says why it could not be loaded.
+KustomizationNode = collections.namedtuple(
+    "KustomizationNode",
+    ["directory", "kfile", "files", "children", "remotes", "doc", "error"],
+)
+
+
+class KustomizationGraph:
+    """
+    The graph of kustomization directories and the files that they pull in
+    through their resources, components, bases, patches, and generators.
+    Each directory is loaded once, however many kustomizations share it.
+
+    Each node has a digest that covers its own files and the digests of its
+    children, so two builds that share a base hash the base's files once,
+    and a changed file changes the digest of exactly the nodes that depend
+    on it.
+
+    A graph may be shared by threads that verify different environments.
+    """
+
+    def __init__(self, known_hashes=None):
+        self.nodes = {}
+        self.cycles = []
+        self._file_hashes = dict(known_hashes or {})
+        self._digests = {}
+        self._headers = {}
+        self._lock = threading.RLock()
+
+    def add_known_hashes(self, hashes):
+        """Add a dict of path to SHA-256 for files that need not be read."""
+        with self._lock:
+            for path, digest in hashes.items():
+                self._file_hashes.setdefault(path, digest)
+
+    def add(self, directory):
+        """Add the kustomization in the directory and everything it uses."""
+        directory = os.path.normpath(directory)
+        with self._lock:
+            self._add(directory, [])
+            return self.nodes[directory]
+
+    def _add(self, kdir, stack):
+        if kdir in self.nodes:
+            return
+        if kdir in stack:
+            self.cycles.append(stack[stack.index(kdir) :] + [kdir])
+            return
+        error = None
+        try:
+            kfile, doc = load_kustomization(kdir)
+        except (OSError, yaml.YAMLError) as ex:
+            # Keep the file as an input so that fixing it changes the digest.
+            kfile, doc, error = kustomization_file(kdir), {}, str(ex)
+        if kfile is None:
+            self.nodes[kdir] = KustomizationNode(kdir, None, [], [], [], {}, None)
+            return
+        if not isinstance(doc, dict):
+            doc, error = {}, "the kustomization is not a YAML mapping"
+        files = {os.path.normpath(kfile)}
+        children = []
+        remotes = set()
+        for entry in referenced_paths(doc):
+            if is_remote(entry):
+                remotes.add(entry)
+                continue
+            path = os.path.normpath(os.path.join(kdir, entry))
+            if os.path.isdir(path):
+                self._add(path, stack + [kdir])
+                if path in self.nodes:
+                    children.append(path)
+            else:
+                files.add(path)
+        self.nodes[kdir] = KustomizationNode(
+            kdir,
+            kfile,
+            sorted(files),
+            sorted(set(children)),
+            sorted(remotes),
+            doc,
+            error,
+        )
+
+    def inputs(self, directory):
+        """
+        Return a tuple of (files, remotes) for everything that the
+        kustomization in the directory pulls in, directly or indirectly.
+        """
+        files = set()
+        remotes = set()
+        for node in self.closure(directory):
+            files.update(node.files)
+            remotes.update(node.remotes)
+        return sorted(files), sorted(remotes)
+
+    def closure(self, directory):
+        """Return the node for the directory and every node below it."""
+        seen = set()
+        pending = [os.path.normpath(directory)]
+        nodes = []
+        with self._lock:
+            while pending:
+                kdir = pending.pop()
+                if kdir in seen or kdir not in self.nodes:
+                    continue
+                seen.add(kdir)
+                nodes.append(self.nodes[kdir])
+                pending.extend(self.nodes[kdir].children)
+        return nodes
+
+    def hash_file(self, path):
+        """Return the SHA-256 of the file, reading it at most once."""
+        with self._lock:
+            digest = self._file_hashes.get(path)
+            if digest is None:
+                try:
+                    digest = hash_file(path)
+                except OSError:
+                    digest = "missing"
+                self._file_hashes[path] = digest
+            return digest
+
+    def headers(self, path):
+        """Return the document headers of a YAML file, scanning it at most once."""
+        with self._lock:
+            headers = self._headers.get(path)
+            if headers is None:
+                with timings.span("yaml", path):
+                    headers = list(yamlscan.scan_documents(path))
+                self._headers[path] = headers
+            return headers
+
+    def dependents(self, changed_files):
+        """
+        Return the set of directories in the graph that use any of the
+        changed files, directly or through the kustomizations they pull in.
+        """
+        parents = collections.defaultdict(set)
+        with self._lock:
+            nodes = list(self.nodes.values())
+        for node in nodes:
+            for child in node.children:
+                parents[child].add(node.directory)
+        pending = [
+            node.directory for node in nodes if changed_files.intersection(node.files)
+        ]
+        found = set()
+        while pending:
+            kdir = pending.pop()
+            if kdir not in found:
+                found.add(kdir)
+                pending.extend(parents[kdir])
+        return found
+
+    def invalidate(self, changed_files):
+        """
+        Forget what the graph knows about the changed files, and drop the
+        nodes that depend on them so that they are loaded again by the next
+        add(). Returns the set of dropped directories.
+        """
+        changed_files = {os.path.normpath(f) for f in changed_files}
+        with self._lock:
+            dropped = self.dependents(changed_files)
+            for path in changed_files:
+                self._file_hashes.pop(path, None)
+                self._headers.pop(path, None)
+            for kdir in dropped:
+                del self.nodes[kdir]
+                self._digests.pop(kdir, None)
+            self.cycles = [c for c in self.cycles if dropped.isdisjoint(c)]
+            return dropped
+
+    def digest(self, directory):
+        """Return the digest of the directory's kustomization and its inputs."""
+        kdir = os.path.normpath(directory)
+        with self._lock:
+            digest = self._digests.get(kdir)
+            if digest is not None:
+                return digest
+            node = self.nodes.get(kdir)
+            if node is None:
+                node = self.add(kdir)
+            sha = hashlib.sha256()
+            sha.update(f"{kdir}\0".encode())
+            for filename in node.files:
+                sha.update(f"{filename}\0{self.hash_file(filename)}\0".encode())
+            for remote in node.remotes:
+                sha.update(f"{remote}\0".encode())
+            for child in node.children:
+                sha.update(f"{child}\0{self.digest(child)}\0".encode())
+            digest = sha.hexdigest()
+            self._digests[kdir] = digest
+            return digest
+
+
+def referenced_paths(doc):
+    """Return every path or URL that the kustomization doc refers to."""
+    entries = []
+    for field in PATH_LIST_FIELDS:
+        entries.extend(doc.get(field) or [])
+    entries.extend(patch_paths(doc))
+    entries.extend(generator_paths(doc))
+    return [entry for entry in entries if isinstance(entry, str)]
+
+
+def kustomization_inputs(directory):
+    """
+    Find every file that the kustomization in the given directory pulls in,
+    following its resources, components, and bases into other directories.
+    Returns a tuple of (files, remotes), where files is a sorted list of
+    normalized local paths and remotes is a sorted list of remote URLs.
+    """
+    graph = KustomizationGraph()
+    graph.add(directory)
+    return graph.inputs(directory)
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of the file's content."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
@@ -0,0 +1,120 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Make sure bin/kustomize is installed, without running 'make kustomize' each
+time.
+
+'make kustomize' forks make, bash, and 'bin/kustomize version' only to find
+that the tool is already in place. After it has run once, the version that
+bin/kustomize reports is kept in a stamp file. The stamp is used as long as
+it is newer than both bin/kustomize and the Makefile, and was written for
+the KUSTOMIZE_VERSION that the Makefile asks for; otherwise make is run
+again and the stamp is replaced.
+"""
+
+import json
+import os
+import re
+
+import filewrite
+import runner
+import timings
+
+KUSTOMIZE = "bin/kustomize"
+STAMP = "bin/.kustomize-version"
+MAKEFILE = "Makefile"
+STAMP_VERSION = 1
+
+
+def wanted_version(makefile=MAKEFILE):
+    """
+    Return the KUSTOMIZE_VERSION that make would use, from the environment
+    or the Makefile, or None.
+    """
+    if os.environ.get("KUSTOMIZE_VERSION"):
+        return os.environ["KUSTOMIZE_VERSION"]
+    try:
+        with open(makefile, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return None
+    match = re.search(r"^KUSTOMIZE_VERSION\s*\??=\s*(\S+)", text, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def stamped_version(wanted):
+    """
+    Return the kustomize version from the stamp file, or None if there is
+    no stamp or it is older than bin/kustomize or the Makefile.
+    """
+    try:
+        stamp_mtime = os.stat(STAMP).st_mtime_ns
+        if stamp_mtime < os.stat(KUSTOMIZE).st_mtime_ns:
+            return None
+        if os.path.exists(MAKEFILE) and stamp_mtime < os.stat(MAKEFILE).st_mtime_ns:
+            return None
+        with open(STAMP, "r", encoding="utf-8") as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(stamp, dict) or stamp.get("stamp") != STAMP_VERSION:
+        return None
+    if stamp.get("wanted") != wanted or not isinstance(stamp.get("version"), str):
+        return None
+    return stamp["version"]
+
+
+def write_stamp(wanted, version):
+    """Record the version of bin/kustomize in the stamp file."""
+    stamp = {"stamp": STAMP_VERSION, "wanted": wanted, "version": version}
+    if filewrite.write_if_changed(STAMP, json.dumps(stamp) + "\n") == "unchanged":
+        # The stamp is judged by its mtime, so it must be newer afterwards.
+        os.utime(STAMP)
+
+
+def ensure_kustomize(dryrun=False):
+    """
+    Install the kustomize tool if necessary, and return the version string
+    it reports. A dry run only prints the make command, and returns None if
+    there is no kustomize tool yet.
+    """
+    wanted = wanted_version()
+    with timings.span("phase", "resolve kustomize"):
+        version = stamped_version(wanted)
+    if version is not None:
+        return version
+    cmd = "make kustomize"
+    if dryrun:
+        print(f"Dryrun: {cmd}")
+        if not os.path.exists(KUSTOMIZE):
+            return None
+    else:
+        try:
+            with timings.span("phase", cmd):
+                runner.run_this_always(cmd)
+        except RuntimeError as ex:
+            raise RuntimeError(f"Unable to install kustomize: {ex}") from ex
+    cmd = f"{KUSTOMIZE} version"
+    try:
+        version = runner.run_this_always(cmd).strip()
+    except (RuntimeError, OSError) as ex:
+        raise RuntimeError(f"{cmd}: {ex}") from ex
+    if not dryrun:
+        write_stamp(wanted, version)
+    return version
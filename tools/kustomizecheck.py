@@ -0,0 +1,358 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A quick check of the kustomizations in a KustomizationGraph, without
+running kustomize.
+
+Every path that a kustomization names must exist, components must be
+Component kustomizations, and resources must not be. Each patch is matched
+against the documents that the kustomization accumulates from its
+resources, using the document headers from the manifest index or from the
+graph's header scans. A patch whose target comes from the patch itself must
+match a document, as kustomize refuses to build otherwise. A patch with an
+explicit target that matches nothing is not an error to kustomize, so it is
+reported as a warning.
+
+When a kustomization pulls in a remote resource or a helm chart, its
+documents can't be known here and its patches are not checked.
+"""
+
+import collections
+import os
+import re
+import yaml
+
+import kustomization
+import manifestindex
+import yamlscan
+
+COMPONENT_KIND = "Component"
+
+# A document that a kustomization accumulates, as far as patch targets are
+# concerned.
+Resource = collections.namedtuple(
+    "Resource", ["group", "version", "kind", "name", "namespace"]
+)
+
+
+class KustomizationChecker:
+    """Check the kustomizations in a graph. See the module docstring."""
+
+    def __init__(self, graph, index=None):
+        self.graph = graph
+        self.index = index
+        self.errors = []
+        self.warnings = []
+        self._resources = {}
+        self._file_resources = {}
+
+    def check(self, directories=None):
+        """
+        Check the kustomizations in the directories, or every node in the
+        graph. Returns the number of errors.
+        """
+        if directories is None:
+            directories = list(self.graph.nodes)
+        for kdir in sorted(directories):
+            node = self.graph.nodes[kdir]
+            if node.kfile is None:
+                continue
+            if node.error is not None:
+                self.errors.append(f"{node.kfile}: {node.error}")
+                continue
+            self.check_paths(node)
+            if node.doc.get("kind") != COMPONENT_KIND:
+                self.check_patches(node, node)
+        return len(self.errors)
+
+    def check_paths(self, node):
+        """Check that every local path named by the kustomization exists."""
+        for field in kustomization.PATH_LIST_FIELDS:
+            for entry in node.doc.get(field) or []:
+                if not isinstance(entry, str) or kustomization.is_remote(entry):
+                    continue
+                path = os.path.normpath(os.path.join(node.directory, entry))
+                problem = self.path_problem(field, path)
+                if problem is not None:
+                    self.errors.append(
+                        f"{node.kfile}: {field} entry {entry} {problem}"
+                    )
+        files = kustomization.patch_paths(node.doc)
+        files += kustomization.generator_paths(node.doc)
+        for entry in files:
+            path = os.path.normpath(os.path.join(node.directory, entry))
+            if not os.path.isfile(path):
+                self.errors.append(f"{node.kfile}: file {entry} does not exist")
+
+    def path_problem(self, field, path):
+        """Say what is wrong with a path named in the field, or None."""
+        if not os.path.exists(path):
+            return "does not exist"
+        if not os.path.isdir(path):
+            if field == "components":
+                return "is not a directory"
+            return None
+        child = self.graph.nodes.get(path)
+        if child is None or child.kfile is None:
+            return "is a directory without a kustomization"
+        is_component = child.doc.get("kind") == COMPONENT_KIND
+        if field == "components" and not is_component:
+            return "is not a Component"
+        if field != "components" and is_component:
+            return "is a Component and must be listed under components"
+        return None
+
+    def check_patches(self, node, owner):
+        """
+        Check the node's patches against the resources of the owner, which
+        is the node itself, or the kustomization that uses the node as a
+        component. The components of the node are checked the same way.
+        """
+        resources = self.resources(owner)
+        for kdir in self.local_dirs(node, ["components"]):
+            self.check_patches(self.graph.nodes[kdir], owner)
+        if resources is None:
+            return
+        for patch in node.doc.get("patches") or []:
+            if not isinstance(patch, dict):
+                continue
+            if "target" in patch:
+                self.check_target(node, owner, patch["target"], resources)
+            elif "path" in patch:
+                self.check_patch_file(node, owner, patch["path"], resources)
+            elif "patch" in patch:
+                self.check_patch_text(node, owner, patch["patch"], resources)
+        for patch in node.doc.get("patchesStrategicMerge") or []:
+            if not isinstance(patch, str):
+                continue
+            if "\n" in patch:
+                self.check_patch_text(node, owner, patch, resources)
+            else:
+                self.check_patch_file(node, owner, patch, resources)
+        for patch in node.doc.get("patchesJson6902") or []:
+            if isinstance(patch, dict) and isinstance(patch.get("target"), dict):
+                self.check_target(node, owner, patch["target"], resources)
+
+    def where(self, node, owner):
+        """Name the kustomization, and the one using it as a component."""
+        if node is owner:
+            return node.kfile
+        return f"{node.kfile} (as a component of {owner.kfile})"
+
+    def check_target(self, node, owner, target, resources):
+        """Warn about an explicit patch target that selects nothing."""
+        if not isinstance(target, dict):
+            return
+        if not any(target_matches(target, res) for res in resources):
+            selector = ", ".join(f"{k}={v}" for k, v in sorted(target.items()))
+            self.warnings.append(
+                f"{self.where(node, owner)}: patch target {selector} matches nothing"
+            )
+
+    def check_patch_file(self, node, owner, entry, resources):
+        """Check that each document in a patch file matches a resource."""
+        path = os.path.normpath(os.path.join(node.directory, entry))
+        if not os.path.isfile(path):
+            # Reported by check_paths.
+            return
+        try:
+            patches = self.file_resources(path)
+        except yaml.YAMLError as ex:
+            self.errors.append(f"{self.where(node, owner)}: patch {entry}: {ex}")
+            return
+        for patch in patches:
+            self.check_patch_resource(node, owner, patch, resources)
+
+    def check_patch_text(self, node, owner, text, resources):
+        """Check that each document in an inline patch matches a resource."""
+        try:
+            docs = list(yaml.load_all(text, Loader=yamlscan.SafeLoader))
+        except yaml.YAMLError as ex:
+            self.errors.append(f"{self.where(node, owner)}: inline patch: {ex}")
+            return
+        for doc in docs:
+            if not isinstance(doc, dict) or "kind" not in doc:
+                # A JSON patch needs an explicit target, and has none here.
+                continue
+            meta = doc.get("metadata") or {}
+            patch = make_resource(
+                doc.get("apiVersion"),
+                doc["kind"],
+                meta.get("name"),
+                meta.get("namespace"),
+            )
+            self.check_patch_resource(node, owner, patch, resources)
+
+    def check_patch_resource(self, node, owner, patch, resources):
+        """Report a patch, identified by its own content, that matches nothing."""
+        for res in resources:
+            if (
+                res.kind == patch.kind
+                and res.name == patch.name
+                and (patch.group is None or res.group == patch.group)
+                and (
+                    patch.namespace is None
+                    or res.namespace is None
+                    or res.namespace == patch.namespace
+                )
+            ):
+                return
+        self.errors.append(
+            f"{self.where(node, owner)}: patch for {patch.kind}/{patch.name} "
+            "matches no resource"
+        )
+
+    def local_dirs(self, node, fields):
+        """Return the kustomization directories named by the fields."""
+        dirs = []
+        for field in fields:
+            for entry in node.doc.get(field) or []:
+                if not isinstance(entry, str) or kustomization.is_remote(entry):
+                    continue
+                path = os.path.normpath(os.path.join(node.directory, entry))
+                child = self.graph.nodes.get(path)
+                if child is not None and child.kfile is not None:
+                    dirs.append(path)
+        return dirs
+
+    def resources(self, node):
+        """
+        Return the resources that the node accumulates before its patches
+        are applied, or None if they can't be known.
+        """
+        if node.directory in self._resources:
+            return self._resources[node.directory]
+        # Guard against a cycle, which the graph reports.
+        self._resources[node.directory] = None
+        result = self._accumulate(node)
+        self._resources[node.directory] = result
+        return result
+
+    def _accumulate(self, node):
+        if node.remotes or node.doc.get("helmCharts") or node.error is not None:
+            return None
+        result = []
+        for field in ["resources", "bases", "components"]:
+            for entry in node.doc.get(field) or []:
+                if not isinstance(entry, str):
+                    continue
+                path = os.path.normpath(os.path.join(node.directory, entry))
+                if os.path.isdir(path):
+                    child = self.graph.nodes.get(path)
+                    if child is None or child.kfile is None:
+                        return None
+                    child_resources = self.resources(child)
+                    if child_resources is None:
+                        return None
+                    result.extend(transformed(child, child_resources))
+                elif os.path.isfile(path) and field != "components":
+                    try:
+                        result.extend(self.file_resources(path))
+                    except yaml.YAMLError:
+                        return None
+                else:
+                    return None
+        for field, kind in [
+            ("configMapGenerator", "ConfigMap"),
+            ("secretGenerator", "Secret"),
+        ]:
+            for gen in node.doc.get(field) or []:
+                if isinstance(gen, dict) and "name" in gen:
+                    result.append(
+                        make_resource("v1", kind, gen["name"], gen.get("namespace"))
+                    )
+        return result
+
+    def file_resources(self, path):
+        """Return the resources in a YAML file, from the index if current."""
+        if path in self._file_resources:
+            return self._file_resources[path]
+        entry = None
+        if self.index is not None:
+            entry = self.index["files"].get(path)
+        if entry is not None and manifestindex.is_current(entry, path):
+            result = [
+                make_resource(
+                    doc["api_version"], doc["kind"], doc["name"], doc["namespace"]
+                )
+                for doc in manifestindex.documents(entry)
+                if doc["kind"] is not None
+            ]
+        else:
+            result = [
+                make_resource(h.api_version, h.kind, h.name, h.namespace)
+                for h in self.graph.headers(path)
+                if h.kind is not None
+            ]
+        self._file_resources[path] = result
+        return result
+
+
+def make_resource(api_version, kind, name, namespace):
+    """Return a Resource, splitting the apiVersion into group and version."""
+    group = None
+    version = None
+    if isinstance(api_version, str):
+        group, _, version = api_version.rpartition("/")
+    return Resource(group, version, kind, name, namespace)
+
+
+def transformed(node, resources):
+    """
+    Apply the node's name prefix, suffix and namespace to its resources.
+    Kustomize also lets a patch refer to a resource by its original name,
+    so the original resources are kept too.
+    """
+    prefix = node.doc.get("namePrefix") or ""
+    suffix = node.doc.get("nameSuffix") or ""
+    namespace = node.doc.get("namespace")
+    if not prefix and not suffix and not namespace:
+        return resources
+    return resources + [
+        res._replace(
+            name=f"{prefix}{res.name}{suffix}" if res.name is not None else None,
+            namespace=namespace or res.namespace,
+        )
+        for res in resources
+    ]
+
+
+def selector_matches(pattern, value):
+    """Match a patch target field, which kustomize treats as a regex."""
+    if value is None:
+        return True
+    try:
+        return re.fullmatch(str(pattern), value) is not None
+    except re.error:
+        return str(pattern) == value
+
+
+def target_matches(target, res):
+    """Does the explicit patch target select the resource?"""
+    # Label and annotation selectors are ignored, so this may match more
+    # than kustomize would, but never less.
+    for field, value in [
+        ("group", res.group),
+        ("version", res.version),
+        ("kind", res.kind),
+        ("name", res.name),
+        ("namespace", res.namespace),
+    ]:
+        if field in target and not selector_matches(target[field], value):
+            return False
+    return True
@@ -0,0 +1,144 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The manifest index, manifest-index.json, records each file that
+unpack-manifest extracted from the release tarball, with its SHA-256 and
+an entry for each YAML document in it. Later runs of the tools use it to
+skip re-reading files that have not changed.
+
+The index is compact JSON. Each file entry holds the file's size, mtime
+and SHA-256, and its documents as arrays in DOCUMENT_FIELDS order.
+"""
+
+import hashlib
+import json
+import os
+
+import yamlscan
+
+INDEX_NAME = "manifest-index.json"
+INDEX_VERSION = 1
+
+DOCUMENT_FIELDS = [
+    "index",
+    "offset",
+    "length",
+    "api_version",
+    "kind",
+    "namespace",
+    "name",
+    "sha256",
+]
+
+
+def index_path(env_dir):
+    """Return the path of the manifest index for the environment."""
+    return f"{env_dir}/{INDEX_NAME}"
+
+
+def load_index(filename):
+    """
+    Load the manifest index. Returns None if it does not exist or was
+    written by an incompatible version of the tools.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def dump_index(index):
+    """Return the index as compact JSON bytes, ready to be written."""
+    return json.dumps(index, separators=(",", ":"), sort_keys=True).encode()
+
+
+def new_index(release):
+    """Return an empty index for the given release."""
+    return {"version": INDEX_VERSION, "release": release, "files": {}}
+
+
+def scan_file_documents(filepath):
+    """Return the document entries for a YAML file."""
+    documents = []
+    with open(filepath, "rb") as f:
+        for header in yamlscan.scan_documents(filepath):
+            f.seek(header.offset)
+            digest = hashlib.sha256(f.read(header.length)).hexdigest()
+            documents.append(
+                [
+                    header.index,
+                    header.offset,
+                    header.length,
+                    header.api_version,
+                    header.kind,
+                    header.namespace,
+                    header.name,
+                    digest,
+                ]
+            )
+    return documents
+
+
+def file_entry(filepath, sha256, previous=None):
+    """
+    Build the index entry for a file whose SHA-256 is already known. The
+    documents are taken from the previous entry when its SHA-256 matches,
+    otherwise the file is scanned.
+    """
+    st = os.stat(filepath)
+    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+    if filepath.endswith((".yaml", ".yml")):
+        if previous is not None and previous.get("sha256") == sha256:
+            entry["documents"] = previous.get("documents", [])
+        else:
+            entry["documents"] = scan_file_documents(filepath)
+    return entry
+
+
+def is_current(entry, filepath):
+    """Does the file on disk still match the entry's size and mtime?"""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return False
+    return st.st_size == entry.get("size") and st.st_mtime_ns == entry.get(
+        "mtime_ns"
+    )
+
+
+def documents(entry):
+    """Return the entry's documents as dicts keyed by DOCUMENT_FIELDS."""
+    return [dict(zip(DOCUMENT_FIELDS, doc)) for doc in entry.get("documents", [])]
+
+
+def current_hashes(index):
+    """
+    Return a dict of path to SHA-256 for each indexed file that has not
+    been modified since the index was written.
+    """
+    hashes = {}
+    if index is None:
+        return hashes
+    for filepath, entry in index["files"].items():
+        if is_current(entry, filepath):
+            hashes[filepath] = entry["sha256"]
+    return hashes
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+# Copyright 2024-2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Create a new environment from environments/example-env, customizing its
+bootstraps for the environment and the gitops repo.
+"""
+
+import argparse
+import sys
+
+import envsync
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    required=True,
+    help="Name of new environment to create.",
+)
+PARSER.add_argument(
+    "--repo-url",
+    "-r",
+    type=str,
+    required=True,
+    help="Http URL of gitops repo.",
+)
+PARSER.add_argument(
+    "--sysconfig",
+    "-C",
+    type=str,
+    help="Path to SystemConfiguration yaml file.",
+)
+PARSER.add_argument(
+    "--lustre",
+    "-L",
+    type=str,
+    help="Path to LustreFileSystem yaml file that defines the global lustre "
+    "filesystem.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    try:
+        envsync.check_new_environment(
+            args.env, args.repo_url, args.sysconfig, args.lustre
+        )
+        sync = envsync.EnvironmentSync(
+            envsync.ExampleEnv(), args.env, args.repo_url, args.dryrun
+        )
+        sync.create(args.sysconfig, args.lustre)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+    for line in sync.log:
+        print(line)
+    print("Next steps:")
+    print("  git add environments")
+    print(f"  git commit -m 'Create {args.env}'")
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Render the kustomization behind each Application in an environment's
+bootstraps into a directory of plain YAML, one file per resource, so that
+the ArgoCD repo-server does not have to run kustomize on every refresh.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import re
+import sys
+import yaml
+
+import applications
+import filewrite
+import kustomization
+import kustomizebin
+import manifestindex
+import renderstate
+import runner
+import timings
+import yamlscan
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    required=True,
+    help="Name of environment to render.",
+)
+PARSER.add_argument(
+    "--output",
+    "-o",
+    type=str,
+    default="rendered",
+    help="Directory to hold the rendered manifests. Default=rendered.",
+)
+PARSER.add_argument(
+    "--rewrite-applications",
+    action="store_true",
+    help="Point the Applications at the rendered manifests.",
+)
+PARSER.add_argument(
+    "--check",
+    action="store_true",
+    help="Only report the rendered directories that are out of date.",
+)
+PARSER.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="Number of kustomize builds to run concurrently. "
+    "Default is the number of CPUs.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+PARSER.add_argument(
+    "--timings",
+    action="store_true",
+    help="Print a summary of the slowest operations.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.timings:
+        timings.enable()
+    try:
+        render_environment(args)
+    finally:
+        if args.timings:
+            timings.print_summary()
+
+
+def render_environment(args):
+    """Render the environment named in the args."""
+    if "/" in args.env:
+        print("The environment name must not include a slash character.")
+        sys.exit(1)
+    env_dir = f"environments/{args.env}"
+    if os.path.isdir(env_dir) is False:
+        print(f"Environment {env_dir} does not exist.")
+        sys.exit(1)
+    if args.jobs < 1:
+        print("The --jobs value must be at least 1.")
+        sys.exit(1)
+    env_output_dir = os.path.normpath(f"{args.output}/{args.env}")
+
+    try:
+        version = kustomizebin.ensure_kustomize(args.dryrun) or ""
+        apps = find_applications(env_dir, env_output_dir)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+    state_file = renderstate.state_path(env_output_dir)
+    state = renderstate.load_state(state_file) or renderstate.new_state()
+    index = manifestindex.load_index(manifestindex.index_path(env_dir))
+    graph = kustomization.KustomizationGraph(manifestindex.current_hashes(index))
+
+    # Several Applications may share one kustomization.
+    targets = {}
+    for app in apps:
+        targets[app.rendered] = app.source
+    stale = []
+    for rendered, source in sorted(targets.items()):
+        digest = renderstate.render_digest(version, graph, source)
+        entry = state["rendered"].get(rendered)
+        if (
+            entry is None
+            or entry.get("digest") != digest
+            or entry.get("source") != source
+            or not os.path.isdir(rendered)
+        ):
+            stale.append((rendered, source, digest))
+
+    if args.check:
+        for rendered, source, _ in stale:
+            print(f"  {rendered} is out of date with {source}")
+        print(f"{len(stale)} of {len(targets)} rendered directories are out of date.")
+        if stale:
+            sys.exit(1)
+        return
+
+    print(
+        f"Rendering {len(stale)} of {len(targets)} kustomizations "
+        f"into {env_output_dir}"
+    )
+    errs = render_all(args, stale, state)
+    if not args.dryrun:
+        os.makedirs(env_output_dir, exist_ok=True)
+        filewrite.write_if_changed(state_file, renderstate.dump_state(state))
+
+    if args.rewrite_applications:
+        errs += rewrite_applications(args, apps)
+    if errs > 0:
+        sys.exit(1)
+
+
+class Application:
+    """An Application found in a bootstrap, and where its manifests live."""
+
+    def __init__(self, filename, path, source, rendered):
+        # The file the Application is in, and its spec.source.path.
+        self.filename = filename
+        self.path = path
+        # The kustomization it is rendered from, and where that is rendered.
+        self.source = source
+        self.rendered = rendered
+
+
+def find_applications(env_dir, env_output_dir):
+    """
+    Find the Applications in the environment's bootstraps. An Application
+    that already points at a rendered directory is traced back to its
+    kustomization through the render state.
+    """
+    found = []
+    for filename, doc in applications.find_applications(env_dir):
+        path = applications.source_path(doc)
+        entry = renderstate.lookup(path)
+        if entry is not None:
+            source, rendered = entry["source"], path
+        else:
+            source = path
+            rendered = rendered_dir(env_dir, env_output_dir, path)
+        found.append(Application(filename, path, source, rendered))
+    return found
+
+
+def rendered_dir(env_dir, env_output_dir, source):
+    """Return the directory that the kustomization is rendered into."""
+    relpath = os.path.relpath(source, env_dir)
+    if relpath.startswith(".."):
+        relpath = source.replace("/", "_")
+    return os.path.normpath(os.path.join(env_output_dir, relpath))
+
+
+def render_all(args, stale, state):
+    """
+    Render each of the (rendered, source, digest) tuples, using up to
+    args.jobs concurrent builds, and record each success in the state.
+    Returns the number of failures.
+    """
+    errs = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {
+            pool.submit(render, args, rendered, source): (rendered, source, digest)
+            for rendered, source, digest in stale
+        }
+        for future in concurrent.futures.as_completed(futures):
+            rendered, source, digest = futures[future]
+            try:
+                counts = future.result()
+            except RuntimeError as ex:
+                print(f"  Error rendering {source}: {ex}")
+                errs += 1
+                continue
+            print(
+                f"  Rendered {source} into {rendered}: {counts['new']} new, "
+                f"{counts['updated']} updated, {counts['removed']} removed"
+            )
+            state["rendered"][rendered] = {"source": source, "digest": digest}
+    return errs
+
+
+def render(args, rendered, source):
+    """
+    Render one kustomization into the directory, one file per resource.
+    Files that did not change are left alone, and files for resources that
+    are gone are removed. Returns a dict of counts of the file changes.
+    """
+    cmd = f"bin/kustomize build {source}"
+    try:
+        output = runner.run_this_always(cmd)
+    except RuntimeError as ex:
+        raise RuntimeError(f"{cmd}: {ex}") from ex
+    files = {}
+    for doc in yaml.load_all(output, Loader=yamlscan.SafeLoader):
+        if doc is None:
+            continue
+        name = resource_filename(doc)
+        if name in files:
+            raise RuntimeError(f"two resources would be written to {name}")
+        files[name] = yaml.dump(
+            doc, Dumper=yamlscan.SafeDumper, sort_keys=True, default_flow_style=False
+        ).encode()
+
+    counts = {"new": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    if args.dryrun:
+        counts["new"] = len(files)
+        return counts
+    os.makedirs(rendered, exist_ok=True)
+    for name, data in sorted(files.items()):
+        path = os.path.join(rendered, name)
+        counts[filewrite.write_if_changed(path, data)] += 1
+    for name in os.listdir(rendered):
+        if name.endswith(".yaml") and name not in files:
+            os.remove(os.path.join(rendered, name))
+            counts["removed"] += 1
+    return counts
+
+
+def resource_filename(doc):
+    """Return the name of the file that holds the rendered resource."""
+    meta = doc.get("metadata") or {}
+    group = str(doc.get("apiVersion", "")).rpartition("/")[0]
+    parts = [
+        str(doc.get("kind", "")).lower(),
+        group,
+        meta.get("namespace"),
+        meta.get("name"),
+    ]
+    name = "_".join(str(part) for part in parts if part)
+    return re.sub(r"[^A-Za-z0-9._-]", "-", name) + ".yaml"
+
+
+def rewrite_applications(args, apps):
+    """
+    Point each Application's spec.source.path at its rendered directory,
+    editing only that line so that the rest of the file is untouched.
+    Returns the number of Applications that could not be rewritten.
+    """
+    errs = 0
+    by_file = {}
+    for app in apps:
+        if app.path != app.rendered:
+            by_file.setdefault(app.filename, []).append(app)
+    for filename, file_apps in sorted(by_file.items()):
+        with open(filename, "r", encoding="utf-8") as f:
+            text = f.read()
+        for app in file_apps:
+            pattern = re.compile(
+                r"^(\s*path:\s*)([\"']?)" + re.escape(app.path) + r"/?\2(\s*(#.*)?)$",
+                re.MULTILINE,
+            )
+            text, count = pattern.subn(
+                lambda m, app=app: f"{m.group(1)}{m.group(2)}{app.rendered}"
+                f"{m.group(2)}{m.group(3)}",
+                text,
+            )
+            if count != 1:
+                print(f"  Unable to find the path {app.path} in {filename}")
+                errs += 1
+                continue
+            print(f"  {filename}: {app.path} -> {app.rendered}")
+        if not args.dryrun:
+            filewrite.write_if_changed(filename, text.encode())
+    return errs
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
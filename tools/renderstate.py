@@ -0,0 +1,99 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The render state, render-state.json, sits at the top of each environment's
+tree of rendered manifests. It maps each rendered directory to the
+kustomization it was rendered from, and to the digest of that
+kustomization's inputs when it was rendered, so that a later render can
+skip the directories whose inputs have not changed, and so that the other
+tools can find the kustomization behind an Application that has been
+pointed at a rendered directory.
+"""
+
+import hashlib
+import json
+import os
+
+STATE_NAME = "render-state.json"
+STATE_VERSION = 1
+
+# Bump this when the layout of the rendered files changes, so that every
+# directory is rendered again.
+RENDER_VERSION = 1
+
+
+def state_path(env_output_dir):
+    """Return the path of the render state for an environment's tree."""
+    return f"{env_output_dir}/{STATE_NAME}"
+
+
+def new_state():
+    """Return an empty render state."""
+    return {"version": STATE_VERSION, "rendered": {}}
+
+
+def load_state(filename):
+    """
+    Load the render state. Returns None if it does not exist or was written
+    by an incompatible version of the tools.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def dump_state(state):
+    """Return the state as JSON bytes, ready to be written."""
+    return (json.dumps(state, indent=1, sort_keys=True) + "\n").encode()
+
+
+def lookup(path):
+    """
+    If the path is a rendered directory, return its entry from the render
+    state, which holds the "source" kustomization and its "digest".
+    Otherwise return None.
+    """
+    path = os.path.normpath(path)
+    parent = os.path.dirname(path)
+    while parent:
+        state = load_state(state_path(parent))
+        if state is not None:
+            return state["rendered"].get(path)
+        parent = os.path.dirname(parent)
+    return None
+
+
+def render_digest(version, graph, source):
+    """
+    Return the digest of everything that goes into a rendered directory:
+    the kustomize version and the kustomization's inputs, from the
+    KustomizationGraph.
+    """
+    sha = hashlib.sha256()
+    sha.update(f"{RENDER_VERSION}\0{version}\0{graph.digest(source)}".encode())
+    return sha.hexdigest()
+
+
+def is_current(entry, version, graph):
+    """Was the rendered directory's entry rendered from the current inputs?"""
+    return entry.get("digest") == render_digest(version, graph, entry["source"])
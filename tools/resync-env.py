@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Look in environments/example-env for new bootstraps to be added to the
+specified environments.
+"""
+
+import argparse
+import sys
+
+import envsync
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--env",
+    "-e",
+    type=str,
+    action="append",
+    help="Name of existing environment to update. May be given more than once.",
+)
+PARSER.add_argument(
+    "--all-envs",
+    action="store_true",
+    help="Update every environment other than example-env.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    envs = args.env or []
+    if args.all_envs:
+        envs.extend(envsync.environment_names())
+    if not envs:
+        print("You must specify -e or --all-envs")
+        sys.exit(1)
+
+    try:
+        example = envsync.ExampleEnv()
+        for env in envs:
+            envsync.check_env_name(env)
+            print(f"Look for new bootstraps in {env}...")
+            sync = envsync.EnvironmentSync(example, env, dryrun=args.dryrun)
+            try:
+                sync.resync()
+            finally:
+                for line in sync.log:
+                    print(line)
+            display_next_steps(sync)
+    except RuntimeError as ex:
+        print(ex)
+        sys.exit(1)
+
+
+def display_next_steps(sync):
+    """Tell the user what to do with the new bootstraps."""
+    print("")
+    if not sync.added:
+        print(f"No new bootstraps have been added to {sync.env_dir}.")
+        return
+    print(f"New bootstraps have been added to {sync.env_dir}.")
+    print("")
+    print("Next steps:")
+    print(f"  git add {sync.env_dir}")
+    print(f"  git commit -m 'New bootstraps in {sync.env}'")
+    print("")
+    print("Populate the application directory with a new manifest using")
+    print("tools/unpack-manifest.py.")
+    print("")
+    print("ArgoCD does not monitor bootstraps. The new bootstraps must be deployed")
+    print("with tools/deploy-env.py.")
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,62 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+The subprocess runner shared by the tools. Each command is timed with
+timings.span(), and a failed command raises RuntimeError with its stderr.
+"""
+
+import shlex
+import subprocess
+
+import timings
+
+
+def run_this_always(cmd, timeout=None):
+    """
+    Run the given command and return its output. With a timeout, in
+    seconds, a command that runs too long is killed; a timeout that has
+    already run out is an error without running the command.
+    """
+    if timeout is not None and timeout <= 0:
+        raise RuntimeError("deadline reached")
+    try:
+        with timings.span("subprocess", cmd):
+            res = subprocess.run(
+                shlex.split(cmd),
+                capture_output=True,
+                text=True,
+                check=False,
+                timeout=timeout,
+            )
+    except subprocess.TimeoutExpired as ex:
+        raise RuntimeError(f"{cmd}: timed out") from ex
+    except OSError as ex:
+        raise RuntimeError(f"{cmd}: {ex}") from ex
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr or res.stdout)
+    return res.stdout
+
+
+def run_this(args, cmd, timeout=None):
+    """Run the given command and return its output, or print it for a dry run."""
+    if args.dryrun:
+        print(f"Dryrun: {cmd}")
+    else:
+        return run_this_always(cmd, timeout)
+    return None
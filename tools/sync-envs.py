@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Create or resync many environments from a spec file. An environment that
+does not exist yet is created as new-env.py would create it, and one that
+exists is given the new bootstraps from environments/example-env as
+resync-env.py would. The example environment is read once, and the
+environments are done concurrently.
+
+The spec file:
+
+    repoURL: https://github.com/NearNodeFlash/site-gitops
+    environments:
+    - name: us-east-1
+      systemConfiguration: /path/to/us-east-1-systemconfig.yaml
+      lustreFileSystem: /path/to/us-east-1-lustre.yaml
+    - name: us-west-1
+      repoURL: https://github.com/NearNodeFlash/other-gitops
+
+The repoURL at the top is the default for the environments that do not
+have their own. The repoURL, systemConfiguration, and lustreFileSystem are
+used only when an environment is created.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import yaml
+
+import envsync
+import yamlscan
+
+ENV_FIELDS = {"name", "repoURL", "systemConfiguration", "lustreFileSystem"}
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--spec",
+    "-f",
+    type=str,
+    required=True,
+    help="YAML file listing the environments to create or resync.",
+)
+PARSER.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=8,
+    help="Number of environments to do concurrently. Default=8.",
+)
+PARSER.add_argument(
+    "-n",
+    action="store_true",
+    dest="dryrun",
+    help="Dry run.",
+)
+
+
+def main():
+    """main"""
+
+    args = PARSER.parse_args()
+    if args.jobs < 1:
+        print("The --jobs value must be at least 1.")
+        sys.exit(1)
+    try:
+        specs = load_spec(args.spec)
+        example = envsync.ExampleEnv()
+    except (RuntimeError, OSError) as ex:
+        print(ex)
+        sys.exit(1)
+
+    results = sync_environments(args, example, specs)
+    display_summary(results)
+    if any(result == "failed" for result in results.values()):
+        sys.exit(1)
+
+
+def load_spec(filename):
+    """
+    Read and check the spec file, before anything is written. Returns a
+    list of dicts with the fields of ENV_FIELDS, and 'create' set for the
+    environments that do not exist yet.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            spec = yaml.load(f, Loader=yamlscan.SafeLoader)
+    except (OSError, yaml.YAMLError) as ex:
+        raise RuntimeError(f"Unable to read {filename}: {ex}") from ex
+    if not isinstance(spec, dict) or not isinstance(spec.get("environments"), list):
+        raise RuntimeError(f"{filename} must have a list of environments.")
+
+    specs = []
+    names = set()
+    for entry in spec["environments"]:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        if not isinstance(entry, dict) or not entry.get("name"):
+            raise RuntimeError(f"{filename}: each environment must have a name.")
+        unknown = set(entry) - ENV_FIELDS
+        if unknown:
+            raise RuntimeError(
+                f"{filename}: environment {entry['name']} has unknown fields: "
+                f"{', '.join(sorted(unknown))}"
+            )
+        env = str(entry["name"])
+        if env in names:
+            raise RuntimeError(f"{filename}: environment {env} is listed twice.")
+        if env == envsync.EXAMPLE_ENV:
+            raise RuntimeError(f"{filename}: {env} cannot be synced with itself.")
+        names.add(env)
+        envsync.check_env_name(env)
+        item = {
+            "name": env,
+            "repoURL": entry.get("repoURL", spec.get("repoURL")),
+            "systemConfiguration": entry.get("systemConfiguration"),
+            "lustreFileSystem": entry.get("lustreFileSystem"),
+            "create": not os.path.exists(f"environments/{env}"),
+        }
+        if item["create"]:
+            envsync.check_new_environment(
+                env,
+                item["repoURL"],
+                item["systemConfiguration"],
+                item["lustreFileSystem"],
+            )
+        specs.append(item)
+    return specs
+
+
+def sync_environments(args, example, specs):
+    """
+    Create or resync the environments, up to args.jobs at a time. The
+    messages of each environment are printed together when it is done.
+    Returns a dict of environment name to 'created', 'updated',
+    'unchanged', or 'failed'.
+    """
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {
+            pool.submit(sync_environment, args, example, item): item["name"]
+            for item in specs
+        }
+        for future in concurrent.futures.as_completed(futures):
+            env = futures[future]
+            sync, error = future.result()
+            if sync.log or error is not None:
+                print(f"{env}:")
+            for line in sync.log:
+                print(line)
+            if error is not None:
+                print(f"  {error}")
+                results[env] = "failed"
+            elif sync.created:
+                results[env] = "created"
+            else:
+                results[env] = "updated" if sync.added else "unchanged"
+    return {item["name"]: results[item["name"]] for item in specs}
+
+
+def sync_environment(args, example, item):
+    """Create or resync one environment. Returns the sync and any error."""
+    sync = envsync.EnvironmentSync(
+        example,
+        item["name"],
+        item["repoURL"] if item["create"] else None,
+        args.dryrun,
+    )
+    try:
+        if item["create"]:
+            sync.create(item["systemConfiguration"], item["lustreFileSystem"])
+        else:
+            sync.resync()
+    except (RuntimeError, OSError) as ex:
+        return sync, str(ex)
+    return sync, None
+
+
+def display_summary(results):
+    """Print the environments by their outcome."""
+    print("")
+    for outcome in ["created", "updated", "unchanged", "failed"]:
+        envs = [env for env, result in results.items() if result == outcome]
+        if envs:
+            print(f"{outcome.capitalize()} ({len(envs)}): {', '.join(envs)}")
+    if any(result in ("created", "updated") for result in results.values()):
+        print("")
+        print("Next steps:")
+        print("  git add environments")
+        print("  git commit -m 'Sync environments'")
+        print("")
+        print("ArgoCD does not monitor bootstraps. The new bootstraps must be deployed")
+        print("with tools/deploy-env.py.")
+
+
+if __name__ == "__main__":
+    main()
+
+sys.exit(0)
@@ -0,0 +1,189 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Classification of CRD changes as compatible or incompatible."""
+
+import copy
+
+import crddiff
+
+SCHEMA = {
+    "type": "object",
+    "description": "A thing.",
+    "properties": {
+        "spec": {
+            "type": "object",
+            "description": "The spec.",
+            "required": ["size"],
+            "properties": {
+                "size": {"type": "integer", "description": "Bytes."},
+                "mode": {"type": "string", "enum": ["a", "b"]},
+                "tags": {"type": "array", "items": {"type": "string"}},
+                "description": {"type": "string", "description": "A field."},
+                "policy": {"type": "string", "default": "x", "example": "y"},
+            },
+        }
+    },
+}
+
+
+def crd(schemas, storage="v1", served=None):
+    """Return a CRD document with a version for each of the schemas."""
+    served = served or {}
+    return {
+        "kind": crddiff.CRD_KIND,
+        "metadata": {"name": "things.example.com"},
+        "spec": {
+            "versions": [
+                {
+                    "name": name,
+                    "served": served.get(name, True),
+                    "storage": name == storage,
+                    "schema": {"openAPIV3Schema": schema},
+                }
+                for name, schema in schemas.items()
+            ]
+        },
+    }
+
+
+def changes(old_doc, new_doc):
+    """Return the changes between two CRD documents."""
+    old = {"things": crddiff.summarize_crd(old_doc)}
+    new = {"things": crddiff.summarize_crd(new_doc)}
+    return crddiff.diff_crds(old, new)
+
+
+def changed(mutate):
+    """Return the changes made to v1's spec by the mutate function."""
+    schema = copy.deepcopy(SCHEMA)
+    mutate(schema["properties"]["spec"])
+    return changes(crd({"v1": SCHEMA}), crd({"v1": schema}))
+
+
+def test_unchanged():
+    assert not changes(crd({"v1": SCHEMA}), crd({"v1": copy.deepcopy(SCHEMA)}))
+
+
+def test_description_only_is_no_change():
+    def mutate(spec):
+        spec["description"] = "Reworded."
+        spec["properties"]["size"]["description"] = "Reworded."
+        spec["properties"]["policy"]["example"] = "z"
+
+    assert not changed(mutate)
+
+
+def test_field_named_description_is_compared():
+    def mutate(spec):
+        del spec["properties"]["description"]
+
+    found = changed(mutate)
+    assert [(c.detail, c.breaking) for c in found] == [
+        ("spec.description: field removed", True)
+    ]
+
+
+def test_optional_field_added_is_compatible():
+    def mutate(spec):
+        spec["properties"]["extra"] = {"type": "string"}
+
+    found = changed(mutate)
+    assert [(c.detail, c.breaking) for c in found] == [
+        ("spec.extra: optional field added", False)
+    ]
+
+
+def test_required_field_added_is_incompatible():
+    def mutate(spec):
+        spec["properties"]["extra"] = {"type": "string"}
+        spec["required"].append("extra")
+
+    assert [c.breaking for c in changed(mutate)] == [True]
+
+
+def test_field_removed_is_incompatible():
+    def mutate(spec):
+        del spec["properties"]["mode"]
+
+    assert [c.breaking for c in changed(mutate)] == [True]
+
+
+def test_field_retyped_is_incompatible():
+    def mutate(spec):
+        spec["properties"]["tags"]["items"]["type"] = "integer"
+
+    found = changed(mutate)
+    assert [(c.detail, c.breaking) for c in found] == [
+        ("spec.tags[]: type changed from string to integer", True)
+    ]
+
+
+def test_enum_narrowed_is_incompatible():
+    def mutate(spec):
+        spec["properties"]["mode"]["enum"] = ["a"]
+
+    assert [c.breaking for c in changed(mutate)] == [True]
+
+
+def test_enum_widened_is_compatible():
+    def mutate(spec):
+        spec["properties"]["mode"]["enum"] = ["a", "b", "c"]
+
+    assert [c.breaking for c in changed(mutate)] == [False]
+
+
+def test_other_validation_is_compatible():
+    def mutate(spec):
+        spec["properties"]["policy"]["default"] = "w"
+        spec["properties"]["size"]["minimum"] = 0
+
+    assert [c.breaking for c in changed(mutate)] == [False, False]
+
+
+def test_version_removed_is_incompatible():
+    found = changes(crd({"v1": SCHEMA, "v2": SCHEMA}), crd({"v1": SCHEMA}))
+    assert [(c.version, c.change, c.breaking) for c in found] == [
+        ("v2", "removed", True)
+    ]
+
+
+def test_version_added_and_storage_moved_is_compatible():
+    found = changes(crd({"v1": SCHEMA}), crd({"v1": SCHEMA, "v2": SCHEMA}, "v2"))
+    assert [(c.change, c.breaking) for c in found] == [
+        ("added", False),
+        ("storage", False),
+    ]
+
+
+def test_version_no_longer_served_is_incompatible():
+    found = changes(
+        crd({"v1": SCHEMA, "v2": SCHEMA}),
+        crd({"v1": SCHEMA, "v2": SCHEMA}, served={"v2": False}),
+    )
+    assert [(c.version, c.breaking) for c in found] == [("v2", True)]
+
+
+def test_crds_added_and_removed():
+    new = {"things": crddiff.summarize_crd(crd({"v1": SCHEMA}))}
+    assert [(c.change, c.breaking) for c in crddiff.diff_crds({}, new)] == [
+        ("added", False)
+    ]
+    assert [(c.change, c.breaking) for c in crddiff.diff_crds(new, {})] == [
+        ("removed", True)
+    ]
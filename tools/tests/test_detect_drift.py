@@ -0,0 +1,136 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Run detect-drift.py against a saved cluster snapshot."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+TOOLS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPLICATION = """\
+apiVersion: argoproj.io/v1alpha1
+kind: Application
+metadata:
+  name: 1-svc
+  namespace: argocd
+spec:
+  destination:
+    namespace: svc
+  source:
+    path: environments/e1/svc
+"""
+
+# A stand-in kustomize that builds a directory by printing its cm.yaml.
+KUSTOMIZE = """\
+#!/bin/bash
+if [[ $1 == version ]]; then
+    echo v5.5.0
+    exit 0
+fi
+cat "$2/cm.yaml"
+"""
+
+
+def config_map(value):
+    """Return the ConfigMap that the Application deploys."""
+    return (
+        "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: settings\n"
+        f"  namespace: svc\ndata:\n  value: '{value}'\n"
+    )
+
+
+def write(path, text, mode=0o644):
+    """Write a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.chmod(path, mode)
+
+
+@pytest.fixture(name="workarea")
+def fixture_workarea(tmp_path):
+    """A gitops workarea with one environment and a stand-in kustomize."""
+    root = str(tmp_path)
+    write(f"{root}/Makefile", "KUSTOMIZE_VERSION ?= v5.5.0\n")
+    write(f"{root}/bin/kustomize", KUSTOMIZE, 0o755)
+    stamp = {"stamp": 1, "wanted": "v5.5.0", "version": "v5.5.0"}
+    write(f"{root}/bin/.kustomize-version", json.dumps(stamp))
+    write(f"{root}/environments/e1/1-bootstrap0/1-svc.yaml", APPLICATION)
+    write(
+        f"{root}/environments/e1/1-bootstrap0/kustomization.yaml",
+        "resources:\n- 1-svc.yaml\n",
+    )
+    write(
+        f"{root}/environments/e1/svc/kustomization.yaml", "resources:\n- cm.yaml\n"
+    )
+    write(f"{root}/environments/e1/svc/cm.yaml", config_map("1"))
+    snapshot = {
+        "apiVersion": "v1",
+        "kind": "List",
+        "items": [
+            {
+                "apiVersion": "v1",
+                "kind": "ConfigMap",
+                "metadata": {"name": "settings", "namespace": "svc"},
+                "data": {"value": "1"},
+            }
+        ],
+    }
+    write(f"{root}/snapshot.json", json.dumps(snapshot))
+    return root
+
+
+def run_tool(workarea, tool, *args):
+    """Run one of the tools in the workarea."""
+    return subprocess.run(
+        [sys.executable, os.path.join(TOOLS, tool), *args],
+        cwd=workarea,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def test_no_drift_from_rendered(workarea):
+    assert run_tool(workarea, "render-manifests.py", "-e", "e1").returncode == 0
+    res = run_tool(workarea, "detect-drift.py", "-e", "e1", "-s", "snapshot.json")
+    assert res.returncode == 0, res.stdout
+    assert "0 changed, 0 removed, 0 added" in res.stdout
+    assert "out of date" not in res.stdout
+
+
+def test_stale_render_is_built_again(workarea):
+    assert run_tool(workarea, "render-manifests.py", "-e", "e1").returncode == 0
+    # Change the kustomization's input without rendering it again.
+    write(f"{workarea}/environments/e1/svc/cm.yaml", config_map("2"))
+    res = run_tool(workarea, "detect-drift.py", "-e", "e1", "-s", "snapshot.json")
+    assert res.returncode == 1, res.stdout
+    assert "rendered/e1/svc is out of date with environments/e1/svc" in res.stdout
+    assert '/data/value: "2" -> "1"' in res.stdout
+
+
+def test_drift_without_render(workarea):
+    write(f"{workarea}/environments/e1/svc/cm.yaml", config_map("3"))
+    res = run_tool(workarea, "detect-drift.py", "-e", "e1", "-s", "snapshot.json")
+    assert res.returncode == 1, res.stdout
+    assert "1 changed, 0 removed, 0 added" in res.stdout
@@ -0,0 +1,90 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of the environment creation and resync engine."""
+
+import os
+
+import pytest
+
+import envsync
+
+APPLICATION = """\
+apiVersion: argoproj.io/v1alpha1
+kind: Application
+metadata:
+  name: {name}
+spec:
+  source:
+    repoURL: GITOPS_REPO
+    path: environments/STAGING_EXAMPLE/{name}
+"""
+
+
+def make_dirs(root, *paths):
+    """Create the directories below root."""
+    for path in paths:
+        os.makedirs(os.path.join(root, path), exist_ok=True)
+
+
+def test_environment_names_skips_shared_directories(tmp_path):
+    make_dirs(
+        tmp_path,
+        "example-env/0-bootstrap0",
+        "alpha/0-bootstrap0",
+        "universal/nnf-sos",
+        "zulu/1-bootstrap1",
+    )
+    # A file named like a bootstrap is not a bootstrap.
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "notes" / "bootstrap.txt").write_text("")
+    (tmp_path / "README.md").write_text("")
+    assert envsync.environment_names(str(tmp_path)) == ["alpha", "zulu"]
+
+
+def write_files(root, files):
+    """Write the files, given as a dict of relative path to text, below root."""
+    for rel, text in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def test_example_without_kustomization_is_an_error(tmp_path):
+    write_files(tmp_path, {"example-env/0-bootstrap0/a.yaml": "kind: A\n"})
+    with pytest.raises(RuntimeError, match="has no kustomization.yaml"):
+        envsync.ExampleEnv(str(tmp_path))
+
+
+def test_resync_malformed_kustomization_is_an_error(tmp_path):
+    write_files(
+        tmp_path,
+        {
+            "example-env/0-bootstrap0/kustomization.yaml": (
+                "resources:\n- a.yaml\n- b.yaml\n"
+            ),
+            "example-env/0-bootstrap0/a.yaml": APPLICATION.format(name="a"),
+            "example-env/0-bootstrap0/b.yaml": APPLICATION.format(name="b"),
+            "e1/0-bootstrap0/kustomization.yaml": "resources: [a.yaml\n",
+            "e1/0-bootstrap0/a.yaml": APPLICATION.format(name="a").replace(
+                "GITOPS_REPO", "https://example.com/gitops"
+            ),
+        },
+    )
+    sync = envsync.EnvironmentSync(envsync.ExampleEnv(str(tmp_path)), "e1")
+    with pytest.raises(RuntimeError, match="Unable to parse .*kustomization.yaml"):
+        sync.resync()
@@ -0,0 +1,85 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests of the inotify watcher's handling of directory events."""
+
+import os
+import shutil
+import threading
+
+import pytest
+
+import filewatch
+
+
+@pytest.fixture(name="tree")
+def fixture_tree(tmp_path):
+    """A tree with two component directories, each with one file."""
+    for rel in ["env/a/b/x.yaml", "env/c/y.yaml"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("kind: A\n")
+    return tmp_path
+
+
+@pytest.fixture(name="watcher")
+def fixture_watcher(tree):
+    """An inotify watcher on the tree."""
+    try:
+        watcher = filewatch.InotifyWatcher([str(tree / "env")], quiet=0.1)
+    except OSError:
+        pytest.skip("inotify is not available")
+    yield watcher
+    watcher.close()
+
+
+def wait_after(watcher, change):
+    """
+    Make the change once the watcher is waiting, and return what it saw.
+    Fails if the watcher sees nothing for a few seconds.
+    """
+    seen = []
+    waiter = threading.Thread(target=lambda: seen.append(watcher.wait()), daemon=True)
+    waiter.start()
+    threading.Timer(0.1, change).start()
+    waiter.join(timeout=5)
+    assert seen, "the watcher did not report the change"
+    return seen[0]
+
+
+def test_changed_file(tree, watcher):
+    path = tree / "env" / "c" / "y.yaml"
+    assert wait_after(watcher, lambda: path.write_text("kind: B\n")) == {str(path)}
+
+
+def test_deleted_directory_checks_everything(tree, watcher):
+    assert wait_after(watcher, lambda: shutil.rmtree(tree / "env" / "c")) is None
+
+
+def test_moved_away_directory_checks_everything(tree, watcher):
+    def move():
+        os.rename(tree / "env" / "a", tree / "elsewhere")
+
+    assert wait_after(watcher, move) is None
+    # The moved directory is no longer watched.
+    moved = tree / "elsewhere" / "b" / "x.yaml"
+    path = tree / "env" / "c" / "y.yaml"
+
+    def edit():
+        moved.write_text("kind: B\n")
+        path.write_text("kind: B\n")
+
+    assert wait_after(watcher, edit) == {str(path)}
@@ -0,0 +1,83 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The scanner must agree with yaml.safe_load_all() on every document."""
+
+import pytest
+import yaml
+
+import yamlscan
+
+CASES = {
+    "plain": "kind: A\nmetadata:\n  name: a\n---\nkind: B\n",
+    "leading separator": "---\nkind: A\n---\nkind: B\n",
+    "empty document": "---\n---\nkind: Foo\n",
+    "separator comment": "---\n--- # comment\nkind: Foo\n",
+    "separator comment first": "kind: A\n--- # the second\nkind: B\n",
+    "separator tag": "kind: A\n--- !!map\nkind: B\n",
+    "separator flow mapping": "kind: A\n--- {kind: B, metadata: {name: b}}\n",
+    "separator trailing spaces": "kind: A\n---   \nkind: B\n",
+    "directive": "%YAML 1.1\n---\nkind: A\n---\nkind: B\n",
+    "separator without newline": "kind: A\n---",
+    "end marker comment": "kind: A\n... # done\n---\nkind: B\n",
+    "not a separator": "kind: A\ndata: |\n  ----\n  ---x\n",
+    "multi-line name": "kind: A\nmetadata:\n  name: foo\n    bar\n  namespace: ns\n",
+    "multi-line double-quoted name": 'kind: A\nmetadata:\n  name: "foo\n    bar"\n',
+    "multi-line single-quoted name": "kind: A\nmetadata:\n  name: 'foo\n    bar'\n",
+    "multi-line kind": "kind: Config\n  Map\nmetadata:\n  name: a\n",
+    "name then child": "kind: A\nmetadata:\n  name: a\n  labels:\n    x: y\n",
+    "comment after value": "kind: A\n  # not a continuation\nmetadata:\n  name: a\n",
+}
+
+
+def expected(text):
+    """Return the header fields that the YAML parser finds."""
+    found = []
+    for doc in yaml.safe_load_all(text):
+        doc = doc if isinstance(doc, dict) else {}
+        metadata = doc.get("metadata") or {}
+        found.append(
+            (
+                doc.get("apiVersion"),
+                doc.get("kind"),
+                metadata.get("name"),
+                metadata.get("namespace"),
+            )
+        )
+    return found
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_scan_matches_parser(tmp_path, name):
+    path = tmp_path / "docs.yaml"
+    path.write_text(CASES[name])
+    headers = list(yamlscan.scan_documents(str(path)))
+    assert [
+        (h.api_version, h.kind, h.name, h.namespace) for h in headers
+    ] == expected(CASES[name])
+    assert [h.index for h in headers] == list(range(len(headers)))
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_load_document(tmp_path, name):
+    path = tmp_path / "docs.yaml"
+    path.write_text(CASES[name])
+    loaded = [
+        yamlscan.load_document(str(path), header)
+        for header in yamlscan.scan_documents(str(path))
+    ]
+    assert loaded == list(yaml.safe_load_all(CASES[name]))
@@ -0,0 +1,151 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Timing instrumentation for the tools.
+
+Wrap an operation in 'with timings.span(category, name):' to record how long
+it took. Nothing is recorded until enable() is called, and until then span()
+returns a shared do-nothing context manager. The recorded spans can be
+printed as a summary of the slowest operations, or written as a Chrome trace
+file that can be opened in Perfetto (https://ui.perfetto.dev) or
+chrome://tracing. Spans from concurrent threads appear on separate tracks.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# One timed operation. The start and duration are in seconds.
+Span = collections.namedtuple("Span", ["category", "name", "start", "duration", "tid"])
+
+_NULL_SPAN = contextlib.nullcontext()
+_enabled = False
+_spans = []
+_lock = threading.Lock()
+_origin = 0.0
+
+
+def enable():
+    """Start recording spans."""
+    global _enabled, _origin  # pylint: disable=global-statement
+    _origin = time.perf_counter()
+    _enabled = True
+
+
+def enabled():
+    """Is recording turned on?"""
+    return _enabled
+
+
+class _Timer:
+    """Context manager that records one span."""
+
+    __slots__ = ["category", "name", "start"]
+
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        span_ = Span(
+            self.category,
+            self.name,
+            self.start - _origin,
+            end - self.start,
+            threading.get_ident(),
+        )
+        with _lock:
+            _spans.append(span_)
+        return False
+
+
+def span(category, name):
+    """Return a context manager that times the operation, if enabled."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Timer(category, name)
+
+
+def spans():
+    """Return a copy of the recorded spans."""
+    with _lock:
+        return list(_spans)
+
+
+def print_summary(limit=20):
+    """Print the time per category and the slowest operations."""
+    recorded = spans()
+    if len(recorded) == 0:
+        return
+    totals = collections.defaultdict(lambda: [0, 0.0])
+    for s in recorded:
+        totals[s.category][0] += 1
+        totals[s.category][1] += s.duration
+    print("")
+    print("Timings by category (spans may overlap when run concurrently):")
+    for category, (count, total) in sorted(
+        totals.items(), key=lambda item: item[1][1], reverse=True
+    ):
+        print(f"  {category:<12} {count:>6} ops {total:>10.3f}s")
+    print("")
+    print(f"Slowest {min(limit, len(recorded))} operations:")
+    for s in sorted(recorded, key=lambda s: s.duration, reverse=True)[:limit]:
+        print(f"  {s.duration:>9.3f}s  {s.category:<12} {s.name}")
+
+
+def write_trace(filename):
+    """Write the recorded spans as a Chrome trace file."""
+    pid = os.getpid()
+    # Number the threads in the order they first appear.
+    tids = {}
+    events = []
+    for s in sorted(spans(), key=lambda s: s.start):
+        tid = tids.setdefault(s.tid, len(tids))
+        events.append(
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round(s.start * 1e6, 1),
+                "dur": round(s.duration * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+            }
+        )
+    for ident, tid in tids.items():
+        label = "main" if ident == threading.main_thread().ident else f"worker {tid}"
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": label},
+            }
+        )
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
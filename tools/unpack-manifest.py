@@ -20,12 +20,23 @@
 """Unpack a tarball into the given environment."""
 
 import argparse
+import collections
+import hashlib
+import io
 import os
-import shlex
-import subprocess
 import sys
+import tarfile
 import yaml
 
+import crddiff
+import filewrite
+import manifestindex
+import runner
+import timings
+import yamlscan
+
+CHUNK_SIZE = 1024 * 1024
+
 PARSER = argparse.ArgumentParser()
 PARSER.add_argument(
     "--env",
@@ -48,12 +59,42 @@ PARSER.add_argument(
     dest="dryrun",
     help="Dry run.",
 )
+PARSER.add_argument(
+    "--timings",
+    action="store_true",
+    help="Print a summary of the slowest operations.",
+)
+PARSER.add_argument(
+    "--trace",
+    type=str,
+    help="Write a Chrome trace of the operations to this file. "
+    "Open it with https://ui.perfetto.dev.",
+)
 
 
 def main():
     """main"""
 
     args = PARSER.parse_args()
+    if args.timings or args.trace:
+        timings.enable()
+    try:
+        unpack_environment(args)
+    finally:
+        present_timings(args)
+
+
+def present_timings(args):
+    """Print the timing summary and write the trace, if requested."""
+    if args.timings:
+        timings.print_summary()
+    if args.trace:
+        timings.write_trace(args.trace)
+        print(f"Trace written to {args.trace}")
+
+
+def unpack_environment(args):
+    """Unpack the manifest into the environment named in the args."""
     if "/" in args.env:
         print("The environment name must not include a slash character.")
         sys.exit(1)
@@ -67,22 +108,60 @@ def main():
 
     previous_release = None
     new_release = None
+    crd_changes = []
+    stats = collections.Counter()
     try:
-        previous_release, new_release = untar_and_extract_toc(args, env_dir)
+        with timings.span("phase", "extract manifest"):
+            previous_release, new_release = untar_and_extract_toc(
+                args, env_dir, crd_changes, stats
+            )
     except RuntimeError as ex:
         print(ex)
         sys.exit(1)
-    upgrade_type = determine_upgrade_type(previous_release, new_release)
 
     messages = []
-    find_and_extract_template_resources(args, env_dir, "nnf-sos", messages)
-    find_and_extract_template_resources(args, env_dir, "nnf-dm", messages)
+    with timings.span("phase", "extract templates"):
+        find_and_extract_template_resources(
+            args, env_dir, "nnf-sos", messages, stats
+        )
+        find_and_extract_template_resources(args, env_dir, "nnf-dm", messages, stats)
 
-    check_for_crd_updates(args, env_dir, upgrade_type, messages)
+    check_for_crd_updates(previous_release, new_release, crd_changes, messages)
 
     # Last message: Remind the user to run the verification tool.
     messages.append("Run 'tools/verify-deployment.py'.")
     present_messages(args, env_dir, messages)
+    present_stats(args, stats)
+    with timings.span("phase", "git status"):
+        present_git_status(args, env_dir)
+
+
+def present_git_status(args, env_dir):
+    """
+    If the environment is in a git checkout, show what git thinks changed.
+    This is only a report for the user; nothing depends on it.
+    """
+    if args.dryrun:
+        return
+    try:
+        runner.run_this(args, "git rev-parse --is-inside-work-tree")
+        out = runner.run_this(args, f"git status --short {env_dir}")
+    except (RuntimeError, OSError):
+        return
+    if len(out) > 0:
+        print("")
+        print(f"git status --short {env_dir}")
+        print(out.rstrip())
+
+
+def present_stats(args, stats):
+    """Display the counts of unchanged, updated, and new files."""
+    would = "would be " if args.dryrun else ""
+    print("")
+    print(
+        f"Files: {stats['unchanged']} unchanged, {stats['updated']} {would}updated, "
+        f"{stats['new']} {would}new"
+    )
 
 
 def present_messages(args, env_dir, messages):
@@ -103,41 +182,56 @@ def present_messages(args, env_dir, messages):
     if args.dryrun:
         print("(dryrun skipping write)")
     else:
-        with open(unpack_notes, "w", encoding="utf-8") as fu:
-            write_messages(fu, messages)
+        notes = io.StringIO()
+        write_messages(notes, messages)
+        filewrite.write_if_changed(
+            unpack_notes, notes.getvalue().encode(), dryrun=args.dryrun
+        )
 
 
-def check_for_crd_updates(args, env_dir, upgrade_type, messages):
+def check_for_crd_updates(previous_release, new_release, crd_changes, messages):
     """
-    Determine whether any CRDs have been updated, and create appropriate
-    advice depending on the upgrade type.
+    Given the CRD changes that were found while unpacking, create
+    appropriate advice depending on whether any of them are incompatible
+    with the running software.
     """
-    out = run_this(args, f"git status {env_dir}")
-    crd_update = False
-    crds = []
-    if out is not None:
-        for line in out.split("\n"):
-            if line.endswith("-crds.yaml"):
-                crd_update = True
-                crds.append(line)
-
-    if crd_update and upgrade_type == "release-to-release":
+    if len(crd_changes) == 0:
+        return
+
+    upgrade = ""
+    if previous_release is not None and new_release is not None:
+        upgrade = f"\n  Upgrading from {previous_release} to {new_release}."
+    breaking = False
+    lines = []
+    for crd_file, changes in crd_changes:
+        lines.append(crd_file)
+        for change in changes:
+            note = ""
+            if change.breaking:
+                breaking = True
+                note = " (incompatible)"
+            lines.append(f"  {crddiff.format_change(change)}{note}")
+    crd_display = "\n  ".join(lines)
+
+    if not breaking:
         messages.append(
-            """**This looks like a release-to-release upgrade.**
-  This release includes some CRD changes. However, because this
-  appears to be a release-to-release upgrade, it should not be
-  necessary to remove all jobs and workflows or to undeploy the
-  existing Rabbit software from the cluster."""
+            f"""**The CRD changes in this release are compatible.**{upgrade}
+  This release includes some CRD changes. However, none of them
+  remove an API version, or remove, retype, or restrict a field of
+  an existing API version, so it should not be necessary to remove
+  all jobs and workflows or to undeploy the existing Rabbit software
+  from the cluster.
+
+  {crd_display}"""
         )
-    elif crd_update:
-        crd_display = "\n".join(crds)
+    else:
         messages.append(
-            f"""**This does NOT look like a release-to-release upgrade.**
-  The following manifests show CRD changes. Before pushing these
-  changes to your gitops repo you should remove all jobs and
-  workflows from the Rabbit cluster and undeploy the Rabbit
-  software from the cluster by removing the ArgoCD Application
-  resources (the bootstrap resources).
+            f"""**This release includes incompatible CRD changes.**{upgrade}
+  The following manifests show CRD changes that existing resources
+  may not survive. Before pushing these changes to your gitops repo
+  you should remove all jobs and workflows from the Rabbit cluster
+  and undeploy the Rabbit software from the cluster by removing the
+  ArgoCD Application resources (the bootstrap resources).
   Consult 'tools/undeploy-env.sh -C' to remove all Rabbit software
   CRDs from the cluster.
 
@@ -145,7 +239,7 @@ def check_for_crd_updates(args, env_dir, upgrade_type, messages):
         )
 
 
-def find_and_extract_template_resources(args, env_dir, component, messages):
+def find_and_extract_template_resources(args, env_dir, component, messages, stats):
     """
     For the given component, extract any "template" resources from its
     "examples" .yaml file. The templates will be stored to a "references"
@@ -164,15 +258,15 @@ def find_and_extract_template_resources(args, env_dir, component, messages):
 
     def create_default_resource(doc, name_of_default, default_prof_base, default_prof):
         # Given a template, create its default.
-        with open(default_prof, "w", encoding="utf-8") as fd:
-            if doc["metadata"]["name"] == "default":
-                if "data" in doc and "default" in doc["data"]:
-                    doc["data"]["default"] = True
-            ns = doc["metadata"]["namespace"]
-            del doc["metadata"]
-            doc["metadata"] = {"name": name_of_default, "namespace": ns}
-            fd.write(yaml.dump(doc))
-            fd.write("\n")  # backward compatibility
+        if doc["metadata"]["name"] == "default":
+            if "data" in doc and "default" in doc["data"]:
+                doc["data"]["default"] = True
+        ns = doc["metadata"]["namespace"]
+        del doc["metadata"]
+        doc["metadata"] = {"name": name_of_default, "namespace": ns}
+        # The trailing newline is for backward compatibility.
+        data = f"{yaml.dump(doc)}\n".encode()
+        stats[filewrite.write_if_changed(default_prof, data, dryrun=args.dryrun)] += 1
         messages.append(
             f"A new resource file '{default_prof_base}' has been created in {component_dir}. Please add it to the 'resources' list in {kust_yaml}."
         )
@@ -184,21 +278,17 @@ def find_and_extract_template_resources(args, env_dir, component, messages):
         default_prof = f"{component_dir}/{default_prof_base}"
         templ_prof = f"{references_dir}/{name}-{kind}.yaml"
 
-        if os.path.isdir(references_dir) is False:
+        if os.path.isdir(references_dir) is False and not args.dryrun:
             os.mkdir(references_dir)
-        template_preexists = os.path.isfile(templ_prof)
-        with open(templ_prof, "w", encoding="utf-8") as ft:
-            ft.write(yaml.dump(doc))
-            ft.write("\n")  # backward compatibility
+        # The trailing newline is for backward compatibility.
+        data = f"{yaml.dump(doc)}\n".encode()
         template_updated = False
-        if template_preexists:
-            # Have we updated the existing version of this template?
-            diff_stat = run_this(args, f"git diff {templ_prof}")
-            if diff_stat is None and args.dryrun:
-                print("(dryrun continuing)")
-                return
-            if len(diff_stat) > 0:
-                template_updated = True
+        if os.path.isfile(templ_prof):
+            # Have we updated the existing version of this template? Compare
+            # the content, not the formatting.
+            with open(templ_prof, "rb") as ft:
+                template_updated = content_changed(ft, data)
+        stats[filewrite.write_if_changed(templ_prof, data, dryrun=args.dryrun)] += 1
         # Do we need to create the template's default?
         if os.path.isfile(default_prof):
             if template_updated:
@@ -210,56 +300,49 @@ def find_and_extract_template_resources(args, env_dir, component, messages):
                 doc, name_of_default, default_prof_base, default_prof
             )
 
-    # Find the template resources.
-    with open(examples_yaml, "r", encoding="utf-8") as fe:
-        docs = yaml.safe_load_all(fe)
-        for doc in docs:
-            name = doc["metadata"]["name"]
-            name_of_default = None
-            # If it's a template then determine its default name.
-            if name == "template":
-                name_of_default = "default"
-            elif name.endswith("-template"):
-                name_of_default = f"{name.removesuffix('-template')}-default"
-
-            if name_of_default is not None:
-                extract_template(doc, name, name_of_default)
-
-
-def determine_upgrade_type(previous_release, new_release):
-    """
-    Characterize the type of upgrade that is happening. Does it look like a
-    release-to-release upgrade, or is it something less structured?
-    """
-
-    # Do we have enough info to decide?
-    if previous_release is None or new_release is None:
-        return None
-    # Does it look like dev-to-dev, or release-to-dev, or dev-to-release?
-    if "0.0.0" in previous_release or "-dirty" in previous_release:
-        return None
-    if "0.0.0" in new_release or "-dirty" in new_release:
-        return None
-    # Then it looks like release-to-release.
-    return "release-to-release"
-
-
-def untar_and_extract_toc(args, env_dir):
+    # Find the template resources. Only the headers are scanned; a document
+    # is fully loaded only when it is a template.
+    with timings.span("yaml", examples_yaml):
+        headers = list(yamlscan.scan_documents(examples_yaml))
+    for header in headers:
+        name = header.name
+        if name is None:
+            continue
+        name_of_default = None
+        # If it's a template then determine its default name.
+        if name == "template":
+            name_of_default = "default"
+        elif name.endswith("-template"):
+            name_of_default = f"{name.removesuffix('-template')}-default"
+
+        if name_of_default is not None:
+            doc = yamlscan.load_document(examples_yaml, header)
+            extract_template(doc, name, name_of_default)
+
+
+def untar_and_extract_toc(args, env_dir, crd_changes, stats):
     """
-    Untar the manifest and keep a copy of its table-of-contents.
+    Untar the manifest and keep a copy of its table-of-contents and of the
+    SHA-256 of each of its files. The changes found in each CRD file are
+    added to crd_changes, unless the environment had no manifest before.
     """
     manifest_release_txt = f"{env_dir}/manifest-release.txt"
     manifest_toc = f"{env_dir}/manifest-toc.txt"
+    manifest_sha256 = f"{env_dir}/manifest-sha256.txt"
     previous_release = None
     new_release = None
 
     if os.path.isfile(manifest_release_txt):
         previous_release = read_first_line(manifest_release_txt)
 
-    cmd = f"tar xfo {args.manifest} -C {env_dir}"
+    if previous_release is None:
+        # A first unpack; there is nothing deployed to compare the CRDs with.
+        crd_changes = None
     try:
-        _ = run_this(args, cmd)
-    except RuntimeError as ex:
+        toc = extract_manifest(
+            args, env_dir, manifest_toc, manifest_sha256, crd_changes, stats
+        )
+    except (tarfile.TarError, OSError, ValueError) as ex:
         raise RuntimeError(f"Unable to untar {args.manifest}: {ex}") from ex
 
     if os.path.isfile(manifest_release_txt) is False:
@@ -270,27 +353,147 @@ def untar_and_extract_toc(args, env_dir):
     else:
         new_release = read_first_line(manifest_release_txt)
 
-    try:
-        extract_table_of_contents(args, env_dir, manifest_toc)
-    except RuntimeError as ex:
-        raise RuntimeError(
-            f"Unable to extract table of contents from {args.manifest}: {ex}"
-        ) from ex
+    if not args.dryrun:
+        with timings.span("phase", "write manifest index"):
+            write_manifest_index(args, env_dir, toc, new_release)
 
     return previous_release, new_release
 
 
-def extract_table_of_contents(args, env_dir, manifest_toc):
-    """Extract the table of contents from the tarball."""
-    cmd = f"tar tf {args.manifest}"
-    stdout = run_this(args, cmd)
-    if stdout is None and args.dryrun:
+def write_manifest_index(args, env_dir, toc, release):
+    """
+    Write the manifest index for the files that were extracted. Files that
+    have the same SHA-256 as in the previous index keep their document
+    entries rather than being scanned again.
+    """
+    index_file = manifestindex.index_path(env_dir)
+    previous = manifestindex.load_index(index_file)
+    previous_files = {} if previous is None else previous["files"]
+    index = manifestindex.new_index(release)
+    for dest, digest in toc:
+        index["files"][dest] = manifestindex.file_entry(
+            dest, digest, previous_files.get(dest)
+        )
+    filewrite.write_if_changed(
+        index_file, manifestindex.dump_index(index), dryrun=args.dryrun
+    )
+
+
+def member_path(member):
+    """
+    Return the relative path of the tarball member, refusing the same
+    names that tar refuses: absolute paths are made relative, and any
+    name with a '..' component is an error.
+    """
+    parts = [p for p in member.name.split("/") if p not in ("", ".")]
+    if ".." in parts:
+        raise ValueError(f"Member name contains '..': {member.name}")
+    return "/".join(parts)
+
+
+def extract_manifest(
+    args, env_dir, manifest_toc, manifest_sha256, crd_changes, stats
+):
+    """
+    Extract the tarball into the environment in a single streaming pass,
+    writing the table of contents and the SHA-256 of each file as it goes.
+    The tarball may be uncompressed, gzip, or xz. Files whose content has
+    not changed are left alone, so their mtimes are preserved. Returns a
+    list of (path, sha256) for the extracted files.
+    """
+    if args.dryrun:
+        print(f"Dryrun: extract {args.manifest} into {env_dir}")
+    toc = []
+    umask = os.umask(0)
+    os.umask(umask)
+    with tarfile.open(args.manifest, mode="r|*") as tar:
+        for member in tar:
+            relpath = member_path(member)
+            if len(relpath) == 0:
+                continue
+            dest = f"{env_dir}/{relpath}"
+            if member.isdir():
+                if not args.dryrun:
+                    os.makedirs(dest, exist_ok=True)
+                continue
+            if not member.isfile():
+                raise ValueError(
+                    f"Member is not a regular file or directory: {member.name}"
+                )
+            sha = hashlib.sha256()
+            mode = member.mode & 0o777 & ~umask
+            if dest.endswith("-crds.yaml"):
+                src = tar.extractfile(member)
+                extract_crds(args, src, dest, mode, crd_changes, stats, sha)
+            else:
+                chunks = read_chunks(tar.extractfile(member), sha)
+                status = filewrite.write_if_changed(
+                    dest, chunks, mode, dryrun=args.dryrun
+                )
+                stats[status] += 1
+            toc.append((dest, sha.hexdigest()))
+    if args.dryrun:
+        return toc
+    toc_data = "".join(f"{dest}\n" for dest, _ in toc)
+    filewrite.write_if_changed(manifest_toc, toc_data.encode(), dryrun=args.dryrun)
+    sha_data = "".join(f"{digest}  {dest}\n" for dest, digest in toc)
+    filewrite.write_if_changed(
+        manifest_sha256, sha_data.encode(), dryrun=args.dryrun
+    )
+    return toc
+
+
+def extract_crds(args, src, dest, mode, crd_changes, stats, sha):
+    """
+    Extract a CRD file, comparing each of its CRDs with the version that
+    was there before, one API version at a time. If anything changed then
+    (dest, [CrdChange, ...]) is added to crd_changes. When crd_changes is
+    None the CRDs are not compared.
+    """
+    data = src.read()
+    sha.update(data)
+    if crd_changes is None:
+        stats[filewrite.write_if_changed(dest, data, mode, dryrun=args.dryrun)] += 1
+        return
+    old_data = None
+    if os.path.isfile(dest):
+        with open(dest, "rb") as fd:
+            old_data = fd.read()
+    if old_data == data:
+        stats["unchanged"] += 1
         return
-    with open(manifest_toc, "w", encoding="utf-8") as ft:
-        for x in stdout.split("\n"):
-            short = x.removeprefix("./")
-            if short.endswith("/") is False and len(short) > 0:
-                ft.write(f"{env_dir}/{short}\n")
+    try:
+        with timings.span("yaml", f"compare CRDs {dest}"):
+            old = {}
+            if old_data is not None:
+                old = crddiff.summarize_crds(old_data)
+            changes = crddiff.diff_crds(old, crddiff.summarize_crds(data))
+    except (yaml.YAMLError, KeyError, TypeError) as ex:
+        crd = os.path.basename(dest)
+        detail = f"unable to compare: {ex}"
+        changes = [crddiff.CrdChange(crd, None, "unparsed", detail, True)]
+    stats[filewrite.write_if_changed(dest, data, mode, dryrun=args.dryrun)] += 1
+    if len(changes) > 0:
+        crd_changes.append((dest, changes))
+
+
+def content_changed(old, new):
+    """
+    Compare two YAML streams by content, ignoring key order and formatting.
+    Streams that cannot be parsed are treated as changed.
+    """
+    try:
+        return yamlscan.canonical_hash_all(old) != yamlscan.canonical_hash_all(new)
+    except yaml.YAMLError:
+        return True
+
+
+def read_chunks(src, sha=None):
+    """Yield the content of the file object in chunks, updating the hash."""
+    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+        if sha is not None:
+            sha.update(chunk)
+        yield chunk
 
 
 def read_first_line(filename):
@@ -301,23 +504,6 @@ def read_first_line(filename):
     return None
 
 
-def run_this(args, cmd):
-    """Run the given command and return its output."""
-    if args.dryrun:
-        print(f"Dryrun: {cmd}")
-    else:
-        res = subprocess.run(
-            shlex.split(cmd),
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        if res.returncode != 0:
-            raise RuntimeError(res.stderr)
-        return res.stdout
-    return None
-
-
 if __name__ == "__main__":
     main()
 
@@ -18,20 +18,48 @@
 # limitations under the License.
 
 import argparse
-from curses import echo
+import collections
+import copy
+import hashlib
+import io
 import os
-import shlex
-import subprocess
 import sys
+import tempfile
+import threading
+import time
 import yaml
 
+import filewrite
+import kustomization
+import kustomizebin
+import kustomizecheck
+import manifestindex
+import renderstate
+import runner
+import timings
+import yamlscan
+
+BUILD_CACHE_DIR = ".cache/kustomize-builds"
+BATCH_DIR = ".cache/kustomize-batch"
+ORIGIN_ANNOTATION = "config.kubernetes.io/origin"
+
+# A reference to one document within a multi-document YAML file.
+DocumentRef = collections.namedtuple(
+    "DocumentRef", ["file", "index", "api_version", "kind", "name"]
+)
+
 PARSER = argparse.ArgumentParser()
 PARSER.add_argument(
     "--env",
     "-e",
     type=str,
-    required=True,
-    help="Name of environment to verify.",
+    action="append",
+    help="Name of environment to verify. May be given more than once.",
+)
+PARSER.add_argument(
+    "--all-envs",
+    action="store_true",
+    help="Verify every environment.",
 )
 PARSER.add_argument(
     "-n",
@@ -39,64 +67,425 @@ PARSER.add_argument(
     dest="dryrun",
     help="Dry run.",
 )
+PARSER.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="Number of kustomize builds to run concurrently. "
+    "Default is the number of CPUs.",
+)
+PARSER.add_argument(
+    "--no-cache",
+    action="store_false",
+    dest="use_cache",
+    help=f"Do not use the kustomize build cache in {BUILD_CACHE_DIR}.",
+)
+PARSER.add_argument(
+    "--cache-size",
+    type=int,
+    default=256,
+    help="Maximum size of the kustomize build cache, in MB. Default=256.",
+)
+PARSER.add_argument(
+    "--batch",
+    action="store_true",
+    help="Build all kustomizations with a single kustomize invocation, "
+    "falling back to one build per kustomization if that fails.",
+)
+PARSER.add_argument(
+    "--watch",
+    action="store_true",
+    help="After verifying, watch the environment for changes and verify the "
+    "kustomizations that use the changed files again.",
+)
+PARSER.add_argument(
+    "--poll",
+    action="store_true",
+    help="With --watch, poll for changes instead of using inotify.",
+)
+PARSER.add_argument(
+    "--timings",
+    action="store_true",
+    help="Print a summary of the slowest operations.",
+)
+PARSER.add_argument(
+    "--trace",
+    type=str,
+    help="Write a Chrome trace of the operations to this file. "
+    "Open it with https://ui.perfetto.dev.",
+)
 
 
 def main():
     """main"""
 
     args = PARSER.parse_args()
-    if "/" in args.env:
-        print("The environment name must not include a slash character.")
+    if args.timings or args.trace:
+        timings.enable()
+    try:
+        verify_environments(args)
+    finally:
+        present_timings(args)
+
+
+def present_timings(args):
+    """Print the timing summary and write the trace, if requested."""
+    if args.timings:
+        timings.print_summary()
+    if args.trace:
+        timings.write_trace(args.trace)
+        print(f"Trace written to {args.trace}")
+
+
+def environment_names(args):
+    """Return the names of the environments to verify."""
+    if args.all_envs:
+        return [
+            name
+            for name in sorted(os.listdir("environments"))
+            if os.path.isdir(f"environments/{name}")
+            and any("bootstrap" in d for d in os.listdir(f"environments/{name}"))
+        ]
+    return list(dict.fromkeys(args.env or []))
+
+
+def verify_environments(args):
+    """Verify the environments named in the args."""
+    envs = environment_names(args)
+    if len(envs) == 0:
+        print("Specify an environment with --env, or use --all-envs.")
         sys.exit(1)
-    env_dir = f"environments/{args.env}"
-    if os.path.isdir(env_dir) is False:
-        print(f"Environment {env_dir} does not exist.")
+    for env in envs:
+        if "/" in env:
+            print("The environment name must not include a slash character.")
+            sys.exit(1)
+        env_dir = f"environments/{env}"
+        if os.path.isdir(env_dir) is False:
+            print(f"Environment {env_dir} does not exist.")
+            sys.exit(1)
+    if args.jobs < 1:
+        print("The --jobs value must be at least 1.")
+        sys.exit(1)
+    if args.watch and len(envs) > 1:
+        print("The --watch option can only be used with one environment.")
         sys.exit(1)
 
-    if args.env != "example-env":
+    # The kustomize tool, its version, and the kustomization graph are
+    # shared by all of the environments.
+    version = None
+    args.kustomize_version = ""
+    if any(env != "example-env" for env in envs):
         try:
-            make_kustomize(args)
+            version = kustomizebin.ensure_kustomize(args.dryrun)
+            # Rendered directories are stamped with the version, cache or not.
+            args.kustomize_version = version or ""
+            if not args.use_cache or args.dryrun:
+                version = None
         except RuntimeError as ex:
             print(ex)
             sys.exit(1)
+    args.kustomize_slots = threading.BoundedSemaphore(args.jobs)
+    graph = kustomization.KustomizationGraph()
 
-    if verify_bootstraps(args):
+    if len(envs) == 1:
+        failed, _ = verify_environment(args, envs[0], graph, version)
+        if failed:
+            sys.exit(1)
+        return
+
+    results = verify_concurrently(args, envs, graph, version)
+    display_summary(results)
+    if any(result[1] != "ok" for result in results):
         sys.exit(1)
 
+
+def verify_environment(args, env, graph, version):
+    """
+    Verify one environment. Returns a tuple of (failed, cache), where cache
+    is the environment's view of the build cache, or None.
+    """
+    args = copy.copy(args)
+    args.env = env
+    env_dir = f"environments/{env}"
+    cache = None
+    index = None
+    if env != "example-env":
+        if version is not None:
+            cache = BuildCache(BUILD_CACHE_DIR, args.cache_size * 1024 * 1024, version)
+        index = manifestindex.load_index(manifestindex.index_path(env_dir))
+        # Files from the release manifest that are unchanged since the last
+        # unpack don't need to be read to be hashed.
+        graph.add_known_hashes(manifestindex.current_hashes(index))
+
+    failed = verify_pass(args, cache, graph, index)
+    if args.watch:
+        watch_environment(args, cache, graph, index)
+        failed = False
+    return failed, cache
+
+
+class ThreadOutput:
+    """
+    A stand-in for sys.stdout that holds what each capturing thread prints,
+    so that environments verified concurrently don't interleave their
+    output. Other threads print straight through.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._buffers = {}
+
+    def capture(self):
+        """Start holding what the current thread prints."""
+        self._buffers[threading.get_ident()] = io.StringIO()
+
+    def release(self):
+        """Stop holding the current thread's output, and return it."""
+        return self._buffers.pop(threading.get_ident()).getvalue()
+
+    def write(self, text):
+        """Write to the current thread's buffer, or to the stream."""
+        return self._buffers.get(threading.get_ident(), self.stream).write(text)
+
+    def flush(self):
+        """Flush the stream."""
+        self.stream.flush()
+
+
+def verify_concurrently(args, envs, graph, version):
+    """
+    Verify the environments concurrently, printing the output of each one
+    when it finishes. The kustomize builds of all of them share the
+    args.jobs build slots. Returns a list of (env, result, cache, seconds).
+    """
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    output = ThreadOutput(sys.stdout)
+
+    def verify(env):
+        output.capture()
+        start = time.perf_counter()
+        try:
+            failed, cache = verify_environment(args, env, graph, version)
+            result = "FAILED" if failed else "ok"
+        except (RuntimeError, OSError, yaml.YAMLError) as ex:
+            print(ex)
+            result, cache = "ERROR", None
+        return (env, result, cache, time.perf_counter() - start), output.release()
+
+    results = []
+    sys.stdout = output
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(envs)) as pool:
+            for future in concurrent.futures.as_completed(
+                [pool.submit(verify, env) for env in envs]
+            ):
+                result, text = future.result()
+                output.stream.write(f"===== {result[0]} =====\n{text}\n")
+                output.stream.flush()
+                results.append(result)
+    finally:
+        sys.stdout = output.stream
+    return sorted(results)
+
+
+def display_summary(results):
+    """Display a table of the result of each environment."""
+    width = max(len("Environment"), *(len(result[0]) for result in results))
+    print(f"{'Environment':<{width}}  {'Result':<6}  {'Hits':>5}  {'Misses':>6}  Time")
+    for env, result, cache, seconds in results:
+        hits = "-" if cache is None else cache.hits
+        misses = "-" if cache is None else cache.misses
+        print(
+            f"{env:<{width}}  {result:<6}  {hits:>5}  {misses:>6}  {seconds:.2f}s"
+        )
+
+
+def verify_pass(args, cache, graph, index, changed_only=False):
+    """
+    Verify the environment once. With changed_only, the kustomizations whose
+    builds are already in the cache are not built again. Returns True if
+    any errors were found.
+    """
+    if cache is not None:
+        cache.hits = cache.misses = 0
+    with timings.span("phase", "verify bootstraps"):
+        failed = verify_bootstraps(args, cache, graph, index, changed_only)
+    if cache is not None:
+        cache.evict()
+        print(f"Kustomize build cache: {cache.hits} hits, {cache.misses} misses")
+    if failed:
+        return True
+
     if args.env == "example-env":
         print("No further checks for example-env.")
-        sys.exit(0)
+        return False
 
     table_of_contents = f"environments/{args.env}/manifest-toc.txt"
-    if check_use_of_non_hub_api_versions(args, table_of_contents):
-        sys.exit(1)
+    with timings.span("phase", "check API versions"):
+        return check_use_of_non_hub_api_versions(args, table_of_contents, graph)
+
+
+def watch_roots(env_dir, graph):
+    """
+    Return the directory trees to watch: the environment, and each
+    kustomization directory outside of it that the environment uses.
+    """
+    roots = [env_dir]
+    for kdir in sorted(graph.nodes):
+        if not any(kdir == root or kdir.startswith(root + os.sep) for root in roots):
+            roots.append(kdir)
+    return roots
 
 
-def make_kustomize(args):
+def watch_environment(args, cache, graph, index):
     """
-    Install the kustomize tool.
+    Watch the environment for changes. After each burst of changes, drop
+    what the graph knew about the changed files and verify again. Only the
+    kustomizations that the changed files feed into miss the build cache
+    and are built again. Runs until interrupted.
     """
-    cmd = "make kustomize"
+    # Only --watch needs filewatch and its ctypes bindings.
+    import filewatch  # pylint: disable=import-outside-toplevel
+
+    env_dir = f"environments/{args.env}"
+    watcher = filewatch.make_watcher(watch_roots(env_dir, graph), poll=args.poll)
+    print("")
+    print(f"Watching {env_dir} for changes ({watcher.name}). Press Ctrl-C to stop.")
     try:
-        _ = run_this(args, cmd)
-    except RuntimeError as ex:
-        raise RuntimeError(f"Unable to install kustomize: {ex}") from ex
+        while True:
+            changed = watcher.wait()
+            start = time.perf_counter()
+            print("")
+            if changed is None:
+                print("Changes were missed, verifying everything again.")
+                graph = kustomization.KustomizationGraph()
+            else:
+                names = sorted(changed)
+                if len(names) > 5:
+                    names = names[:5] + [f"and {len(changed) - 5} more"]
+                print(f"Changed: {', '.join(names)}")
+                graph.invalidate(changed)
+            try:
+                if changed is None or manifestindex.index_path(env_dir) in changed:
+                    index = manifestindex.load_index(manifestindex.index_path(env_dir))
+                failed = verify_pass(args, cache, graph, index, changed_only=True)
+            except (KeyError, TypeError, OSError, yaml.YAMLError, RuntimeError) as ex:
+                # A file may be saved mid-edit; report it and keep watching.
+                # What the graph had read may be incomplete, so start it over.
+                print(f"Unable to verify: {type(ex).__name__}: {ex}")
+                print("Watching for changes.")
+                graph = kustomization.KustomizationGraph()
+                continue
+            elapsed = time.perf_counter() - start
+            if failed:
+                print(f"Errors found in {elapsed:.2f}s. Watching for changes.")
+            else:
+                print(f"Verified in {elapsed:.2f}s. Watching for changes.")
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        watcher.close()
 
 
-def kustomize_build(args, path):
+class BuildCache:
     """
-    Run 'kustomize build' to find manifest errors.
+    An on-disk cache of successful 'kustomize build' output. The cache key
+    is a hash of the kustomize version and of the kustomization's digest in
+    the KustomizationGraph, which covers every file that the kustomization
+    pulls in, so a changed input is always a miss.
+    """
+
+    def __init__(self, cache_dir, max_bytes, version):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def contains(self, key):
+        """Is there a cached build for the key? Does not count as a hit."""
+        return os.path.exists(os.path.join(self.cache_dir, key))
+
+    def key(self, digest):
+        """Return the cache key for a build with the given graph digest."""
+        return hashlib.sha256(f"{self.version}\0{digest}".encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached build output for the key, or None on a miss."""
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            with open(entry, "r", encoding="utf-8") as f:
+                output = f.read()
+            # Refresh the mtime so eviction treats this as recently used.
+            os.utime(entry)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return output
+
+    def put(self, key, output):
+        """Store the build output under the key."""
+        filewrite.write_if_changed(os.path.join(self.cache_dir, key), output)
+
+    def evict(self):
+        """Remove the least recently used entries until under max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("."):
+                # Still being written.
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                # Evicted by another environment's pass.
+                pass
+            total -= size
+
+
+def kustomize_build(args, path, cache=None, graph=None):
+    """
+    Run 'kustomize build' to find manifest errors. Returns the build output,
+    taken from the cache if none of the kustomization's inputs have changed.
+    The graph must already hold the digest of the path when a cache is used.
     """
     if args.env == "example-env":
-        return
+        return None
     cmd = f"bin/kustomize build {path}"
     if args.dryrun:
         print(cmd)
-    else:
-        try:
-            _ = run_this(args, cmd)
-        except RuntimeError as ex:
-            raise RuntimeError(f"{cmd}: {ex}") from ex
+        return None
+    key = None
+    if cache is not None:
+        key = cache.key(graph.digest(path))
+        output = cache.get(key)
+        if output is not None:
+            return output
+    try:
+        with args.kustomize_slots:
+            output = runner.run_this(args, cmd)
+    except RuntimeError as ex:
+        raise RuntimeError(f"{cmd}: {ex}") from ex
+    if cache is not None:
+        cache.put(key, output)
+    return output
 
 
 def verify_resources_in_kustomization(kustomization_file, application_files):
@@ -104,9 +493,11 @@ def verify_resources_in_kustomization(kustomization_file, application_files):
     Verify that all application files are listed in the kustomization.yaml resources.
     """
     err_cnt = 0
-    with open(kustomization_file, "r", encoding="utf-8") as f:
+    with open(kustomization_file, "r", encoding="utf-8") as f, timings.span(
+        "yaml", kustomization_file
+    ):
         try:
-            doc = yaml.safe_load(f)
+            doc = yaml.load(f, Loader=yamlscan.SafeLoader)
         except yaml.YAMLError as ex:
             print(f"YAML error in {kustomization_file}: {ex}")
             return 1
@@ -118,14 +509,17 @@ def verify_resources_in_kustomization(kustomization_file, application_files):
     return err_cnt
 
 
-def verify_application_resource(args, application_file):
+def verify_application_resource(args, application_file, builds, graph):
     """
-    Verify that the application resource is valid and that the path it
-    points to has a valid kustomization.
+    Verify that the application resource is valid and add the path it
+    points to onto the list of kustomize builds. An Application pointed at
+    rendered manifests must have been rendered from the current sources.
     """
-    with open(application_file, "r", encoding="utf-8") as f:
+    with open(application_file, "r", encoding="utf-8") as f, timings.span(
+        "yaml", application_file
+    ):
         try:
-            doc = yaml.safe_load(f)
+            doc = yaml.load(f, Loader=yamlscan.SafeLoader)
         except yaml.YAMLError as ex:
             print(f"YAML error in {application_file}: {ex}")
             return False
@@ -141,22 +535,251 @@ def verify_application_resource(args, application_file):
         if args.dryrun:
             return True
         path = spec["source"]["path"]
-        print(f"  Verify {path}")
-        kustomize_build(args, path)
+        # An Application pointed at rendered manifests is verified by
+        # building the kustomization they were rendered from.
+        entry = renderstate.lookup(path)
+        if entry is None:
+            builds.append((path, application_file))
+            return True
+        builds.append((entry["source"], application_file))
+        with timings.span("phase", f"render digest {entry['source']}"):
+            current = renderstate.is_current(entry, args.kustomize_version, graph)
+        if not current:
+            print(
+                f"  {path} (from {application_file}) is out of date with "
+                f"{entry['source']}. Run tools/render-manifests.py -e {args.env}"
+            )
+            return False
     return True
 
 
-def verify_bootstraps(args):
+def run_builds(args, builds, build, cached=None):
     """
-    Look for manifest errors in the bootstrap resources.
+    Call build(path) for each of the (path, origin) pairs, using up to
+    args.jobs concurrent builds. The paths for which cached(path) is true
+    are only read back from the cache, so they are done first, without the
+    worker pool. Results are reported as each build finishes. Returns the
+    number of failed builds.
     """
     errs = 0
+
+    def report(path, origin, ex):
+        nonlocal errs
+        if ex is None:
+            print(f"  Verified {path}")
+        else:
+            print(f"  Error in {path} (from {origin}): {ex}")
+            errs += 1
+
+    hits = {path for path, _ in builds if cached is not None and cached(path)}
+    inline = [(path, origin) for path, origin in builds if path in hits]
+    builds = [(path, origin) for path, origin in builds if path not in hits]
+    if args.jobs == 1 or len(builds) < 2:
+        inline, builds = inline + builds, []
+    for path, origin in inline:
+        try:
+            build(path)
+            report(path, origin, None)
+        except RuntimeError as ex:
+            report(path, origin, ex)
+    if not builds:
+        return errs
+
+    # The worker pool is only needed when something has to be built.
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(build, path): (path, origin) for path, origin in builds}
+        for future in concurrent.futures.as_completed(futures):
+            path, origin = futures[future]
+            try:
+                future.result()
+                report(path, origin, None)
+            except RuntimeError as ex:
+                report(path, origin, ex)
+    return errs
+
+
+def run_batched_builds(args, builds, cache, graph):
+    """
+    Build the (path, origin) pairs that are not already cached with a single
+    kustomize invocation. If the batch fails, each path is built on its own
+    so that the errors are reported against the right kustomization.
+    Kustomizations with remote resources are always built on their own.
+    Returns the number of failed builds.
+    """
+    keys = {}
+    pending = []
+    for path, origin in builds:
+        if cache is not None:
+            keys[path] = cache.key(graph.digest(path))
+            if cache.get(keys[path]) is not None:
+                print(f"  Verified {path}")
+                continue
+        pending.append((path, origin))
+
+    def store(path, output):
+        if cache is not None:
+            cache.put(keys[path], output)
+        return output
+
+    batch = [path for path, _ in pending if not graph.inputs(path)[1]]
+    if len(batch) < 2:
+        batch = []
+    if batch:
+        print(f"Building {len(batch)} kustomizations in one batch")
+        try:
+            with timings.span("phase", "batched kustomize build"):
+                outputs = batch_build(args, batch, graph)
+        except RuntimeError as ex:
+            print(f"  The batched build failed, building each one alone: {ex}")
+            batch = []
+        else:
+            for path in batch:
+                store(path, outputs[path])
+                print(f"  Verified {path}")
+    rest = [(path, origin) for path, origin in pending if path not in batch]
+    return run_builds(
+        args, rest, lambda path: store(path, kustomize_build(args, path))
+    )
+
+
+def batch_build(args, paths, graph):
+    """
+    Build all the paths with one 'kustomize build' of a temporary
+    kustomization that lists them as resources and asks for origin
+    annotations. Returns a dict of path to build output.
+    """
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="batch-", dir=BATCH_DIR) as root:
+        doc = {
+            "apiVersion": "kustomize.config.k8s.io/v1beta1",
+            "kind": "Kustomization",
+            "buildMetadata": ["originAnnotations"],
+            "resources": [os.path.relpath(path, root) for path in paths],
+        }
+        with open(f"{root}/kustomization.yaml", "w", encoding="utf-8") as f:
+            yaml.dump(doc, f, Dumper=yamlscan.SafeDumper)
+        cmd = f"bin/kustomize build {root}"
+        with args.kustomize_slots:
+            output = runner.run_this_always(cmd)
+        return split_batch_output(output, root, paths, graph)
+
+
+def split_batch_output(output, root, paths, graph):
+    """
+    Split the output of a batched build by the origin annotation of each
+    document, which names the file or kustomization, relative to the root,
+    that the document came from. The annotations are removed, so that the
+    output matches a build of the path alone.
+    """
+    owners = {}
+    for path in paths:
+        for filename in graph.inputs(path)[0]:
+            owners.setdefault(filename, set()).add(path)
+    documents = {path: [] for path in paths}
+    try:
+        docs = list(yaml.load_all(output, Loader=yamlscan.SafeLoader))
+    except yaml.YAMLError as ex:
+        raise RuntimeError(f"unable to parse the batched build: {ex}") from ex
+    for doc in docs:
+        if doc is None:
+            continue
+        meta = doc.get("metadata") or {}
+        annotations = meta.get("annotations") or {}
+        origin = yaml.load(
+            annotations.pop(ORIGIN_ANNOTATION, "null"), Loader=yamlscan.SafeLoader
+        )
+        if len(annotations) == 0:
+            meta.pop("annotations", None)
+        source = None
+        if isinstance(origin, dict) and "repo" not in origin:
+            source = origin.get("path") or origin.get("configuredIn")
+        owner = set()
+        if source is not None:
+            owner = owners.get(os.path.normpath(os.path.join(root, source)), set())
+        if len(owner) != 1:
+            raise RuntimeError(
+                f"unable to tell which kustomization {doc.get('kind')}/"
+                f"{meta.get('name')} came from"
+            )
+        documents[next(iter(owner))].append(doc)
+    return {
+        path: yaml.dump_all(path_docs, Dumper=yamlscan.SafeDumper, sort_keys=False)
+        for path, path_docs in documents.items()
+    }
+
+
+def unique_builds(builds):
+    """
+    Merge the (path, origin) pairs that name the same kustomization, so that
+    each one is built once. The origins of a merged build are joined.
+    """
+    origins = {}
+    for path, origin in builds:
+        origins.setdefault(os.path.normpath(path), []).append(origin)
+    return [(path, ", ".join(names)) for path, names in origins.items()]
+
+
+def resolve_graph(graph, builds, cache):
+    """
+    Load the kustomizations of the builds, and everything they pull in, into
+    the graph. When a cache is used, compute each build's digest here, once,
+    before the builds run concurrently. Returns the number of errors.
+    """
+    errs = 0
+    used = set()
+    for path, _ in builds:
+        graph.add(path)
+        used.update(node.directory for node in graph.closure(path))
+    # The graph may be shared with other environments.
+    for cycle in graph.cycles:
+        if not used.isdisjoint(cycle):
+            print(f"  Kustomization cycle: {' -> '.join(cycle)}")
+            errs += 1
+    if cache is not None:
+        for path, _ in builds:
+            graph.digest(path)
+    return errs
+
+
+def precheck_kustomizations(env_dir, graph, index, builds):
+    """
+    Load every kustomization in the environment into the graph and check
+    them, and everything they and the builds use, without kustomize.
+    Returns the number of errors.
+    """
+    roots = [path for path, _ in builds]
+    for root, dirs, _ in os.walk(env_dir):
+        dirs[:] = sorted(d for d in dirs if d != "reference")
+        if kustomization.kustomization_file(root) is not None:
+            roots.append(root)
+    used = set()
+    for root in roots:
+        graph.add(root)
+        used.update(node.directory for node in graph.closure(root))
+    checker = kustomizecheck.KustomizationChecker(graph, index)
+    errs = checker.check(used)
+    for warning in checker.warnings:
+        print(f"  Warning: {warning}")
+    for error in checker.errors:
+        print(f"  Error: {error}")
+    return errs
+
+
+def verify_bootstraps(args, cache, graph, index, changed_only=False):
+    """
+    Look for manifest errors in the bootstrap resources. With changed_only,
+    the kustomizations whose builds are already cached are skipped.
+    """
+    errs = 0
+    builds = []
     env_dir = f"environments/{args.env}"
-    for dirname in os.listdir(env_dir):
+    for dirname in sorted(os.listdir(env_dir)):
         bootstrap_dir = os.path.join(env_dir, dirname)
         if os.path.isdir(bootstrap_dir) and "bootstrap" in dirname:
             print(f"Verify {bootstrap_dir}")
-            kustomize_build(args, bootstrap_dir)
+            builds.append((bootstrap_dir, bootstrap_dir))
 
             application_files = [
                 f
@@ -171,60 +794,130 @@ def verify_bootstraps(args):
             if err_cnt == 0:
                 for app in application_files:
                     application_file = os.path.join(bootstrap_dir, app)
-                    if not verify_application_resource(args, application_file):
+                    if not verify_application_resource(
+                        args, application_file, builds, graph
+                    ):
                         errs += 1
+    if args.env != "example-env":
+        unique = unique_builds(builds)
+        with timings.span("phase", "kustomization graph"):
+            errs += resolve_graph(graph, unique, cache)
+        with timings.span("phase", "kustomization pre-check"):
+            errs += precheck_kustomizations(env_dir, graph, index, unique)
+        if errs > 0:
+            print("Skipping the kustomize builds until these errors are fixed.")
+            return True
+        skipped = f"{len(builds) - len(unique)} duplicates skipped"
+        if changed_only and cache is not None:
+            count = len(unique)
+            unique = [
+                (path, origin)
+                for path, origin in unique
+                if not cache.contains(cache.key(graph.digest(path)))
+            ]
+            skipped += f", {count - len(unique)} unchanged"
+        print(
+            f"Building {len(unique)} kustomizations with {args.jobs} jobs ({skipped})"
+        )
+        with timings.span("phase", "kustomize builds"):
+            if args.batch and not args.dryrun:
+                errs += run_batched_builds(args, unique, cache, graph)
+            else:
+                errs += run_builds(
+                    args,
+                    unique,
+                    lambda path: kustomize_build(args, path, cache, graph),
+                    cached=build_cached(args, cache, graph),
+                )
     return errs > 0
 
 
-def check_file_using_apigroup(api_group, api_hub_version, filepath, needs_api_check):
+def build_cached(args, cache, graph):
     """
-    Check if the given file uses the specified API group.
+    Return a function that tells whether a path's build is in the cache, or
+    None if the builds are not cached.
     """
-    with open(filepath, "r", encoding="utf-8") as f:
-        try:
-            docs = yaml.safe_load_all(f)
-        except yaml.YAMLError as ex:
-            print(f"YAML error in {filepath}: {ex}")
-            return 1
-        for doc in docs:
-            if "apiVersion" in doc and doc["apiVersion"].startswith(api_group):
-                if doc["apiVersion"] != api_hub_version:
-                    needs_api_check.append(filepath)
-                    return 1
+    if cache is None or args.dryrun or args.env == "example-env":
+        return None
+    return lambda path: cache.contains(cache.key(graph.digest(path)))
+
+
+def index_file_documents(filepath, documents, graph):
+    """
+    Add a DocumentRef for each document in the given file to the documents
+    list, using the graph's scan of the file. Returns 1 if the file could
+    not be parsed, else 0.
+    """
+    try:
+        for header in graph.headers(filepath):
+            if header.api_version is None:
+                continue
+            documents.append(
+                DocumentRef(
+                    filepath,
+                    header.index,
+                    header.api_version,
+                    header.kind,
+                    header.name,
+                )
+            )
+    except yaml.YAMLError as ex:
+        print(f"YAML error in {filepath}: {ex}")
+        return 1
     return 0
 
 
-def check_files_using_apigroup(args, api_hub_version, toc_files, needs_api_check):
+def index_environment(env_dir, toc_files, graph):
+    """
+    Walk the environment once, collecting the hub API versions from the
+    api-version.txt files and an index of the documents in every .yaml
+    file, excluding files that are in the table of contents or in the
+    reference/ subdir. Returns a tuple of (hub_versions, documents, errs).
+    """
+    errs = 0
+    hub_versions = []
+    documents = []
+    for root, dirs, files in os.walk(env_dir):
+        dirs.sort()
+        for name in sorted(files):
+            filepath = os.path.join(root, name)
+            if name == "api-version.txt":
+                with open(filepath, "r", encoding="utf-8") as f:
+                    hub_versions.append(f.read().strip())
+            elif (
+                name.endswith(".yaml")
+                and filepath not in toc_files
+                and "/reference/" not in filepath
+            ):
+                errs += index_file_documents(filepath, documents, graph)
+    return hub_versions, documents, errs
+
+
+def check_documents_using_apigroup(
+    api_hub_version, documents_by_group, needs_api_check
+):
     """
-    Look for any references to the given API group, excluding files
-    that are in the table of contents or in the reference/ subdir.
+    Check every indexed document that uses the hub version's API group,
+    and record each one that is not using the hub version.
     """
     errs = 0
     api_group = os.path.dirname(api_hub_version)
-    cmd = f'grep -lr "{api_group}/" environments/{args.env}'
-    try:
-        files_using_apigroup = run_this_always(cmd)
-    except RuntimeError as ex:
-        raise RuntimeError(f"{cmd}: {ex}") from ex
-    for filepath in files_using_apigroup.splitlines():
-        if (
-            filepath in toc_files
-            or "/reference/" in filepath
-            or not filepath.endswith(".yaml")
-        ):
-            continue
-        errs += check_file_using_apigroup(
-            api_group, api_hub_version, filepath, needs_api_check
-        )
+    for ref in documents_by_group.get(api_group, []):
+        if ref.api_version != api_hub_version:
+            needs_api_check.append(
+                f"{ref.file} (document {ref.index}): "
+                f"{ref.kind}/{ref.name} uses {ref.api_version}"
+            )
+            errs += 1
     return errs
 
 
 def display_needs_api_check(needs_api_check, hub_versions):
-    """Display files that need API version checks."""
+    """Display the documents that need API version checks."""
     if len(needs_api_check) > 0:
         print("")
-        print("Update these files to ensure their 'apiVersion' value is pointing at")
-        print("the latest API version:")
+        print("Update these documents to ensure their 'apiVersion' value is pointing")
+        print("at the latest API version:")
         for f in needs_api_check:
             print(f"  {f}")
         print("")
@@ -237,27 +930,25 @@ def display_needs_api_check(needs_api_check, hub_versions):
             print("")
 
 
-def check_use_of_non_hub_api_versions(args, toc):
+def check_use_of_non_hub_api_versions(args, toc, graph):
     """
     Look for any references to an old API, but skip the files that came
     from the tarball manifest or that are in the reference/ subdir, which
     is owned by unpack-manifest.
     """
-    errs = 0
     needs_api_check = []
-    hub_versions = []
-    toc_files = slurp_toc(toc)
-    cmd = f"find environments/{args.env} -name api-version.txt"
-    try:
-        api_version_files = run_this_always(cmd)
-    except RuntimeError as ex:
-        raise RuntimeError(f"{cmd}: {ex}") from ex
-    for api_ver_file in api_version_files.splitlines():
-        with open(api_ver_file, "r", encoding="utf-8") as f:
-            api_hub_version = f.read().strip()
-            hub_versions.append(api_hub_version)
-        errs += check_files_using_apigroup(
-            args, api_hub_version, toc_files, needs_api_check
+    toc_files = set(slurp_toc(toc))
+    hub_versions, documents, errs = index_environment(
+        f"environments/{args.env}", toc_files, graph
+    )
+    documents_by_group = {}
+    for ref in documents:
+        documents_by_group.setdefault(os.path.dirname(ref.api_version), []).append(
+            ref
+        )
+    for api_hub_version in hub_versions:
+        errs += check_documents_using_apigroup(
+            api_hub_version, documents_by_group, needs_api_check
         )
     display_needs_api_check(needs_api_check, hub_versions)
     return errs > 0
@@ -275,28 +966,6 @@ def slurp_toc(toc):
     return files
 
 
-def run_this_always(cmd):
-    """Run the given command and return its output."""
-    res = subprocess.run(
-        shlex.split(cmd),
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if res.returncode != 0:
-        raise RuntimeError(res.stderr)
-    return res.stdout
-
-
-def run_this(args, cmd):
-    """Run the given command and return its output."""
-    if args.dryrun:
-        print(f"Dryrun: {cmd}")
-    else:
-        return run_this_always(cmd)
-    return None
-
-
 if __name__ == "__main__":
     main()
 
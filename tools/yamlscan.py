@@ -0,0 +1,331 @@
+# Copyright 2025 Hewlett Packard Enterprise Development LP
+# Other additional copyright holders may be indicated within.
+#
+# The entirety of this work is licensed under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+#
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming scanner for multi-document YAML files.
+
+The release manifests include multi-megabyte CRD files, and most tools only
+need the identity of each document: its apiVersion, kind, and metadata name
+and namespace. The scanner reads the file a line at a time and picks those
+fields out of each document's top-level keys without building the document
+tree, so memory use does not depend on the size of the file. A document that
+is written in a form the line scanner does not understand, such as a flow
+mapping, a node on its '---' line, or a multi-line plain scalar, is handed to
+the YAML event parser instead, which reads only that document's bytes.
+"""
+
+import collections
+import hashlib
+import json
+import re
+import yaml
+
+import timings
+
+# Prefer the libyaml C implementation when PyYAML was built with it.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# The identity of one document within a multi-document YAML file. The
+# offset and length are in bytes, so the document can be re-read with
+# load_document().
+DocumentHeader = collections.namedtuple(
+    "DocumentHeader",
+    ["index", "offset", "length", "api_version", "kind", "name", "namespace"],
+)
+
+HEADER_KEYS = {b"apiVersion": "api_version", b"kind": "kind"}
+METADATA_KEYS = {b"name": "name", b"namespace": "namespace"}
+
+# A "key: value" line. The value may be empty.
+KEY_LINE = re.compile(rb"^([A-Za-z0-9_.\-/]+):(?:[ \t]+(.*?))?[ \t]*\r?\n?$")
+# A value that is safe to use without asking the YAML parser.
+PLAIN_VALUE = re.compile(rb"^[A-Za-z][A-Za-z0-9_.\-/]*$")
+YAML_KEYWORDS = {b"null", b"true", b"false", b"yes", b"no", b"on", b"off"}
+
+
+class _NeedsParser(Exception):
+    """The line scanner cannot handle this document."""
+
+
+def _is_marker(line, marker):
+    """
+    Is the line the marker, '---' or '...', followed by the end of the line
+    or by whitespace and then anything, such as a comment or a node?
+    """
+    return line.startswith(marker) and (len(line) == 3 or line[3:4] in b" \t\r\n")
+
+
+def _is_separator(line):
+    return _is_marker(line, b"---")
+
+
+def _is_end_marker(line):
+    return _is_marker(line, b"...")
+
+
+def _inline_content(line):
+    """Does a separator line carry the start of the document, as '--- {a: b}'?"""
+    rest = line[3:].strip()
+    return rest != b"" and not rest.startswith(b"#")
+
+
+def _value(raw):
+    """Convert the raw text of a scalar value to a Python value."""
+    if raw is None:
+        return None
+    if b" #" in raw and raw[:1] not in (b"'", b'"'):
+        raw = raw.split(b" #", 1)[0].rstrip()
+    if PLAIN_VALUE.match(raw) and raw.lower() not in YAML_KEYWORDS:
+        return raw.decode("utf-8")
+    if raw[:1] in (b"&", b"*", b"!", b"{", b"[", b"|", b">"):
+        raise _NeedsParser()
+    try:
+        value = yaml.load(raw, Loader=SafeLoader)
+    except yaml.YAMLError as ex:
+        # A quoted scalar that continues onto the next lines.
+        raise _NeedsParser() from ex
+    if isinstance(value, (dict, list)):
+        raise _NeedsParser()
+    return value if value is None else str(value)
+
+
+class _DocumentState:
+    """Accumulates the header fields while scanning one document."""
+
+    def __init__(self, offset, explicit):
+        self.offset = offset
+        self.explicit = explicit
+        self.has_content = False
+        self.fields = {}
+        self.in_metadata = False
+        self.metadata_indent = None
+        self.needs_parser = False
+        # The indent of the last header field with a value, until the next
+        # line shows that the value does not continue onto it.
+        self.value_indent = None
+
+    def feed(self, line):
+        """Consume one line of the document."""
+        if self.value_indent is not None:
+            self._continuation(line)
+        if line[:1] == b" " and not self.in_metadata and self.has_content:
+            # Most lines are deep inside a spec; skip them cheaply.
+            return
+        stripped = line.lstrip(b" ")
+        if stripped.strip() == b"" or stripped.startswith(b"#"):
+            return
+        self.has_content = True
+        if self.needs_parser:
+            return
+        indent = len(line) - len(stripped)
+        try:
+            if indent == 0:
+                self._top_level(line)
+            elif self.in_metadata:
+                self._metadata(line, indent)
+        except _NeedsParser:
+            self.needs_parser = True
+
+    def _continuation(self, line):
+        """
+        A more indented line after a field's value continues it, as a
+        multi-line plain scalar, which only the parser reads correctly.
+        """
+        stripped = line.lstrip(b" ")
+        if stripped.strip() == b"":
+            return
+        if not stripped.startswith(b"#") and len(line) - len(stripped) > (
+            self.value_indent
+        ):
+            self.needs_parser = True
+        self.value_indent = None
+
+    def _top_level(self, line):
+        self.in_metadata = False
+        match = KEY_LINE.match(line)
+        if match is None:
+            raise _NeedsParser()
+        key, raw = match.group(1), match.group(2)
+        if key in HEADER_KEYS:
+            self.fields[HEADER_KEYS[key]] = _value(raw)
+            if raw is not None:
+                self.value_indent = 0
+        elif key == b"metadata":
+            if raw is not None and not raw.startswith(b"#"):
+                raise _NeedsParser()
+            self.in_metadata = True
+            self.metadata_indent = None
+
+    def _metadata(self, line, indent):
+        if self.metadata_indent is None:
+            self.metadata_indent = indent
+        if indent != self.metadata_indent:
+            return
+        match = KEY_LINE.match(line[indent:])
+        if match is None:
+            if line[indent:].startswith(b"-"):
+                raise _NeedsParser()
+            return
+        key = match.group(1)
+        if key in METADATA_KEYS:
+            self.fields[METADATA_KEYS[key]] = _value(match.group(2))
+            if match.group(2) is not None:
+                self.value_indent = indent
+
+
+class _RegionReader:
+    """A file-like reader limited to one byte range of a file."""
+
+    def __init__(self, f, offset, length):
+        f.seek(offset)
+        self.f = f
+        self.remaining = length
+
+    def read(self, size=-1):
+        """Read up to size bytes from the region."""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def _parse_header(f, offset, length):
+    """
+    Use the YAML event parser to find the header fields of the document
+    in the given byte range. Only the events for that range are generated.
+    """
+    fields = {}
+    anchors = {}
+    # One [is_mapping, name_in_parent, current_key] entry per open collection.
+    stack = []
+    for event in yaml.parse(_RegionReader(f, offset, length), Loader=SafeLoader):
+        if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            name = None
+            if stack and stack[-1][0]:
+                name = stack[-1][2]
+                stack[-1][2] = None
+            stack.append([isinstance(event, yaml.MappingStartEvent), name, None])
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            stack.pop()
+        elif isinstance(event, (yaml.ScalarEvent, yaml.AliasEvent)):
+            if isinstance(event, yaml.ScalarEvent):
+                value = event.value
+                if event.anchor is not None:
+                    anchors[event.anchor] = value
+            else:
+                value = anchors.get(event.anchor)
+            if not stack or not stack[-1][0]:
+                continue
+            top = stack[-1]
+            if top[2] is None:
+                top[2] = value or ""
+                continue
+            key = top[2].encode()
+            top[2] = None
+            if len(stack) == 1 and key in HEADER_KEYS:
+                fields[HEADER_KEYS[key]] = value
+            elif len(stack) == 2 and top[1] == "metadata" and key in METADATA_KEYS:
+                fields[METADATA_KEYS[key]] = value
+    return fields
+
+
+def _header(f, doc, length, index):
+    """Build the DocumentHeader for a finished document."""
+    fields = doc.fields
+    if doc.needs_parser:
+        # The parser moves the file position; put the line reader back.
+        here = f.tell()
+        fields = _parse_header(f, doc.offset, length)
+        f.seek(here)
+    return DocumentHeader(
+        index,
+        doc.offset,
+        length,
+        fields.get("api_version"),
+        fields.get("kind"),
+        fields.get("name"),
+        fields.get("namespace"),
+    )
+
+
+def scan_documents(filepath):
+    """
+    Yield a DocumentHeader for each document in the given YAML file. The
+    documents are numbered as yaml.safe_load_all() would number them,
+    including empty documents.
+    """
+    with open(filepath, "rb") as f:
+        index = 0
+        offset = 0
+        doc = _DocumentState(0, False)
+        for line in f:
+            if _is_separator(line) or _is_end_marker(line):
+                if doc.has_content or doc.explicit:
+                    yield _header(f, doc, offset - doc.offset, index)
+                    index += 1
+                if _is_separator(line) and _inline_content(line):
+                    # The document starts on the separator line, so its
+                    # bytes include it, and only the parser can read it.
+                    doc = _DocumentState(offset, True)
+                    doc.has_content = True
+                    doc.needs_parser = True
+                    offset += len(line)
+                    continue
+                offset += len(line)
+                doc = _DocumentState(offset, _is_separator(line))
+                continue
+            if doc.offset == 0 and not doc.has_content and line.startswith(b"%"):
+                # A directive, such as %YAML, before the first document. It
+                # is not part of the document's bytes.
+                offset += len(line)
+                continue
+            doc.feed(line)
+            offset += len(line)
+        if doc.has_content or doc.explicit:
+            yield _header(f, doc, offset - doc.offset, index)
+
+
+def load_document(filepath, header):
+    """Load the full document described by the header."""
+    with open(filepath, "rb") as f, timings.span("yaml", f"{filepath}:{header.index}"):
+        f.seek(header.offset)
+        data = f.read(header.length)
+        return yaml.load(data, Loader=SafeLoader)
+
+
+def canonical_hash(doc):
+    """
+    Return a hash of the document that ignores key order and formatting, so
+    two documents that differ only in how they were written hash the same.
+    """
+    text = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def canonical_hash_all(stream):
+    """
+    Return a hash of all documents in the stream, which is bytes, a string,
+    or an open file. The order of the documents does not matter.
+    """
+    hashes = sorted(
+        canonical_hash(doc)
+        for doc in yaml.load_all(stream, Loader=SafeLoader)
+        if doc is not None
+    )
+    return hashlib.sha256("\n".join(hashes).encode()).hexdigest()